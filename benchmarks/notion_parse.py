@@ -0,0 +1,122 @@
+"""Mede o decode JSON e o parse de uma resposta sintetica de query do Notion.
+
+Compara json.loads com orjson (se instalado) e o parse antigo (dict por
+tarefa, helpers genericos) com o parser compilado por schema:
+
+    python -m benchmarks.notion_parse --pages 5000 --repeat 5
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from bot.notion_parser import compile_task_parser, orjson
+from bot.notion_schema import DatabaseSchema
+
+STATUSES = ("Not started", "In progress", "Done")
+CATEGORIES = ("freela", "estudo", "casa", "trabalho")
+
+
+def _page(i: int) -> Dict[str, Any]:
+    return {
+        "object": "page",
+        "id": f"page-{i:05d}",
+        "url": f"https://www.notion.so/page-{i:05d}",
+        "created_time": "2026-01-01T00:00:00.000Z",
+        "last_edited_time": f"2026-01-{1 + i % 28:02d}T12:00:00.000Z",
+        "parent": {"type": "database_id", "database_id": "db"},
+        "properties": {
+            "Name": {"id": "title", "type": "title", "title": [{"type": "text", "plain_text": f"Tarefa {i}"}]},
+            "status": {"id": "s", "type": "status", "status": {"name": STATUSES[i % 3], "color": "blue"}},
+            "Due": {"id": "d", "type": "date", "date": {"start": "2026-02-01", "end": None} if i % 2 else None},
+            "description": {
+                "id": "r",
+                "type": "rich_text",
+                "rich_text": [{"type": "text", "plain_text": "Descricao da tarefa " * 3}],
+            },
+            "time_min": {"id": "n", "type": "number", "number": i % 120},
+            "categories": {
+                "id": "c",
+                "type": "multi_select",
+                "multi_select": [{"name": CATEGORIES[i % 4]}, {"name": CATEGORIES[(i + 1) % 4]}],
+            },
+            "Tags": {"id": "t", "type": "multi_select", "multi_select": []},
+            "Created": {"id": "k", "type": "created_time", "created_time": "2026-01-01T00:00:00.000Z"},
+        },
+    }
+
+
+def _parse_legacy(page: Dict[str, Any]) -> Dict[str, Any]:
+    # Comportamento anterior: resolve o schema pelas propriedades e monta um dict por tarefa.
+    properties = page.get("properties", {})
+    schema = DatabaseSchema.from_properties(properties)
+    title = properties.get(schema.title or "") or {}
+    status = properties.get(schema.status or "") or {}
+    date = properties.get(schema.date or "") or {}
+    description = properties.get(schema.description or "") or {}
+    time_min = properties.get(schema.time_min or "") or {}
+    category = properties.get(schema.category or "") or {}
+    categories = [value.get("name", "") for value in category.get("multi_select", []) if value.get("name")]
+    name = "".join(p.get("plain_text", "") for p in title.get("title", []))
+    return {
+        "id": page.get("id", ""),
+        "name": name,
+        "url": page.get("url", ""),
+        "property_due": (date.get("date") or {}).get("start"),
+        "property_description": "".join(p.get("plain_text", "") for p in description.get("rich_text", [])),
+        "property_status": (status.get("status") or {}).get("name", ""),
+        "property_categories": categories,
+        "property_time_min": time_min.get("number"),
+        "is_freela": any("freela" in c.lower() for c in categories),
+        "property_name": name,
+        "last_edited_time": page.get("last_edited_time"),
+    }
+
+
+def _measure(repeat: int, fn: Callable[[], Any]) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(label: str, samples: List[float]) -> None:
+    print(f"{label:<18} mean={statistics.mean(samples):8.2f}ms  min={min(samples):8.2f}ms")
+
+
+def main(pages: int, repeat: int) -> None:
+    body = json.dumps({"object": "list", "results": [_page(i) for i in range(pages)], "has_more": False}).encode()
+    results = json.loads(body)["results"]
+    schema = DatabaseSchema.from_properties(results[0]["properties"])
+    parse = compile_task_parser(schema)
+
+    print(f"{pages} pages, {len(body) / 1024:.0f} KiB response, {repeat} runs")
+    _report("json.loads", _measure(repeat, lambda: json.loads(body)))
+    if orjson is not None:
+        _report("orjson.loads", _measure(repeat, lambda: orjson.loads(body)))
+    else:
+        print("orjson.loads       (nao instalado)")
+    _report("parse legacy", _measure(repeat, lambda: [_parse_legacy(p) for p in results]))
+    _report("parse compiled", _measure(repeat, lambda: [parse(p) for p in results]))
+
+    legacy = [_parse_legacy(p) for p in results]
+    compiled = [parse(p) for p in results]
+    assert [t.to_dict() for t in compiled] == [
+        {k: v for k, v in t.items() if k != "property_name"} for t in legacy
+    ]
+    legacy_size = sum(sys.getsizeof(t) for t in legacy)
+    compiled_size = sum(sys.getsizeof(t) for t in compiled)
+    print(f"record size        dict={legacy_size / pages:.0f}B  slots={compiled_size / pages:.0f}B per task (shallow)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.pages, args.repeat)
@@ -0,0 +1,109 @@
+"""Compara o NotionClient com pool keep-alive contra um client novo por requisicao.
+
+Sobe um servidor Notion falso local e executa o fluxo do !stop-timer
+(GET da pagina + PATCH do time_min) N vezes em cada modo:
+
+    python -m benchmarks.notion_pool --iterations 200
+
+Localmente so o handshake TCP e evitado; contra api.notion.com o ganho inclui
+o handshake TLS de cada conexao.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+import httpx
+
+from bot.notion_client import NotionClient
+
+PAGE = {
+    "object": "page",
+    "id": "page-1",
+    "url": "https://notion.so/page-1",
+    "properties": {"time_min": {"type": "number", "number": 30}},
+}
+
+
+class _FakeNotionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = json.dumps(PAGE).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_PATCH = _reply
+    do_POST = _reply
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+async def _stop_timer_unpooled(base_url: str) -> None:
+    # Comportamento anterior: um AsyncClient (e uma conexao) por chamada.
+    async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
+        response = await client.get(f"{base_url}/pages/page-1")
+        response.raise_for_status()
+    async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
+        response = await client.patch(f"{base_url}/pages/page-1", json={"properties": {}})
+        response.raise_for_status()
+
+
+async def _measure(iterations: int, flow: Callable[[], "asyncio.Future"]) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await flow()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(label: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<10} mean={statistics.mean(samples):7.2f}ms  p50={statistics.median(samples):7.2f}ms  p95={p95:7.2f}ms")
+
+
+async def main(iterations: int) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeNotionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    # Sem limite de taxa efetivo: o benchmark mede o pool HTTP, nao os 3 req/s do token bucket.
+    notion = NotionClient(
+        token="fake",
+        database_id="db",
+        api_base=base_url,
+        rate_limit_per_second=1_000_000.0,
+        rate_limit_burst=1_000_000,
+    )
+    try:
+        unpooled = await _measure(iterations, lambda: _stop_timer_unpooled(base_url))
+        pooled = await _measure(iterations, lambda: notion.update_task("page-1", time_min=5))
+    finally:
+        await notion.aclose()
+        server.shutdown()
+
+    print(f"!stop-timer flow (GET + PATCH), {iterations} iterations against a local fake Notion")
+    _report("unpooled", unpooled)
+    _report("pooled", pooled)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    asyncio.run(main(parser.parse_args().iterations))
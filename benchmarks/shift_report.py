@@ -0,0 +1,102 @@
+"""Mede o relatorio de turnos de um periodo sobre um historico sintetico.
+
+Compara o laco por turno (calculate_summary + agregacao em Python) com o
+build_report vetorizado sobre os arrays do historico:
+
+    python -m benchmarks.shift_report --days 365 --repeat 20
+"""
+
+import argparse
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List
+from zoneinfo import ZoneInfo
+
+from bot.shift_manager import DEFAULT_TZ, ShiftRecord, _closed_summary, calculate_summary
+from bot.shift_report import ShiftArrays, build_report
+
+TARGET_HOURS = 8.0
+
+
+def _shifts(days: int) -> List[ShiftRecord]:
+    tz = ZoneInfo(DEFAULT_TZ)
+    first = date.today() - timedelta(days=days - 1)
+    shifts = []
+    for i in range(days):
+        day = first + timedelta(days=i)
+        if day.weekday() >= 5 and i % 3:
+            continue
+        start = int(datetime(day.year, day.month, day.day, 8 + i % 3, 7 * (i % 5), tzinfo=tz).timestamp())
+        # Entrada, almoco, volta, cafe, volta, saida; de vez em quando passa da meia-noite.
+        spans = [4 * 3600, 3600, 2 * 3600, 900, (2 + (i % 7 == 0) * 12) * 3600 + 60 * (i % 50)]
+        timestamps = [start]
+        for span in spans:
+            timestamps.append(timestamps[-1] + span)
+        shifts.append(ShiftRecord(f"shift-{i}", day.isoformat(), "", day.isoformat(), timestamps, DEFAULT_TZ))
+    return shifts
+
+
+def _report_loop(shifts: List[ShiftRecord], start: date, end: date) -> Dict[str, Any]:
+    # Comportamento anterior: um calculate_summary por turno (sem cache) e somas em dicts.
+    _closed_summary.cache_clear()
+    tz = ZoneInfo(DEFAULT_TZ)
+    day_work: Dict[date, int] = {}
+    total_pause = pauses = 0
+    for shift in shifts:
+        day = datetime.fromtimestamp(shift.timestamps[0], tz).date()
+        if not start <= day <= end:
+            continue
+        summary = calculate_summary(shift)
+        day_work[day] = day_work.get(day, 0) + summary["total_work_min"]
+        total_pause += summary["total_pause_min"]
+        pauses += len(summary["pauses"])
+    weekday = [0] * 7
+    overtime = 0
+    for day, minutes in day_work.items():
+        weekday[day.weekday()] += minutes
+        overtime += max(0, minutes - (TARGET_HOURS * 60 if day.weekday() < 5 else 0))
+    return {"total": sum(day_work.values()), "pause": total_pause, "pauses": pauses, "overtime": overtime}
+
+
+def _measure(repeat: int, fn: Callable[[], Any]) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(label: str, samples: List[float]) -> None:
+    print(f"{label:<22} mean={statistics.mean(samples):8.3f}ms  min={min(samples):8.3f}ms")
+
+
+def main(days: int, repeat: int) -> None:
+    shifts = _shifts(days)
+    end = date.today()
+    start = end - timedelta(days=days - 1)
+    now = time.time()
+
+    print(f"{len(shifts)} shifts over {days} days, {repeat} runs")
+    _report("arrays build", _measure(repeat, lambda: ShiftArrays.from_shifts(shifts, DEFAULT_TZ)))
+    arrays = ShiftArrays.from_shifts(shifts, DEFAULT_TZ)
+    _report("report loop", _measure(repeat, lambda: _report_loop(shifts, start, end)))
+    _report("report vectorized", _measure(repeat, lambda: build_report(arrays, start, end, TARGET_HOURS, now)))
+
+    legacy = _report_loop(shifts, start, end)
+    report = build_report(arrays, start, end, TARGET_HOURS, now)
+    assert (legacy["total"], legacy["pause"], legacy["pauses"], legacy["overtime"]) == (
+        report.total_work_min,
+        report.total_pause_min,
+        report.pause_count,
+        report.overtime_min,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.days, args.repeat)
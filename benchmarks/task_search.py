@@ -0,0 +1,84 @@
+"""Mede a busca de tarefas do !start-timer/!edit-task sobre N tarefas sinteticas.
+
+Compara o TaskIndex (trigramas) com uma varredura linear normalizando cada nome:
+
+    python -m benchmarks.task_search --tasks 10000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, List
+
+from bot.notion_parser import TaskRecord
+from bot.task_index import TaskIndex, normalize
+
+WORDS = (
+    "relatorio", "cliente", "reuniao", "site", "revisao", "contrato", "deploy", "design",
+    "orcamento", "proposta", "bug", "landing", "api", "banco", "estudo", "planejamento",
+)
+CATEGORIES = ("freela", "estudo", "casa", "trabalho", "urgente")
+QUERIES = ("rel", "cliente acme", "deploy api", "orcamneto", "f", "freela", "proposta 42", "xyz")
+
+
+def _tasks(count: int) -> List[TaskRecord]:
+    rng = random.Random(42)
+    return [
+        TaskRecord(
+            id=f"page-{i:05d}",
+            name=f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {rng.choice(('Acme', 'Globex', 'Initech'))} {i}",
+            url="",
+            property_due=None,
+            property_description="",
+            property_status="Not started",
+            property_categories=[rng.choice(CATEGORIES)],
+            property_time_min=None,
+            is_freela=False,
+            last_edited_time=None,
+        )
+        for i in range(count)
+    ]
+
+
+def _scan(tasks: List[TaskRecord], query: str) -> List[str]:
+    # Alternativa sem indice: normaliza e confere cada tarefa a cada busca.
+    words = normalize(query).split()
+    hits = []
+    for task in tasks:
+        text = " " + " ".join([normalize(task.name), *map(normalize, task.property_categories)])
+        if all(f" {word}" in text for word in words):
+            hits.append(task.id)
+    return hits[:25]
+
+
+def _measure(repeat: int, fn: Callable[[], object]) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main(count: int, repeat: int) -> None:
+    tasks = _tasks(count)
+    index = TaskIndex()
+    started = time.perf_counter()
+    index.rebuild(tasks)
+    print(f"{count} tasks, index built in {(time.perf_counter() - started) * 1000:.0f}ms, {repeat} runs per query")
+    for query in QUERIES:
+        indexed = _measure(repeat, lambda: index.search(query))
+        scanned = _measure(repeat, lambda: _scan(tasks, query))
+        print(
+            f"{query!r:<16} hits={len(index.search(query)):>2}  "
+            f"index={statistics.median(indexed):7.3f}ms  scan={statistics.median(scanned):7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.tasks, args.repeat)
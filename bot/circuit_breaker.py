@@ -0,0 +1,146 @@
+import logging
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Callable, Deque, Optional
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker classico: closed -> open apos N falhas seguidas,
+    open -> half_open apos reset_timeout, half_open deixa passar uma unica sonda."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._name = name
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == STATE_OPEN and self._clock() >= self._open_until:
+            return STATE_HALF_OPEN
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == STATE_OPEN
+
+    @property
+    def retry_in(self) -> float:
+        """Segundos ate o circuito aceitar uma nova tentativa (0 se ja aceita)."""
+        if self._state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self._open_until - self._clock())
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_OPEN or self._probe_in_flight:
+            return False
+        if self._state != STATE_HALF_OPEN:
+            self._transition(STATE_HALF_OPEN)
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        self._failures = 0
+        if self._state != STATE_CLOSED:
+            self._transition(STATE_CLOSED)
+
+    def record_failure(self, retry_after: Optional[float] = None) -> None:
+        self._probe_in_flight = False
+        self._failures += 1
+        if self._state == STATE_HALF_OPEN or self._failures >= self._failure_threshold:
+            self._open_until = self._clock() + max(self._reset_timeout, retry_after or 0.0)
+            self._transition(STATE_OPEN)
+
+    def release_probe(self) -> None:
+        """Libera a sonda do half_open quando ela e cancelada sem resultado."""
+        self._probe_in_flight = False
+
+    def _transition(self, state: str) -> None:
+        previous, self._state = self._state, state
+        self._logger.warning(
+            "Circuit breaker state changed",
+            extra={
+                "context": {
+                    "circuit": self._name,
+                    "from": previous,
+                    "to": state,
+                    "failures": self._failures,
+                    "retry_in": round(self.retry_in, 1),
+                }
+            },
+        )
+
+
+class RetryBudget:
+    """Limita retries a uma fracao das requisicoes recentes (janela deslizante),
+    com um piso minimo por segundo para trafego baixo."""
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_retries_per_second: float = 1.0,
+        window_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ratio = ratio
+        self._min_retries = min_retries_per_second * window_seconds
+        self._window = window_seconds
+        self._clock = clock
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def record_request(self) -> None:
+        self._requests.append(self._clock())
+
+    def try_spend(self) -> bool:
+        now = self._clock()
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self._window:
+                events.popleft()
+        allowed = max(self._min_retries, self._ratio * len(self._requests))
+        if len(self._retries) >= allowed:
+            return False
+        self._retries.append(now)
+        return True
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff com full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
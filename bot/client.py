@@ -1,8 +1,10 @@
 import asyncio
 import datetime as dt
 import logging
+import signal
+import time
 from datetime import datetime, timezone
-from typing import Optional, Set
+from typing import AsyncIterator, List, Optional, Set
 from zoneinfo import ZoneInfo
 
 import discord
@@ -11,20 +13,29 @@ from discord.ext import tasks
 from .calendar_listener import CalendarListener
 from .julgar_listener import JulgarListener
 from .notion_client import NotionClient
+from .notion_parser import TaskRecord
 from .shift_manager import (
     calculate_summary,
     format_duration,
     build_history_line,
     is_shift_open,
     now_local,
-    now_timestamp,
     parse_shift_page,
-    serialize_entries,
 )
-from .shift_views import ShiftEditView
+from .shift_history import ShiftHistory, shift_cursor
+from .shift_report import WEEKDAY_NAMES, ShiftReport, build_report, parse_report_period
+from .shift_state import ShiftState
+from .shift_views import SHIFTS_PAGE_SIZE, ShiftEditView, ShiftsPageView, build_shifts_embed
+from .task_index import TaskIndex
+from .task_mirror import TaskMirror
 from .task_views import StartTimerFromListView, StatusSelectView, StopTimerSelectView
+from .time_ledger import TimeLedger
 from .timer_manager import TimerManager
 from .voice_listener import VoiceListener
+from .voice_stats import start_of_week
+
+# Limite de um select do Discord: a busca devolve no maximo isso, os mais relevantes primeiro.
+TASK_SEARCH_LIMIT = 25
 
 STATUS_INDICATORS = {
     "Not started": "⬜",
@@ -45,15 +56,15 @@ def _build_help_embed() -> discord.Embed:
             "`!tasks-freela` — Filtra e exibe apenas tarefas marcadas com a categoria **freela**\n"
             "`!create-task` — Cria uma nova tarefa via fluxo conversacional "
             "(nome, descrição, categorias do Notion e status)\n"
-            "`!edit-task` — Edita as categorias de uma tarefa existente "
-            "(adicionar, remover ou substituir categorias do Notion)\n"
+            "`!edit-task [busca]` — Edita as categorias de uma tarefa existente "
+            "(adicionar, remover ou substituir categorias do Notion); com busca, lista só as tarefas que batem\n"
         ),
         inline=False,
     )
     embed.add_field(
         name="⏱️ Cronômetro",
         value=(
-            "`!start-timer` — Inicia cronômetro para uma tarefa existente\n"
+            "`!start-timer [busca]` — Inicia cronômetro para uma tarefa existente (busca por nome ou categoria)\n"
             "`!stop-timer` — Para um cronômetro ativo e registra o tempo no Notion"
         ),
         inline=False,
@@ -62,11 +73,18 @@ def _build_help_embed() -> discord.Embed:
         name="🕐 Turnos",
         value=(
             "`!shift` — Registra entrada/saída (alterna automático)\n"
-            "`!shifts` — Lista turnos recentes com resumo de horas e pausas\n"
+            "`!shifts` — Lista turnos com resumo de horas e pausas, em páginas (◀️ ▶️)\n"
+            "`!shifts-report [week|month|custom AAAA-MM-DD AAAA-MM-DD]` — Horas trabalhadas, pausas, "
+            "saldo contra a meta diária e distribuição por dia da semana\n"
             "`!shift-edit` — Editar entradas do último turno"
         ),
         inline=False,
     )
+    embed.add_field(
+        name="🔊 Voz",
+        value="`!voice-stats` — Top usuários da semana e pico de pessoas por canal de voz",
+        inline=False,
+    )
     embed.add_field(
         name="⚙️ Config",
         value=(
@@ -105,6 +123,13 @@ def _embed_warning(description: str) -> discord.Embed:
     return discord.Embed(description=description, color=discord.Color.orange())
 
 
+def _mark_offline(embed: discord.Embed, notice: str) -> discord.Embed:
+    """Acrescenta o aviso de Notion indisponivel no rodape, antes do texto que ja existir."""
+    current = embed.footer.text if embed.footer else None
+    embed.set_footer(text=f"{notice}\n{current}" if current else notice)
+    return embed
+
+
 class VoiceWatcherClient(discord.Client):
     def __init__(
         self,
@@ -115,6 +140,11 @@ class VoiceWatcherClient(discord.Client):
         calendar_listener: Optional[CalendarListener] = None,
         target_user_id: Optional[int] = None,
         tz_name: str = "America/Sao_Paulo",
+        task_mirror: Optional[TaskMirror] = None,
+        time_ledger: Optional[TimeLedger] = None,
+        shift_state: Optional[ShiftState] = None,
+        shift_history: Optional[ShiftHistory] = None,
+        shift_target_hours: float = 8.0,
     ) -> None:
         intents = discord.Intents.none()
         intents.guilds = True
@@ -129,12 +159,22 @@ class VoiceWatcherClient(discord.Client):
         self._voice_listener = voice_listener
         self._julgar_listener = julgar_listener
         self._notion_client = notion_client
+        self._task_mirror = task_mirror
+        self._time_ledger = time_ledger
+        if self._time_ledger is None and notion_client is not None:
+            self._time_ledger = TimeLedger(notion_client, task_mirror)
+        self._shift_state = shift_state
+        if self._shift_state is None and notion_client is not None:
+            self._shift_state = ShiftState(notion_client, tz_name=tz_name)
+        self._shift_history = shift_history
+        if self._shift_state is not None and self._shift_history is not None:
+            self._shift_state.add_listener(self._shift_history.apply)
+        self._shift_target_hours = shift_target_hours
         self._timer_manager = timer_manager or TimerManager()
         self._calendar_listener = calendar_listener
         self._target_user_id = target_user_id
         self._tz_name = tz_name
         self._tz = ZoneInfo(tz_name)
-        self._status_options_cache: Optional[list] = None
         self._dm_log_subscribers: Set[int] = set()
 
         self._daily_reminders = tasks.loop(time=[
@@ -145,16 +185,52 @@ class VoiceWatcherClient(discord.Client):
         self._daily_reminders.before_loop(self._wait_until_ready)
 
     async def _get_status_options(self) -> list:
-        if self._status_options_cache:
-            return self._status_options_cache
+        # O NotionClient guarda o schema com TTL: opcoes novas no Notion aparecem sem reiniciar o bot.
         if self._notion_client:
             try:
-                self._status_options_cache = await self._notion_client.fetch_status_options()
+                return await self._notion_client.fetch_status_options()
             except Exception:
-                self._status_options_cache = ["Not started", "In progress", "Done"]
-        else:
-            self._status_options_cache = ["Not started", "In progress", "Done"]
-        return self._status_options_cache
+                pass
+        return ["Not started", "In progress", "Done"]
+
+    @property
+    def _task_source(self):
+        """Mirror local quando habilitado; senao, consulta direta ao Notion."""
+        return self._task_mirror or self._notion_client
+
+    async def _find_tasks(self, query: str) -> List[TaskRecord]:
+        """Todas as tarefas, ou as que batem com a busca (indice do mirror quando habilitado)."""
+        if self._task_mirror is not None:
+            if query:
+                return await self._task_mirror.search(query, limit=TASK_SEARCH_LIMIT)
+            return await self._task_mirror.fetch_tasks()
+        tasks = await self._notion_client.fetch_tasks()
+        if not query:
+            return tasks
+        index = TaskIndex()
+        index.rebuild(tasks)
+        by_id = {task.id: task for task in tasks}
+        return [by_id[task_id] for task_id in index.search(query, limit=TASK_SEARCH_LIMIT)]
+
+    def _stale_notice(self, saved_at: Optional[float]) -> str:
+        if saved_at is None:
+            return "⚠️ Notion indisponível — mostrando dados salvos"
+        saved = datetime.fromtimestamp(saved_at, self._tz).strftime("%d/%m %H:%M")
+        return f"⚠️ Notion indisponível — mostrando dados salvos em {saved}"
+
+    def _tasks_stale_notice(self) -> Optional[str]:
+        if self._task_mirror is None or not self._task_mirror.stale:
+            return None
+        return self._stale_notice(self._task_mirror.updated_at)
+
+    def _shifts_stale_notice(self) -> Optional[str]:
+        saved_at = self._notion_client.shifts_stale_since
+        return self._stale_notice(saved_at) if saved_at is not None else None
+
+    def _queued_notice(self) -> Optional[str]:
+        if not self._notion_client.degraded:
+            return None
+        return "⚠️ Notion indisponível — registro salvo, será enviado quando ele voltar"
 
     # ------------------------------------------------------------------
     # Events
@@ -168,10 +244,48 @@ class VoiceWatcherClient(discord.Client):
         )
         await self._log_monitored_channel_status()
         await self._log_julgar_channel_status()
+        # on_ready roda de novo apos reconexoes: ressincroniza a presenca de voz.
+        await self._voice_listener.seed_presence(self.guilds)
 
         if not self._daily_reminders.is_running():
             self._daily_reminders.start()
 
+    async def setup_hook(self) -> None:
+        await self._voice_listener.start()
+        if self._notion_client is not None:
+            await self._notion_client.start()
+        if self._task_mirror is not None:
+            await self._task_mirror.start()
+        if self._time_ledger is not None:
+            await self._time_ledger.start()
+        if self._shift_state is not None:
+            await self._shift_state.start()
+        if self._shift_history is not None:
+            await self._shift_history.start()
+        try:
+            # docker stop envia SIGTERM: fecha com calma para nao perder eventos em fila.
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.create_task(self.close())
+            )
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    async def close(self) -> None:
+        try:
+            await super().close()
+        finally:
+            await self._voice_listener.aclose()
+            if self._task_mirror is not None:
+                await self._task_mirror.stop()
+            if self._time_ledger is not None:
+                await self._time_ledger.stop()
+            if self._shift_state is not None:
+                await self._shift_state.stop()
+            if self._shift_history is not None:
+                await self._shift_history.stop()
+            if self._notion_client is not None:
+                await self._notion_client.aclose()
+
     async def on_voice_state_update(
         self,
         member: discord.Member,
@@ -193,8 +307,10 @@ class VoiceWatcherClient(discord.Client):
     _BOT_COMMANDS = frozenset({
         "!help", "!tasks", "!tasks-pending", "!tasks-freela", "!create-task",
         "!edit-task", "!start-timer", "!stop-timer", "!shift", "!shifts",
-        "!shift-edit", "!servers", "!logs on", "!logs off",
+        "!shift-edit", "!servers", "!voice-stats", "!logs on", "!logs off",
     })
+    # Comandos que aceitam um texto depois do nome (busca, periodo).
+    _QUERY_COMMANDS = frozenset({"!edit-task", "!start-timer", "!shifts-report"})
 
     async def on_message(self, message: discord.Message) -> None:
         if message.author.bot:
@@ -205,6 +321,10 @@ class VoiceWatcherClient(discord.Client):
         if cmd in self._BOT_COMMANDS:
             await self._handle_command(message, cmd)
             return
+        name, _, query = cmd.partition(" ")
+        if name in self._QUERY_COMMANDS:
+            await self._handle_command(message, name, query.strip())
+            return
 
         if not isinstance(message.channel, discord.DMChannel):
             await self._julgar_listener.handle_message(self, message)
@@ -215,7 +335,7 @@ class VoiceWatcherClient(discord.Client):
     # Command router (works in DMs and server channels)
     # ------------------------------------------------------------------
 
-    async def _handle_command(self, message: discord.Message, cmd: str) -> None:
+    async def _handle_command(self, message: discord.Message, cmd: str, query: str = "") -> None:
         if cmd == "!help":
             await message.channel.send(embed=_build_help_embed())
         elif cmd == "!tasks":
@@ -232,10 +352,10 @@ class VoiceWatcherClient(discord.Client):
             await self._handle_create_task_dm(message)
         elif cmd == "!edit-task":
             await self._notify_dm_log(message, "!edit-task")
-            await self._handle_edit_task_dm(message)
+            await self._handle_edit_task_dm(message, query)
         elif cmd == "!start-timer":
             await self._notify_dm_log(message, "!start-timer")
-            await self._handle_start_timer_dm(message)
+            await self._handle_start_timer_dm(message, query)
         elif cmd == "!stop-timer":
             await self._notify_dm_log(message, "!stop-timer")
             await self._handle_stop_timer_dm(message)
@@ -245,12 +365,18 @@ class VoiceWatcherClient(discord.Client):
         elif cmd == "!shifts":
             await self._notify_dm_log(message, "!shifts")
             await self._handle_shifts(message)
+        elif cmd == "!shifts-report":
+            await self._notify_dm_log(message, "!shifts-report")
+            await self._handle_shifts_report(message, query)
         elif cmd == "!shift-edit":
             await self._notify_dm_log(message, "!shift-edit")
             await self._handle_shift_edit(message)
         elif cmd == "!servers":
             await self._notify_dm_log(message, "!servers")
             await self._handle_servers_dm(message)
+        elif cmd == "!voice-stats":
+            await self._notify_dm_log(message, "!voice-stats")
+            await self._handle_voice_stats(message)
         elif cmd == "!logs on":
             self._dm_log_subscribers.add(message.author.id)
             await message.channel.send(embed=_embed_success("✅ Logs ativados", "Você receberá notificações de comandos no DM."))
@@ -304,70 +430,113 @@ class VoiceWatcherClient(discord.Client):
             await message.channel.send(embeds=embeds[i : i + 10])
 
     # ------------------------------------------------------------------
-    # !tasks
+    # !voice-stats
     # ------------------------------------------------------------------
 
-    async def _handle_tasks_dm(self, message: discord.Message) -> None:
-        if not self._notion_client:
-            await message.channel.send(embed=_embed_error("❌ Notion não configurado", "Defina `NOTION_TOKEN` e `NOTION_DATABASE_ID`."))
+    async def _handle_voice_stats(self, message: discord.Message) -> None:
+        stats = self._voice_listener.stats
+        if stats is None:
+            await message.channel.send(embed=_embed_error("❌ Estatísticas de voz desativadas", "Defina `VOICE_STATS_ENABLED=true`."))
             return
 
+        # Na DM, so os servidores em que quem pediu tambem esta.
+        guilds = [message.guild] if message.guild else list(message.author.mutual_guilds)
+        if not guilds:
+            await message.channel.send(embed=_embed_error("❌ Nenhum servidor em comum", "Use o comando num servidor em que o bot esteja."))
+            return
+        guild_ids = [guild.id for guild in guilds]
+        since = start_of_week(datetime.now(self._tz))
         try:
-            tasks = await self._notion_client.fetch_tasks()
+            top_users = await stats.top_users(guild_ids, since)
+            peaks = await stats.peak_concurrency(guild_ids, since)
         except Exception as exc:
-            self._logger.error("Failed to fetch Notion tasks", extra={"context": {"error": str(exc)}})
-            await message.channel.send(embed=_embed_error("❌ Erro ao buscar tarefas", f"```{exc}```"))
+            self._logger.error("Failed to query voice stats", extra={"context": {"error": str(exc)}})
+            await message.channel.send(embed=_embed_error("❌ Erro ao consultar estatísticas", f"```{exc}```"))
             return
 
-        if not tasks:
-            await message.channel.send(embed=_embed_info("Nenhuma tarefa encontrada no banco de dados."))
-            return
+        embed = discord.Embed(
+            title="🔊 Estatísticas de voz da semana",
+            description=f"Desde {since.strftime('%d/%m')}"
+            + ("" if message.guild else f" · {', '.join(guild.name for guild in guilds)}"),
+            color=discord.Color.blurple(),
+            timestamp=datetime.now(timezone.utc),
+        )
+        top_lines = [
+            f"`{i}.` <@{user_id}> — `{format_duration(int(seconds // 60))}`"
+            for i, (user_id, seconds) in enumerate(top_users, start=1)
+        ]
+        embed.add_field(name="🏆 Top usuários", value="\n".join(top_lines) or "Sem dados ainda.", inline=False)
+        peak_lines = [
+            f"<#{channel_id}> — **{peak}** pessoa(s) · {datetime.fromtimestamp(hour, self._tz).strftime('%d/%m %Hh')}"
+            for channel_id, peak, hour in peaks[:15]
+        ]
+        embed.add_field(name="📈 Pico por canal", value="\n".join(peak_lines) or "Sem dados ainda.", inline=False)
+        await message.channel.send(embed=embed)
 
-        embeds = self._build_task_embeds(tasks)
-        for i in range(0, len(embeds), 10):
-            await message.channel.send(embeds=embeds[i : i + 10])
+    # ------------------------------------------------------------------
+    # !tasks
+    # ------------------------------------------------------------------
 
-    async def _handle_tasks_pending_dm(self, message: discord.Message) -> None:
+    async def _handle_tasks_dm(self, message: discord.Message) -> None:
         if not self._notion_client:
             await message.channel.send(embed=_embed_error("❌ Notion não configurado", "Defina `NOTION_TOKEN` e `NOTION_DATABASE_ID`."))
             return
 
-        try:
-            tasks = await self._notion_client.fetch_tasks()
-        except Exception as exc:
-            self._logger.error("Failed to fetch Notion tasks", extra={"context": {"error": str(exc)}})
-            await message.channel.send(embed=_embed_error("❌ Erro ao buscar tarefas", f"```{exc}```"))
-            return
+        sent = await self._send_task_stream(message.channel, self._task_source.iter_task_pages())
+        if sent == 0:
+            await message.channel.send(embed=_embed_info("Nenhuma tarefa encontrada no banco de dados."))
 
-        pending = [t for t in tasks if (t.get("property_status") or "").lower() != "done"]
-        if not pending:
-            await message.channel.send(embed=_embed_info("Todas as tarefas estão concluídas! 🎉"))
+    async def _handle_tasks_pending_dm(self, message: discord.Message) -> None:
+        if not self._notion_client:
+            await message.channel.send(embed=_embed_error("❌ Notion não configurado", "Defina `NOTION_TOKEN` e `NOTION_DATABASE_ID`."))
             return
 
-        embeds = self._build_task_embeds(pending, title_prefix="📋 Tarefas pendentes")
-        for i in range(0, len(embeds), 10):
-            await message.channel.send(embeds=embeds[i : i + 10])
+        sent = await self._send_task_stream(
+            message.channel,
+            self._task_source.iter_pending_task_pages(),
+            title_prefix="📋 Tarefas pendentes",
+        )
+        if sent == 0:
+            await message.channel.send(embed=_embed_info("Todas as tarefas estão concluídas! 🎉"))
 
     async def _handle_tasks_freela_dm(self, message: discord.Message) -> None:
         if not self._notion_client:
             await message.channel.send(embed=_embed_error("❌ Notion não configurado", "Defina `NOTION_TOKEN` e `NOTION_DATABASE_ID`."))
             return
 
-        try:
-            tasks = await self._notion_client.fetch_tasks()
-        except Exception as exc:
-            self._logger.error("Failed to fetch freela tasks", extra={"context": {"error": str(exc)}})
-            await message.channel.send(embed=_embed_error("❌ Erro ao buscar tarefas", f"```{exc}```"))
-            return
-
-        freela_tasks = [task for task in tasks if task.get("is_freela")]
-        if not freela_tasks:
+        sent = await self._send_task_stream(
+            message.channel,
+            self._task_source.iter_freela_task_pages(),
+            title_prefix="💼 Tarefas Freela",
+        )
+        if sent == 0:
             await message.channel.send(embed=_embed_info("Nenhuma tarefa com categoria `freela` foi encontrada."))
-            return
 
-        embeds = self._build_task_embeds(freela_tasks, title_prefix="💼 Tarefas Freela")
-        for i in range(0, len(embeds), 10):
-            await message.channel.send(embeds=embeds[i : i + 10])
+    async def _send_task_stream(
+        self,
+        channel: discord.abc.Messageable,
+        pages: AsyncIterator[List[TaskRecord]],
+        title_prefix: str = "📋 Tarefas Notion",
+    ) -> Optional[int]:
+        """Envia os embeds a medida que cada pagina do Notion chega. Retorna quantas tarefas foram enviadas."""
+        sent = 0
+        try:
+            async for tasks in pages:
+                if not tasks:
+                    continue
+                embeds = self._build_task_embeds(tasks, title_prefix=title_prefix, offset=sent)
+                notice = self._tasks_stale_notice()
+                if notice:
+                    for embed in embeds:
+                        _mark_offline(embed, notice)
+                for i in range(0, len(embeds), 10):
+                    await channel.send(embeds=embeds[i : i + 10])
+                sent += len(tasks)
+        except Exception as exc:
+            self._logger.error("Failed to fetch Notion tasks", extra={"context": {"error": str(exc), "sent": sent}})
+            await channel.send(embed=_embed_error("❌ Erro ao buscar tarefas", f"```{exc}```"))
+            return None
+        return sent
 
     # ------------------------------------------------------------------
     # !create-task (conversational flow)
@@ -487,20 +656,23 @@ class VoiceWatcherClient(discord.Client):
             seen.add(key)
         return deduped
 
-    async def _handle_edit_task_dm(self, message: discord.Message) -> None:
+    async def _handle_edit_task_dm(self, message: discord.Message, query: str = "") -> None:
         if not self._notion_client:
             await message.channel.send(embed=_embed_error("❌ Notion não configurado", "Defina `NOTION_TOKEN` e `NOTION_DATABASE_ID`."))
             return
 
         try:
-            tasks = await self._notion_client.fetch_tasks()
+            tasks = await self._find_tasks(query)
             category_options = await self._notion_client.fetch_category_options()
         except Exception as exc:
             await message.channel.send(embed=_embed_error("❌ Erro ao carregar tarefas/categorias", f"```{exc}```"))
             return
 
         if not tasks:
-            await message.channel.send(embed=_embed_info("Nenhuma tarefa encontrada para editar."))
+            if query:
+                await message.channel.send(embed=_embed_info(f"Nenhuma tarefa encontrada para `{query}`."))
+            else:
+                await message.channel.send(embed=_embed_info("Nenhuma tarefa encontrada para editar."))
             return
         if not category_options:
             await message.channel.send(embed=_embed_warning("Não foi possível identificar categorias configuradas no Notion."))
@@ -513,7 +685,10 @@ class VoiceWatcherClient(discord.Client):
             return m.author.id == author.id and m.channel.id == channel.id
 
         task_lines = [f"`{i}` — {task['name']}" for i, task in enumerate(tasks[:25], start=1)]
-        await channel.send(embed=_embed_info("Escolha a tarefa para editar:\n" + "\n".join(task_lines)))
+        prompt = "Escolha a tarefa para editar:\n" + "\n".join(task_lines)
+        if len(tasks) > 25 and not query:
+            prompt += f"\n\nMostrando 25 de {len(tasks)}. Use `!edit-task <busca>` para achar as demais."
+        await channel.send(embed=_embed_info(prompt))
         try:
             task_answer = await self.wait_for("message", check=check, timeout=120)
         except asyncio.TimeoutError:
@@ -593,20 +768,23 @@ class VoiceWatcherClient(discord.Client):
     # !start-timer (existing tasks)
     # ------------------------------------------------------------------
 
-    async def _handle_start_timer_dm(self, message: discord.Message) -> None:
+    async def _handle_start_timer_dm(self, message: discord.Message, query: str = "") -> None:
         if not self._notion_client:
             await message.channel.send(embed=_embed_error("❌ Notion não configurado"))
             return
 
         try:
-            task_list = await self._notion_client.fetch_tasks()
+            task_list = await self._find_tasks(query)
         except Exception as exc:
             self._logger.error("Failed to fetch tasks for timer", extra={"context": {"error": str(exc)}})
             await message.channel.send(embed=_embed_error("❌ Erro ao buscar tarefas", f"```{exc}```"))
             return
 
         if not task_list:
-            await message.channel.send(embed=_embed_info("Nenhuma tarefa encontrada no Notion."))
+            if query:
+                await message.channel.send(embed=_embed_info(f"Nenhuma tarefa encontrada para `{query}`."))
+            else:
+                await message.channel.send(embed=_embed_info("Nenhuma tarefa encontrada no Notion."))
             return
 
         view = StartTimerFromListView(
@@ -614,9 +792,15 @@ class VoiceWatcherClient(discord.Client):
             tasks_list=task_list,
         )
 
+        if query:
+            description = f"**{len(task_list)}** tarefa(s) para `{query}`:"
+        else:
+            description = f"Selecione uma das **{len(task_list)}** tarefas abaixo:"
+            if len(task_list) > 25:
+                description += "\nMostrando as 25 primeiras. Use `!start-timer <busca>` para achar as demais."
         embed = discord.Embed(
             title="⏱️ Iniciar cronômetro",
-            description=f"Selecione uma das **{len(task_list)}** tarefas abaixo:",
+            description=description,
             color=discord.Color.blurple(),
         )
         await message.channel.send(embed=embed, view=view)
@@ -641,6 +825,7 @@ class VoiceWatcherClient(discord.Client):
             timer_manager=self._timer_manager,
             status_options=status_options,
             user_id=message.author.id,
+            time_ledger=self._time_ledger,
         )
 
         embed = discord.Embed(
@@ -662,34 +847,21 @@ class VoiceWatcherClient(discord.Client):
             await message.channel.send(embed=_embed_error("❌ Notion não configurado"))
             return
 
+        local_now = now_local(self._tz_name)
+        now = local_now.strftime("%H:%M")
+        today = local_now.strftime("%Y-%m-%d")
+
+        # Estado local do turno: a batida e so a escrita, sem ler o Notion antes.
         try:
-            raw_pages = await self._notion_client.fetch_shifts(limit=1)
+            shift, created = await self._shift_state.punch(local_now, name=today)
         except Exception as exc:
-            await message.channel.send(embed=_embed_error("❌ Erro ao buscar turnos", f"```{exc}```"))
+            await message.channel.send(embed=_embed_error("❌ Erro ao registrar turno", f"```{exc}```"))
             return
 
-        now = now_timestamp(self._tz_name)
-        today = now_local(self._tz_name).strftime("%Y-%m-%d")
-
-        open_shift = None
-        if raw_pages:
-            shift = parse_shift_page(raw_pages[0])
-            if shift["is_open"]:
-                open_shift = shift
-
-        if open_shift:
-            entries = list(open_shift["entries"])
-            entries.append(now)
-            new_json = serialize_entries(entries)
-
-            try:
-                await self._notion_client.update_shift_entries(open_shift["id"], new_json)
-            except Exception as exc:
-                await message.channel.send(embed=_embed_error("❌ Erro ao atualizar turno", f"```{exc}```"))
-                return
-
+        if not created:
+            entries = shift["entries"]
             still_open = is_shift_open(entries)
-            summary = calculate_summary(entries, self._tz_name)
+            summary = calculate_summary(shift)
 
             if still_open:
                 color = discord.Color.green()
@@ -699,7 +871,7 @@ class VoiceWatcherClient(discord.Client):
                 status_text = "🟠 Pausa / Encerrado"
 
             embed = discord.Embed(
-                title=f"Turno {open_shift['name']}",
+                title=f"Turno {shift['name']}",
                 color=color,
                 timestamp=datetime.now(timezone.utc),
             )
@@ -721,23 +893,12 @@ class VoiceWatcherClient(discord.Client):
                     inline=False,
                 )
             embed.set_footer(text="Use !shift para registrar próxima entrada")
+            notice = self._queued_notice() or self._shifts_stale_notice()
+            if notice:
+                _mark_offline(embed, notice)
             await message.channel.send(embed=embed)
 
         else:
-            first_entry = [now]
-            entries_json = serialize_entries(first_entry)
-            shift_start = now_local(self._tz_name).isoformat()
-
-            try:
-                page = await self._notion_client.create_shift(
-                    name=today,
-                    shift_start=shift_start,
-                    entries_json=entries_json,
-                )
-            except Exception as exc:
-                await message.channel.send(embed=_embed_error("❌ Erro ao criar turno", f"```{exc}```"))
-                return
-
             embed = discord.Embed(
                 title=f"Turno {today}",
                 description="Novo turno iniciado!",
@@ -747,10 +908,13 @@ class VoiceWatcherClient(discord.Client):
             embed.add_field(name="Status", value="🟢 Trabalhando", inline=True)
             embed.add_field(name="Entrada", value=f"`{now}`", inline=True)
             embed.set_footer(text="Use !shift para registrar pausa ou saída")
+            notice = self._queued_notice() or self._shifts_stale_notice()
+            if notice:
+                _mark_offline(embed, notice)
             await message.channel.send(embed=embed)
 
     # ------------------------------------------------------------------
-    # !shifts — list recent shifts
+    # !shifts — paginated shift history
     # ------------------------------------------------------------------
 
     async def _handle_shifts(self, message: discord.Message) -> None:
@@ -758,8 +922,19 @@ class VoiceWatcherClient(discord.Client):
             await message.channel.send(embed=_embed_error("❌ Notion não configurado"))
             return
 
+        if self._shift_history is not None and self._shift_history.ready:
+            shifts, next_cursor = await self._shift_history.page(limit=SHIFTS_PAGE_SIZE)
+            if not shifts:
+                await message.channel.send(embed=_embed_info("Nenhum turno registrado ainda."))
+                return
+            view = ShiftsPageView(self._shift_history, shifts, next_cursor)
+            await message.channel.send(embed=view.embed(), view=view)
+            return
+
+        # Historico ainda vazio (ou desligado): a primeira pagina vem direto do Notion
+        # e o view ja busca a seguinte no historico enquanto esta e lida.
         try:
-            raw_pages = await self._notion_client.fetch_shifts(limit=10)
+            raw_pages = await self._notion_client.fetch_shifts(limit=SHIFTS_PAGE_SIZE + 1)
         except Exception as exc:
             await message.channel.send(embed=_embed_error("❌ Erro ao buscar turnos", f"```{exc}```"))
             return
@@ -768,28 +943,77 @@ class VoiceWatcherClient(discord.Client):
             await message.channel.send(embed=_embed_info("Nenhum turno registrado ainda."))
             return
 
-        shifts = [parse_shift_page(p) for p in raw_pages]
+        shifts = [parse_shift_page(p, self._tz_name) for p in raw_pages]
+        view = None
+        if self._shift_history is not None and len(shifts) > SHIFTS_PAGE_SIZE:
+            page = shifts[:SHIFTS_PAGE_SIZE]
+            view = ShiftsPageView(self._shift_history, page, shift_cursor(page[-1]))
+            embed = view.embed()
+        else:
+            embed = build_shifts_embed(shifts[:SHIFTS_PAGE_SIZE])
+        notice = self._shifts_stale_notice()
+        if notice:
+            _mark_offline(embed, notice)
+        await message.channel.send(embed=embed, view=view)
 
-        lines = []
-        for s in shifts:
-            summary = calculate_summary(s["entries"], self._tz_name)
-            status = "🟢 Aberto" if s["is_open"] else "⚪ Fechado"
-            work = format_duration(summary["total_work_min"])
-            pause_count = len(summary["pauses"])
-            pause_text = f"{pause_count} pausa(s)" if pause_count else "0 pausas"
-            if summary["total_pause_min"]:
-                pause_text += f" ({format_duration(summary['total_pause_min'])})"
-            if s["is_open"]:
-                work += " (parcial)"
-            lines.append(f"**{s['name']}** — `{work}` · {pause_text} · {status}")
+    # ------------------------------------------------------------------
+    # !shifts-report — totals over a period from the local shift history
+    # ------------------------------------------------------------------
+
+    async def _handle_shifts_report(self, message: discord.Message, query: str) -> None:
+        if not self._notion_client or self._shift_history is None:
+            await message.channel.send(embed=_embed_error("❌ Histórico de turnos não configurado"))
+            return
+
+        try:
+            label, start, end = parse_report_period(query, now_local(self._tz_name).date())
+        except ValueError as exc:
+            await message.channel.send(embed=_embed_error("❌ Período inválido", str(exc)))
+            return
 
+        try:
+            arrays = await self._shift_history.arrays()
+        except Exception as exc:
+            await message.channel.send(embed=_embed_error("❌ Erro ao buscar turnos", f"```{exc}```"))
+            return
+
+        report = build_report(arrays, start, end, self._shift_target_hours, time.time())
+        await message.channel.send(embed=self._build_shifts_report_embed(label, report))
+
+    def _build_shifts_report_embed(self, label: str, report: ShiftReport) -> discord.Embed:
         embed = discord.Embed(
-            title=f"📊 Turnos recentes ({len(shifts)})",
-            description="\n\n".join(lines),
+            title=f"📈 Relatório de turnos — {label}",
+            description=f"{report.start:%d/%m/%Y} a {report.end:%d/%m/%Y}",
             color=discord.Color.blurple(),
             timestamp=datetime.now(timezone.utc),
         )
-        await message.channel.send(embed=embed)
+        if not report.shifts:
+            embed.add_field(name="Turnos", value="Nenhum turno no período.", inline=False)
+            return embed
+
+        balance = report.balance_min
+        balance_text = format_duration(abs(balance))
+        embed.add_field(name="Trabalhado", value=f"`{format_duration(report.total_work_min)}`", inline=True)
+        embed.add_field(name="Meta", value=f"`{format_duration(report.target_min)}`", inline=True)
+        embed.add_field(name="Saldo", value=f"`{'+' if balance >= 0 else '-'}{balance_text}`", inline=True)
+        embed.add_field(name="Horas extras", value=f"`{format_duration(report.overtime_min)}`", inline=True)
+        embed.add_field(
+            name="Pausas",
+            value=f"{report.pause_count} · média `{format_duration(round(report.average_pause_min))}`",
+            inline=True,
+        )
+        embed.add_field(name="Dias / turnos", value=f"{report.days_worked} / {report.shifts}", inline=True)
+
+        lines = []
+        for name, minutes, days in zip(WEEKDAY_NAMES, report.weekday_work_min, report.weekday_days):
+            if days:
+                lines.append(
+                    f"**{name}** — `{format_duration(minutes)}` em {days} dia(s) · "
+                    f"média `{format_duration(minutes // days)}`"
+                )
+        embed.add_field(name="Por dia da semana", value="\n".join(lines), inline=False)
+        embed.set_footer(text=f"Meta: {self._shift_target_hours:g}h por dia útil (seg-sex)")
+        return embed
 
     # ------------------------------------------------------------------
     # !shift-edit — edit current/last shift
@@ -801,17 +1025,15 @@ class VoiceWatcherClient(discord.Client):
             return
 
         try:
-            raw_pages = await self._notion_client.fetch_shifts(limit=1)
+            shift = await self._shift_state.current()
         except Exception as exc:
             await message.channel.send(embed=_embed_error("❌ Erro ao buscar turnos", f"```{exc}```"))
             return
 
-        if not raw_pages:
+        if shift is None:
             await message.channel.send(embed=_embed_info("Nenhum turno encontrado para editar."))
             return
-
-        shift = parse_shift_page(raw_pages[0])
-        summary = calculate_summary(shift["entries"], self._tz_name)
+        summary = calculate_summary(shift)
         status = "🟢 Aberto" if shift["is_open"] else "⚪ Fechado"
 
         embed = discord.Embed(
@@ -821,9 +1043,12 @@ class VoiceWatcherClient(discord.Client):
         embed.add_field(name="Status", value=status, inline=True)
         embed.add_field(name="Trabalhado", value=f"`{format_duration(summary['total_work_min'])}`", inline=True)
         embed.add_field(name="Histórico", value=build_history_line(shift["entries"]) or "-", inline=False)
+        notice = self._shifts_stale_notice()
+        if notice:
+            _mark_offline(embed, notice)
 
         view = ShiftEditView(
-            notion_client=self._notion_client,
+            shift_state=self._shift_state,
             shift=shift,
         )
         await message.channel.send(embed=embed, view=view)
@@ -868,7 +1093,7 @@ class VoiceWatcherClient(discord.Client):
         )
 
         try:
-            task_list = await self._notion_client.fetch_tasks()
+            task_list = await self._task_source.fetch_tasks()
         except Exception:
             task_list = []
 
@@ -902,6 +1127,9 @@ class VoiceWatcherClient(discord.Client):
                 )
 
         embed.set_footer(text="Responda !shift para registrar ponto | !tasks para ver todas")
+        notice = self._tasks_stale_notice()
+        if task_list and notice:
+            _mark_offline(embed, notice)
         await dm.send(embed=embed)
 
     async def _send_lunch_out_reminder(self, dm: discord.DMChannel) -> None:
@@ -962,7 +1190,13 @@ class VoiceWatcherClient(discord.Client):
     # Embeds
     # ------------------------------------------------------------------
 
-    def _build_task_embeds(self, tasks: list, title_prefix: str = "📋 Tarefas Notion") -> list:
+    def _build_task_embeds(
+        self,
+        tasks: list,
+        title_prefix: str = "📋 Tarefas Notion",
+        offset: Optional[int] = None,
+    ) -> list:
+        """Com offset (streaming, total ainda desconhecido) o titulo mostra a faixa de tarefas."""
         chunk_size = 10
         embeds = []
 
@@ -987,12 +1221,16 @@ class VoiceWatcherClient(discord.Client):
                     line += "\n    💼 Fluxo freela"
                 lines.append(line)
 
-            total = len(tasks)
-            page = (i // chunk_size) + 1
-            total_pages = (total + chunk_size - 1) // chunk_size
-            title = f"{title_prefix} ({total})"
-            if total_pages > 1:
-                title += f" — página {page}/{total_pages}"
+            if offset is not None:
+                first = offset + i + 1
+                title = f"{title_prefix} ({first}–{first + len(chunk) - 1})"
+            else:
+                total = len(tasks)
+                page = (i // chunk_size) + 1
+                total_pages = (total + chunk_size - 1) // chunk_size
+                title = f"{title_prefix} ({total})"
+                if total_pages > 1:
+                    title += f" — página {page}/{total_pages}"
 
             embed = discord.Embed(
                 title=title,
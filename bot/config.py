@@ -12,10 +12,43 @@ class Settings:
     webhook_url: str
     julgar_channel_id: int
     webhook_secret: Optional[str] = None
+    webhook_max_connections: int = 10
+    webhook_max_keepalive_connections: int = 5
+    webhook_keepalive_expiry: float = 30.0
+    webhook_http2: bool = False
+    webhook_outbox_enabled: bool = True
+    webhook_outbox_max_attempts: int = 50
+    voice_join_debounce_seconds: float = 10.0
+    webhook_session_events: bool = False
+    voice_stats_enabled: bool = True
+    webhook_queue_size: int = 1000
+    webhook_workers: int = 4
+    webhook_queue_overflow: str = "spill"
+    webhook_batch_max_events: int = 1
+    webhook_batch_max_wait_ms: int = 200
+    webhook_circuit_failure_threshold: int = 5
+    webhook_circuit_reset_seconds: float = 30.0
+    webhook_retry_base_seconds: float = 0.5
+    webhook_retry_max_seconds: float = 10.0
+    webhook_retry_budget_ratio: float = 0.2
+    data_dir: str = "data"
     target_user_id: Optional[int] = None
     notion_token: Optional[str] = None
     notion_database_id: Optional[str] = None
     notion_shift_database_id: Optional[str] = None
+    notion_page_size: int = 100
+    notion_schema_ttl_seconds: float = 300.0
+    notion_rate_limit_per_second: float = 3.0
+    notion_rate_limit_burst: int = 3
+    notion_write_behind_enabled: bool = True
+    notion_write_behind_delay_seconds: float = 2.0
+    task_mirror_enabled: bool = True
+    task_mirror_refresh_seconds: float = 60.0
+    notion_offline_snapshot_enabled: bool = True
+    notion_unavailable_threshold: int = 2
+    shift_state_reconcile_seconds: float = 300.0
+    shift_history_refresh_seconds: float = 900.0
+    shift_target_hours: float = 8.0
     # Google Calendar (opcional)
     google_client_id: Optional[str] = None
     google_client_secret: Optional[str] = None
@@ -33,11 +66,46 @@ class Settings:
         webhook_url = _required_env("WEBHOOK_URL")
         julgar_channel_id = _required_int_env("JULGAR_CHANNEL_ID")
         webhook_secret = os.getenv("WEBHOOK_SECRET")
+        webhook_max_connections = _int_env("WEBHOOK_MAX_CONNECTIONS", 10)
+        webhook_max_keepalive_connections = _int_env("WEBHOOK_MAX_KEEPALIVE_CONNECTIONS", 5)
+        webhook_keepalive_expiry = _float_env("WEBHOOK_KEEPALIVE_EXPIRY", 30.0)
+        webhook_http2 = _bool_env("WEBHOOK_HTTP2", False)
+        webhook_outbox_enabled = _bool_env("WEBHOOK_OUTBOX_ENABLED", True)
+        webhook_outbox_max_attempts = _int_env("WEBHOOK_OUTBOX_MAX_ATTEMPTS", 50)
+        voice_join_debounce_seconds = _float_env("VOICE_JOIN_DEBOUNCE_SECONDS", 10.0)
+        webhook_session_events = _bool_env("WEBHOOK_SESSION_EVENTS", False)
+        voice_stats_enabled = _bool_env("VOICE_STATS_ENABLED", True)
+        webhook_queue_size = _int_env("WEBHOOK_QUEUE_SIZE", 1000)
+        webhook_workers = _int_env("WEBHOOK_WORKERS", 4)
+        webhook_queue_overflow = _choice_env(
+            "WEBHOOK_QUEUE_OVERFLOW", "spill", ("drop-oldest", "block", "spill")
+        )
+        webhook_batch_max_events = _int_env("WEBHOOK_BATCH_MAX_EVENTS", 1)
+        webhook_batch_max_wait_ms = _int_env("WEBHOOK_BATCH_MAX_WAIT_MS", 200)
+        webhook_circuit_failure_threshold = _int_env("WEBHOOK_CIRCUIT_FAILURE_THRESHOLD", 5)
+        webhook_circuit_reset_seconds = _float_env("WEBHOOK_CIRCUIT_RESET_SECONDS", 30.0)
+        webhook_retry_base_seconds = _float_env("WEBHOOK_RETRY_BASE_SECONDS", 0.5)
+        webhook_retry_max_seconds = _float_env("WEBHOOK_RETRY_MAX_SECONDS", 10.0)
+        webhook_retry_budget_ratio = _float_env("WEBHOOK_RETRY_BUDGET_RATIO", 0.2)
+        data_dir = os.getenv("DATA_DIR") or "data"
         target_user_id_raw = os.getenv("TARGET_USER_ID")
         target_user_id = int(target_user_id_raw) if target_user_id_raw else None
         notion_token = os.getenv("NOTION_TOKEN")
         notion_database_id = os.getenv("NOTION_DATABASE_ID")
         notion_shift_database_id = os.getenv("NOTION_SHIFT_DATABASE_ID")
+        notion_page_size = _int_env("NOTION_PAGE_SIZE", 100)
+        notion_schema_ttl_seconds = _float_env("NOTION_SCHEMA_TTL_SECONDS", 300.0)
+        notion_rate_limit_per_second = _float_env("NOTION_RATE_LIMIT_PER_SECOND", 3.0)
+        notion_rate_limit_burst = _int_env("NOTION_RATE_LIMIT_BURST", 3)
+        notion_write_behind_enabled = _bool_env("NOTION_WRITE_BEHIND_ENABLED", True)
+        notion_write_behind_delay_seconds = _float_env("NOTION_WRITE_BEHIND_DELAY_SECONDS", 2.0)
+        task_mirror_enabled = _bool_env("TASK_MIRROR_ENABLED", True)
+        task_mirror_refresh_seconds = _float_env("TASK_MIRROR_REFRESH_SECONDS", 60.0)
+        notion_offline_snapshot_enabled = _bool_env("NOTION_OFFLINE_SNAPSHOT_ENABLED", True)
+        notion_unavailable_threshold = _int_env("NOTION_UNAVAILABLE_THRESHOLD", 2)
+        shift_state_reconcile_seconds = _float_env("SHIFT_STATE_RECONCILE_SECONDS", 300.0)
+        shift_history_refresh_seconds = _float_env("SHIFT_HISTORY_REFRESH_SECONDS", 900.0)
+        shift_target_hours = _float_env("SHIFT_TARGET_HOURS", 8.0)
 
         google_client_id = os.getenv("GOOGLE_CLIENT_ID") or None
         google_client_secret = os.getenv("GOOGLE_CLIENT_SECRET") or None
@@ -57,10 +125,43 @@ class Settings:
             webhook_url=webhook_url,
             julgar_channel_id=julgar_channel_id,
             webhook_secret=webhook_secret,
+            webhook_max_connections=webhook_max_connections,
+            webhook_max_keepalive_connections=webhook_max_keepalive_connections,
+            webhook_keepalive_expiry=webhook_keepalive_expiry,
+            webhook_http2=webhook_http2,
+            webhook_outbox_enabled=webhook_outbox_enabled,
+            webhook_outbox_max_attempts=webhook_outbox_max_attempts,
+            voice_join_debounce_seconds=voice_join_debounce_seconds,
+            webhook_session_events=webhook_session_events,
+            voice_stats_enabled=voice_stats_enabled,
+            webhook_queue_size=webhook_queue_size,
+            webhook_workers=webhook_workers,
+            webhook_queue_overflow=webhook_queue_overflow,
+            webhook_batch_max_events=webhook_batch_max_events,
+            webhook_batch_max_wait_ms=webhook_batch_max_wait_ms,
+            webhook_circuit_failure_threshold=webhook_circuit_failure_threshold,
+            webhook_circuit_reset_seconds=webhook_circuit_reset_seconds,
+            webhook_retry_base_seconds=webhook_retry_base_seconds,
+            webhook_retry_max_seconds=webhook_retry_max_seconds,
+            webhook_retry_budget_ratio=webhook_retry_budget_ratio,
+            data_dir=data_dir,
             target_user_id=target_user_id,
             notion_token=notion_token,
             notion_database_id=notion_database_id,
             notion_shift_database_id=notion_shift_database_id,
+            notion_page_size=notion_page_size,
+            notion_schema_ttl_seconds=notion_schema_ttl_seconds,
+            notion_rate_limit_per_second=notion_rate_limit_per_second,
+            notion_rate_limit_burst=notion_rate_limit_burst,
+            notion_write_behind_enabled=notion_write_behind_enabled,
+            notion_write_behind_delay_seconds=notion_write_behind_delay_seconds,
+            task_mirror_enabled=task_mirror_enabled,
+            task_mirror_refresh_seconds=task_mirror_refresh_seconds,
+            notion_offline_snapshot_enabled=notion_offline_snapshot_enabled,
+            notion_unavailable_threshold=notion_unavailable_threshold,
+            shift_state_reconcile_seconds=shift_state_reconcile_seconds,
+            shift_history_refresh_seconds=shift_history_refresh_seconds,
+            shift_target_hours=shift_target_hours,
             google_client_id=google_client_id,
             google_client_secret=google_client_secret,
             calendar_channel_id=calendar_channel_id,
@@ -95,3 +196,40 @@ def _required_int_list_env(key: str, fallback_key: str | None = None) -> tuple[i
         return tuple(int(v.strip()) for v in raw.split(",") if v.strip())
     except ValueError as exc:
         raise ValueError(f"Environment variable {key} must be comma-separated integers") from exc
+
+
+def _int_env(key: str, default: int) -> int:
+    raw = os.getenv(key)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError as exc:
+        raise ValueError(f"Environment variable {key} must be a valid integer") from exc
+
+
+def _float_env(key: str, default: float) -> float:
+    raw = os.getenv(key)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError as exc:
+        raise ValueError(f"Environment variable {key} must be a valid number") from exc
+
+
+def _bool_env(key: str, default: bool) -> bool:
+    raw = os.getenv(key)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _choice_env(key: str, default: str, choices: tuple[str, ...]) -> str:
+    raw = os.getenv(key)
+    if raw is None or raw.strip() == "":
+        return default
+    value = raw.strip().lower()
+    if value not in choices:
+        raise ValueError(f"Environment variable {key} must be one of: {', '.join(choices)}")
+    return value
@@ -1,11 +1,50 @@
+import json
 import logging
-from typing import Any, Dict, List, Optional
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
 import httpx
 
+from .circuit_breaker import STATE_CLOSED, CircuitBreaker, parse_retry_after
+from .notion_parser import TaskRecord, compile_task_parser, extract_categories, is_freela_category, loads
+from .notion_query import NotionQuery
+from .notion_schema import DatabaseSchema, SchemaCache
+from .notion_write_behind import NotionWriteBehind, is_local_id
+from .rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_READ,
+    PriorityRateLimiter,
+)
+from .single_flight import SingleFlight
+from .snapshot_store import SnapshotStore
+
 NOTION_API_BASE = "https://api.notion.com/v1"
 NOTION_VERSION = "2022-06-28"
 
+SHIFTS_SNAPSHOT = "shifts"
+SHIFTS_SNAPSHOT_SIZE = 20
+# Limite de caracteres de cada segmento de rich_text na API do Notion.
+RICH_TEXT_SEGMENT_LIMIT = 2000
+
+
+class NotionUnavailable(httpx.HTTPError):
+    """O Notion esta fora do ar (circuito aberto): a requisicao nem foi enviada."""
+
+
+def is_unavailable_error(exc: BaseException) -> bool:
+    """Erros em que a requisicao certamente nao chegou ao Notion (seguro enfileirar e reenviar)."""
+    return isinstance(exc, (NotionUnavailable, httpx.ConnectError, httpx.ConnectTimeout))
+
+
+def is_outage_error(exc: BaseException) -> bool:
+    """Erros de leitura que justificam servir o snapshot: rede, circuito aberto ou 5xx."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (NotionUnavailable, httpx.TransportError))
+
 
 class NotionClient:
     def __init__(
@@ -13,40 +52,231 @@ class NotionClient:
         token: str,
         database_id: str,
         shifts_database_id: Optional[str] = None,
+        api_base: str = NOTION_API_BASE,
+        timeout_seconds: float = 15.0,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 60.0,
+        page_size: int = 100,
+        schema_ttl: float = 300.0,
+        rate_limit_per_second: float = 3.0,
+        rate_limit_burst: int = 3,
+        max_rate_limit_retries: int = 3,
+        write_behind: Optional[NotionWriteBehind] = None,
+        snapshots: Optional[SnapshotStore] = None,
+        unavailable_threshold: int = 2,
+        unavailable_reset_seconds: float = 30.0,
     ) -> None:
         self._logger = logging.getLogger(__name__)
         self._token = token
         self._database_id = database_id
         self._shifts_database_id = shifts_database_id
+        self._api_base = api_base.rstrip("/")
         self._headers = {
             "Authorization": f"Bearer {token}",
             "Notion-Version": NOTION_VERSION,
             "Content-Type": "application/json",
         }
-        self._category_prop_name: Optional[str] = None
+        self._timeout = httpx.Timeout(timeout_seconds)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        # A API do Notion aceita no maximo 100 resultados por pagina.
+        self._page_size = max(1, min(page_size, 100))
+        self._parser_schema: Optional[DatabaseSchema] = None
+        self._parser: Optional[Callable[[Dict[str, Any]], TaskRecord]] = None
+        self._schema = SchemaCache(
+            lambda: self._read("GET", f"/databases/{self._database_id}"),
+            ttl=schema_ttl,
+        )
+        self._task_listeners: List[Callable[[TaskRecord], None]] = []
+        # O Notion aceita ~3 req/s por integracao; o limiter espaca as chamadas antes de tomar 429.
+        self._limiter = PriorityRateLimiter(rate=rate_limit_per_second, burst=rate_limit_burst)
+        self._max_rate_limit_retries = max_rate_limit_retries
+        self._single_flight = SingleFlight()
+        # Com write-behind, update_task/update_shift_entries so enfileiram; o PATCH sai em background.
+        self._write_behind = write_behind
+        if write_behind is not None:
+            write_behind.bind(self._patch_properties, self._create_page, self._fetch_last_edited_time)
+        # Modo degradado: apos falhas seguidas de rede/5xx o circuito abre e as chamadas
+        # falham na hora (sem esperar o timeout); leituras caem no snapshot e escritas na fila.
+        self._breaker = CircuitBreaker(
+            "notion",
+            failure_threshold=unavailable_threshold,
+            reset_timeout=unavailable_reset_seconds,
+        )
+        self._snapshots = snapshots
+        self._shift_snapshot: List[Dict[str, Any]] = []
+        self._shift_snapshot_at: Optional[float] = None
+        self._shifts_stale = False
+        self._seen_edited: Dict[str, str] = {}
+        self._local_ids: Dict[str, str] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Client unico com pool keep-alive: um !stop-timer (GET + PATCH) usa a mesma conexao TLS.
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self._api_base,
+                headers=self._headers,
+                timeout=self._timeout,
+                limits=self._limits,
+            )
+        return self._client
+
+    @property
+    def degraded(self) -> bool:
+        """True enquanto o Notion esta inacessivel (circuito aberto ou sondando)."""
+        return self._breaker.state != STATE_CLOSED
+
+    @property
+    def snapshots(self) -> Optional[SnapshotStore]:
+        return self._snapshots
+
+    @property
+    def shifts_database_id(self) -> Optional[str]:
+        return self._shifts_database_id
+
+    @property
+    def shifts_stale_since(self) -> Optional[float]:
+        """Epoch do snapshot se o ultimo fetch_shifts serviu dados salvos, senao None."""
+        return self._shift_snapshot_at if self._shifts_stale else None
+
+    async def start(self) -> None:
+        if self._snapshots is not None and self._shifts_database_id:
+            saved = await self._snapshots.load(SHIFTS_SNAPSHOT)
+            if saved is not None:
+                self._shift_snapshot, self._shift_snapshot_at = saved
+        if self._write_behind is not None:
+            await self._write_behind.start()
+
+    async def aclose(self) -> None:
+        if self._write_behind is not None:
+            # Antes de fechar o client HTTP: o stop tenta um ultimo flush.
+            await self._write_behind.stop()
+        if self._snapshots is not None:
+            await self._snapshots.close()
+        client, self._client = self._client, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+            self._logger.info(
+                "Notion HTTP client closed",
+                extra={
+                    "context": {
+                        "rate_limiter": self._limiter.stats(),
+                        "coalescing": self._single_flight.stats(),
+                    }
+                },
+            )
+
+    def rate_limiter_stats(self) -> Dict[str, Dict[str, float]]:
+        """Tempo de espera na fila do rate limiter por faixa (interactive/read/background)."""
+        return self._limiter.stats()
+
+    def coalescing_stats(self) -> Dict[str, int]:
+        """Leituras feitas, quantas pegaram carona numa requisicao identica em andamento e quantas estao no ar."""
+        return self._single_flight.stats()
+
+    async def _read(
+        self,
+        method: str,
+        path: str,
+        body: Optional[Dict[str, Any]] = None,
+        params: Optional[List[tuple]] = None,
+        priority: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Leitura com single-flight: chamadas concorrentes ao mesmo endpoint/corpo dividem uma requisicao."""
+        key = (method, path, json.dumps(body, sort_keys=True), tuple(params or ()))
+        return await self._single_flight.do(
+            key,
+            lambda: self._request(method, path, json=body, params=params, priority=priority),
+        )
+
+    def add_task_listener(self, callback: Callable[[TaskRecord], None]) -> None:
+        """Recebe cada tarefa criada/atualizada por este client (ja parseada), para write-through."""
+        self._task_listeners.append(callback)
+
+    def _notify_task_written(self, page: Dict[str, Any]) -> TaskRecord:
+        return self._notify_task(self._parse_page(page))
+
+    def _notify_task(self, task: TaskRecord) -> TaskRecord:
+        for callback in self._task_listeners:
+            try:
+                callback(task)
+            except Exception as exc:
+                self._logger.warning(
+                    "Task listener failed",
+                    extra={"context": {"page_id": task["id"], "error": str(exc)}},
+                )
+        return task
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        json: Optional[Dict[str, Any]] = None,
+        params: Optional[List[tuple]] = None,
+        priority: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        if priority is None:
+            # Escritas vem de interacoes do usuario: passam na frente das leituras.
+            priority = PRIORITY_READ if method == "GET" or path.endswith("/query") else PRIORITY_INTERACTIVE
+        if not self._breaker.allow_request():
+            raise NotionUnavailable(
+                f"Notion indisponivel, nova tentativa em {self._breaker.retry_in:.0f}s"
+            )
+        try:
+            response = await self._send(method, path, json, params, priority)
+        except httpx.TransportError:
+            self._breaker.record_failure()
+            raise
+        except BaseException:
+            self._breaker.release_probe()
+            raise
+        if response.status_code >= 500:
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+        response.raise_for_status()
+        return loads(response.content)
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        json: Optional[Dict[str, Any]],
+        params: Optional[List[tuple]],
+        priority: int,
+    ) -> httpx.Response:
+        attempt = 0
+        while True:
+            waited = await self._limiter.acquire(priority)
+            if waited > 1.0:
+                self._logger.debug(
+                    "Notion request waited for rate limiter",
+                    extra={"context": {"path": path, "priority": priority, "waited_ms": round(waited * 1000)}},
+                )
+            response = await self._get_client().request(method, path, json=json, params=params)
+            if response.status_code != 429 or attempt >= self._max_rate_limit_retries:
+                break
+            attempt += 1
+            retry_after = parse_retry_after(response.headers.get("Retry-After")) or float(attempt)
+            self._limiter.pause(retry_after)
+            self._logger.warning(
+                "Notion rate limited, retrying",
+                extra={"context": {"path": path, "attempt": attempt, "retry_after": retry_after}},
+            )
+        return response
 
     async def fetch_status_options(self) -> List[str]:
-        url = f"{NOTION_API_BASE}/databases/{self._database_id}"
-
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            response = await client.get(url, headers=self._headers)
-            response.raise_for_status()
-            data = response.json()
-
-        properties = data.get("properties", {})
-        for key in ("Status", "status"):
-            prop = properties.get(key)
-            if not prop:
-                continue
-            ptype = prop.get("type")
-            if ptype == "status":
-                groups = prop.get("status", {}).get("options", [])
-                return [opt["name"] for opt in groups if "name" in opt]
-            if ptype == "select":
-                options = prop.get("select", {}).get("options", [])
-                return [opt["name"] for opt in options if "name" in opt]
-
-        return ["Not started", "In progress", "Done"]
+        schema = await self._schema.get()
+        return list(schema.status_options) or ["Not started", "In progress", "Done"]
+
+    def invalidate_schema(self) -> None:
+        """Forca recarregar o schema no proximo uso (ex.: propriedade/opcao renomeada no Notion)."""
+        self._schema.invalidate()
 
     async def create_task(
         self,
@@ -54,19 +284,15 @@ class NotionClient:
         status: str,
         description: Optional[str] = None,
         categories: Optional[List[str]] = None,
-    ) -> Dict[str, Any]:
-        url = f"{NOTION_API_BASE}/pages"
-
+    ) -> TaskRecord:
         properties: Dict[str, Any] = {
             "Name": {"title": [{"text": {"content": name}}]},
             "status": {"status": {"name": status}},
         }
         if description:
-            properties["description"] = {
-                "rich_text": [{"text": {"content": description}}]
-            }
+            properties["description"] = {"rich_text": _rich_text(description)}
         if categories:
-            category_prop = await self._get_category_property_name()
+            category_prop = (await self._schema.get()).category
             if category_prop:
                 properties[category_prop] = {
                     "multi_select": [{"name": category} for category in categories]
@@ -78,11 +304,10 @@ class NotionClient:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-                response = await client.post(url, headers=self._headers, json=payload)
-                response.raise_for_status()
-                page = response.json()
+            page = await self._request("POST", "/pages", json=payload)
         except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == 400:
+                self._schema.invalidate()
             self._logger.error(
                 "Notion API error creating task",
                 extra={
@@ -93,22 +318,20 @@ class NotionClient:
                 },
             )
             raise
+        except httpx.HTTPError as exc:
+            if self._write_behind is None or not is_unavailable_error(exc):
+                raise
+            page = await self._create_offline(self._database_id, properties)
 
-        return self._parse_page(page)
-
-    async def _fetch_page_time_min(self, page_id: str) -> int:
-        url = f"{NOTION_API_BASE}/pages/{page_id}"
+        return self._notify_task_written(page)
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            response = await client.get(url, headers=self._headers)
-            response.raise_for_status()
-            page = response.json()
+    async def fetch_task_time_min(self, page_id: str, priority: Optional[int] = None) -> int:
+        page = self._with_pending(await self._get_page(page_id, priority=priority))
 
         properties = page.get("properties", {})
-        for key in ("time_min", "Time_min", "time"):
-            prop = properties.get(key)
-            if prop and prop.get("type") == "number":
-                return prop.get("number") or 0
+        prop = properties.get((await self._schema.get()).time_min or "")
+        if prop and prop.get("type") == "number":
+            return prop.get("number") or 0
         return 0
 
     async def update_task(
@@ -117,22 +340,29 @@ class NotionClient:
         time_min: Optional[int] = None,
         status: Optional[str] = None,
         categories: Optional[List[str]] = None,
+        time_total: Optional[int] = None,
+        base_edited_time: Optional[str] = None,
     ) -> int:
-        """Returns the new total time_min after summing."""
-        url = f"{NOTION_API_BASE}/pages/{page_id}"
+        """Returns the new total time_min: time_total as given, or the current value plus time_min.
 
+        base_edited_time: last_edited_time of the copy the caller based the write on (e.g. the
+        task mirror), used by the write-behind to detect concurrent edits.
+        """
         properties: Dict[str, Any] = {}
         total_time = 0
 
-        if time_min is not None:
-            current = await self._fetch_page_time_min(page_id)
-            total_time = current + time_min
-            properties["time_min"] = {"number": total_time}
+        if time_total is None and time_min is not None:
+            # Read-modify-write: prefira TimeLedger, que ja conhece o total e escreve so o PATCH.
+            time_total = await self.fetch_task_time_min(page_id) + time_min
+        if time_total is not None:
+            total_time = time_total
+            time_prop = (await self._schema.get()).time_min or "time_min"
+            properties[time_prop] = {"number": total_time}
 
         if status is not None:
             properties["status"] = {"status": {"name": status}}
         if categories is not None:
-            category_prop = await self._get_category_property_name()
+            category_prop = (await self._schema.get()).category
             if category_prop:
                 properties[category_prop] = {
                     "multi_select": [{"name": category} for category in categories]
@@ -140,14 +370,16 @@ class NotionClient:
 
         if not properties:
             return total_time
+        page_id = self._resolve_id(page_id)
+        if self._write_behind is not None:
+            await self._enqueue_update(page_id, properties, base_edited_time)
+            return total_time
 
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-                response = await client.patch(
-                    url, headers=self._headers, json={"properties": properties}
-                )
-                response.raise_for_status()
+            page = await self._request("PATCH", f"/pages/{page_id}", json={"properties": properties})
         except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == 400:
+                self._schema.invalidate()
             self._logger.error(
                 "Notion API error updating task",
                 extra={
@@ -160,16 +392,85 @@ class NotionClient:
             )
             raise
 
+        self._remember_edited(page)
+        self._notify_task_written(page)
         return total_time
 
-    async def fetch_tasks(self) -> List[Dict[str, Any]]:
-        url = f"{NOTION_API_BASE}/databases/{self._database_id}/query"
-
+    def pending_tasks(self) -> List[TaskRecord]:
+        """Tarefas criadas com o Notion fora do ar e ainda na fila (com id local)."""
+        if self._write_behind is None:
+            return []
+        return [
+            self._parse_page(_local_page(entry.page_id, self._database_id, entry.properties))
+            for entry in self._write_behind.pending_creates(self._database_id)
+        ]
+
+    async def fetch_tasks(self) -> List[TaskRecord]:
+        tasks: List[TaskRecord] = []
+        async for page in self.iter_task_pages():
+            tasks.extend(page)
+        return tasks
+
+    async def iter_task_pages(
+        self,
+        page_size: Optional[int] = None,
+        query: Optional[NotionQuery] = None,
+        priority: int = PRIORITY_READ,
+    ) -> AsyncIterator[List[TaskRecord]]:
+        """Percorre o database inteiro (has_more/next_cursor), entregando cada pagina assim que chega."""
+        if query is not None and query.empty:
+            return
+        body = (query or NotionQuery()).build(page_size or self._page_size)
+        params = await self._task_filter_properties()
+        while True:
+            data = await self._query_database(body, params, priority)
+            yield [self._parse_page(self._with_pending(page)) for page in data.get("results", [])]
+            if not data.get("has_more") or not data.get("next_cursor"):
+                return
+            body["start_cursor"] = data["next_cursor"]
+
+    async def iter_pending_task_pages(self) -> AsyncIterator[List[TaskRecord]]:
+        """Tarefas com status diferente de "Done", filtradas no Notion."""
+        query = NotionQuery()
+        schema = await self._schema.get()
+        if schema.status:
+            done = [name for name in schema.status_options if name.lower() == "done"]
+            query.not_equals(schema.status, schema.status_type, done)
+        async for page in self.iter_task_pages(query=query):
+            yield page
+
+    async def iter_freela_task_pages(self) -> AsyncIterator[List[TaskRecord]]:
+        """Tarefas com alguma categoria contendo "freela", filtradas no Notion."""
+        schema = await self._schema.get()
+        if not schema.category:
+            return
+        query = NotionQuery().contains_any(
+            schema.category,
+            schema.category_type,
+            [name for name in schema.category_options if is_freela_category(name)],
+        )
+        async for page in self.iter_task_pages(query=query):
+            yield page
+
+    async def _task_filter_properties(self) -> List[tuple]:
+        # filter_properties: o Notion devolve so as propriedades que o _parse_page usa.
+        schema = await self._schema.get()
+        return [("filter_properties", prop_id) for prop_id in schema.task_property_ids]
+
+    async def _query_database(
+        self,
+        body: Dict[str, Any],
+        params: Optional[List[tuple]] = None,
+        priority: int = PRIORITY_READ,
+    ) -> Dict[str, Any]:
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-                response = await client.post(url, headers=self._headers, json={})
-                response.raise_for_status()
-                data = response.json()
+            return await self._read(
+                "POST",
+                f"/databases/{self._database_id}/query",
+                body=body,
+                params=params,
+                priority=priority,
+            )
         except httpx.HTTPStatusError as exc:
             self._logger.error(
                 "Notion API returned error",
@@ -188,33 +489,8 @@ class NotionClient:
             )
             raise
 
-        return [self._parse_page(page) for page in data.get("results", [])]
-
     async def fetch_category_options(self) -> List[str]:
-        url = f"{NOTION_API_BASE}/databases/{self._database_id}"
-
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            response = await client.get(url, headers=self._headers)
-            response.raise_for_status()
-            data = response.json()
-
-        properties = data.get("properties", {})
-        property_name = self._find_category_property_name(properties)
-        if not property_name:
-            return []
-
-        self._category_prop_name = property_name
-        prop = properties.get(property_name, {})
-        ptype = prop.get("type")
-
-        if ptype == "multi_select":
-            options = prop.get("multi_select", {}).get("options", [])
-        elif ptype == "select":
-            options = prop.get("select", {}).get("options", [])
-        else:
-            options = []
-
-        return [opt["name"] for opt in options if "name" in opt]
+        return list((await self._schema.get()).category_options)
 
     async def update_task_categories(
         self,
@@ -249,177 +525,266 @@ class NotionClient:
     # Shift methods
     # ------------------------------------------------------------------
 
-    async def create_shift(self, name: str, shift_start: str, entries_json: str) -> Dict[str, Any]:
+    async def create_shift(self, name: str, shift_start: str, entries_raw: str) -> Dict[str, Any]:
         if not self._shifts_database_id:
             raise RuntimeError("Shifts database not configured")
 
-        url = f"{NOTION_API_BASE}/pages"
+        properties = {
+            "Name": {"title": [{"text": {"content": name}}]},
+            "shift_start": {"date": {"start": shift_start}},
+            "entries": {"rich_text": _rich_text(entries_raw)},
+        }
         payload = {
             "parent": {"database_id": self._shifts_database_id},
-            "properties": {
-                "Name": {"title": [{"text": {"content": name}}]},
-                "shift_start": {"date": {"start": shift_start}},
-                "entries": {"rich_text": [{"text": {"content": entries_json}}]},
-            },
+            "properties": properties,
         }
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            response = await client.post(url, headers=self._headers, json=payload)
-            response.raise_for_status()
-            return response.json()
+        try:
+            return await self._request("POST", "/pages", json=payload)
+        except httpx.HTTPError as exc:
+            if self._write_behind is None or not is_unavailable_error(exc):
+                raise
+            return await self._create_offline(self._shifts_database_id, properties)
 
-    async def update_shift_entries(self, page_id: str, entries_json: str) -> None:
-        url = f"{NOTION_API_BASE}/pages/{page_id}"
-        payload = {
-            "properties": {
-                "entries": {"rich_text": [{"text": {"content": entries_json}}]},
-            }
+    async def update_shift_entries(self, page_id: str, entries_raw: str) -> None:
+        properties = {
+            "entries": {"rich_text": _rich_text(entries_raw)},
         }
+        page_id = self._resolve_id(page_id)
+        if self._write_behind is not None:
+            await self._enqueue_update(page_id, properties)
+            return
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            response = await client.patch(url, headers=self._headers, json=payload)
-            response.raise_for_status()
+        page = await self._request("PATCH", f"/pages/{page_id}", json={"properties": properties})
+        self._remember_edited(page)
 
-    async def fetch_shifts(self, limit: int = 10) -> List[Dict[str, Any]]:
+    async def _enqueue_update(
+        self,
+        page_id: str,
+        properties: Dict[str, Any],
+        base_edited_time: Optional[str] = None,
+    ) -> None:
+        # A escrita leva o last_edited_time da leitura mais recente (a do chamador ou a
+        # nossa); se foi feita com o Notion fora do ar, o reenvio confere se alguem
+        # editou a pagina nesse meio tempo.
+        seen = self._seen_edited.get(page_id)
+        if base_edited_time is None or (seen is not None and seen > base_edited_time):
+            base_edited_time = seen
+        await self._write_behind.enqueue(
+            page_id,
+            properties,
+            base_edited_time=base_edited_time,
+            check_conflict=self.degraded,
+        )
+
+    async def _create_offline(self, parent_database_id: str, properties: Dict[str, Any]) -> Dict[str, Any]:
+        """Enfileira a criacao e devolve uma pagina local no formato da API."""
+        local_id = await self._write_behind.enqueue_create(parent_database_id, properties)
+        self._logger.warning(
+            "Notion unavailable, page creation queued",
+            extra={"context": {"local_id": local_id, "database_id": parent_database_id}},
+        )
+        return _local_page(local_id, parent_database_id, properties)
+
+    async def _create_page(
+        self,
+        parent_database_id: str,
+        properties: Dict[str, Any],
+        local_id: str,
+    ) -> Dict[str, Any]:
+        """POST usado pelo write-behind para reenviar uma criacao feita offline."""
+        page = await self._request(
+            "POST",
+            "/pages",
+            json={"parent": {"database_id": parent_database_id}, "properties": properties},
+        )
+        self._local_ids[local_id] = page["id"]
+        self._remember_edited(page)
+        self._logger.info(
+            "Queued page creation sent to Notion",
+            extra={"context": {"local_id": local_id, "page_id": page["id"]}},
+        )
+        if _same_id(parent_database_id, self._database_id):
+            task = self._parse_page(page)
+            task.replaces = local_id
+            self._notify_task(task)
+        return page
+
+    async def _fetch_last_edited_time(self, page_id: str) -> Optional[str]:
+        page = await self._request("GET", f"/pages/{page_id}", priority=PRIORITY_BACKGROUND)
+        return page.get("last_edited_time")
+
+    async def _get_page(self, page_id: str, priority: Optional[int] = None) -> Dict[str, Any]:
+        page_id = self._resolve_id(page_id)
+        if is_local_id(page_id):
+            # Criada offline e ainda nao enviada: so existe na fila.
+            return {"id": page_id, "properties": {}}
+        return await self._read("GET", f"/pages/{page_id}", priority=priority)
+
+    def _resolve_id(self, page_id: str) -> str:
+        return self._local_ids.get(page_id, page_id)
+
+    def _remember_edited(self, page: Dict[str, Any]) -> None:
+        if page.get("id") and page.get("last_edited_time"):
+            self._seen_edited[page["id"]] = page["last_edited_time"]
+
+    async def _patch_properties(self, page_id: str, properties: Dict[str, Any]) -> Dict[str, Any]:
+        """PATCH usado pelo flush do write-behind."""
+        page = await self._request("PATCH", f"/pages/{page_id}", json={"properties": properties})
+        self._remember_edited(page)
+        parent_id = (page.get("parent") or {}).get("database_id") or ""
+        if _same_id(parent_id, self._database_id):
+            self._notify_task_written(page)
+        return page
+
+    def _with_pending(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """Aplica sobre a pagina lida do Notion as escritas ainda na fila do write-behind."""
+        self._remember_edited(page)
+        pending = self._write_behind.pending(page.get("id", "")) if self._write_behind else None
+        if not pending:
+            return page
+        properties = dict(page.get("properties", {}))
+        for key, value in pending.items():
+            properties[key] = _as_read_property(value)
+        return {**page, "properties": properties}
+
+    async def fetch_shifts(self, limit: int = 10, priority: Optional[int] = None) -> List[Dict[str, Any]]:
         if not self._shifts_database_id:
             raise RuntimeError("Shifts database not configured")
 
-        url = f"{NOTION_API_BASE}/databases/{self._shifts_database_id}/query"
         body: Dict[str, Any] = {
             "sorts": [{"property": "shift_start", "direction": "descending"}],
             "page_size": limit,
         }
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            response = await client.post(url, headers=self._headers, json=body)
-            response.raise_for_status()
-            data = response.json()
+        try:
+            data = await self._read(
+                "POST", f"/databases/{self._shifts_database_id}/query", body=body, priority=priority
+            )
+        except httpx.HTTPError as exc:
+            if not self._shift_snapshot or not is_outage_error(exc):
+                raise
+            self._logger.warning(
+                "Notion unavailable, serving shifts snapshot",
+                extra={"context": {"error": str(exc), "saved_at": self._shift_snapshot_at}},
+            )
+            self._shifts_stale = True
+            pages = self._shift_snapshot
+        else:
+            self._shifts_stale = False
+            pages = data.get("results", [])
+            await self._save_shift_snapshot(pages)
 
-        return data.get("results", [])
+        pages = self._pending_shift_creates() + [self._with_pending(page) for page in pages]
+        return pages[:limit]
 
-    async def delete_shift(self, page_id: str) -> None:
-        url = f"{NOTION_API_BASE}/pages/{page_id}"
-        payload = {"archived": True}
+    async def iter_shift_pages(
+        self,
+        query: Optional[NotionQuery] = None,
+        priority: int = PRIORITY_BACKGROUND,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Percorre o database de turnos inteiro (has_more/next_cursor), do mais antigo ao mais recente."""
+        if not self._shifts_database_id:
+            raise RuntimeError("Shifts database not configured")
+        body = (query or NotionQuery()).sort("shift_start").build(self._page_size)
+        while True:
+            data = await self._read(
+                "POST", f"/databases/{self._shifts_database_id}/query", body=body, priority=priority
+            )
+            yield [self._with_pending(page) for page in data.get("results", [])]
+            if not data.get("has_more") or not data.get("next_cursor"):
+                return
+            body["start_cursor"] = data["next_cursor"]
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            response = await client.patch(url, headers=self._headers, json=payload)
-            response.raise_for_status()
+    def _pending_shift_creates(self) -> List[Dict[str, Any]]:
+        if self._write_behind is None:
+            return []
+        pages = [
+            _local_page(entry.page_id, self._shifts_database_id, entry.properties)
+            for entry in self._write_behind.pending_creates(self._shifts_database_id)
+        ]
+        return sorted(pages, key=_shift_start, reverse=True)
+
+    async def _save_shift_snapshot(self, pages: List[Dict[str, Any]]) -> None:
+        merged = {page["id"]: page for page in self._shift_snapshot}
+        merged.update((page["id"], page) for page in pages)
+        snapshot = sorted(merged.values(), key=_shift_start, reverse=True)[:SHIFTS_SNAPSHOT_SIZE]
+        self._shift_snapshot, self._shift_snapshot_at = snapshot, time.time()
+        if self._snapshots is None:
+            return
+        try:
+            await self._snapshots.save(SHIFTS_SNAPSHOT, snapshot)
+        except sqlite3.Error as exc:
+            self._logger.warning(
+                "Failed to save shifts snapshot",
+                extra={"context": {"error": str(exc)}},
+            )
 
-    def _parse_page(self, page: Dict[str, Any]) -> Dict[str, Any]:
-        properties = page.get("properties", {})
-        name = self._extract_title(properties)
-        categories = self._extract_categories(properties)
-
-        return {
-            "id": page.get("id", ""),
-            "name": name,
-            "url": page.get("url", ""),
-            "property_due": self._extract_date(properties),
-            "property_description": self._extract_rich_text(properties, "Description"),
-            "property_status": self._extract_status(properties),
-            "property_categories": categories,
-            "is_freela": self._is_freela_task(categories),
-            "property_name": name,
-        }
+    async def delete_shift(self, page_id: str) -> None:
+        page_id = self._resolve_id(page_id)
+        if self._write_behind is not None:
+            await self._write_behind.discard(page_id)
+        self._shift_snapshot = [page for page in self._shift_snapshot if page.get("id") != page_id]
+        if is_local_id(page_id):
+            # Nunca chegou ao Notion: descartar a criacao pendente basta.
+            return
+        await self._request("PATCH", f"/pages/{page_id}", json={"archived": True})
+
+    def _parse_page(self, page: Dict[str, Any]) -> TaskRecord:
+        schema = self._schema.current
+        if schema is None:
+            # Sem schema em cache (raro): resolve pelas proprias propriedades da pagina.
+            return compile_task_parser(DatabaseSchema.from_properties(page.get("properties", {})))(page)
+        if self._parser_schema is not schema:
+            self._parser_schema, self._parser = schema, compile_task_parser(schema)
+        return self._parser(page)
 
     async def fetch_task_categories(self, page_id: str) -> List[str]:
-        url = f"{NOTION_API_BASE}/pages/{page_id}"
-
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            response = await client.get(url, headers=self._headers)
-            response.raise_for_status()
-            page = response.json()
+        page = self._with_pending(await self._get_page(page_id))
 
         properties = page.get("properties", {})
-        return self._extract_categories(properties)
-
-    def _extract_title(self, properties: Dict[str, Any]) -> str:
-        for prop in properties.values():
-            if prop.get("type") == "title":
-                return "".join(
-                    p.get("plain_text", "") for p in prop.get("title", [])
-                )
-        return ""
-
-    def _extract_status(self, properties: Dict[str, Any]) -> str:
-        for key in ("Status", "status"):
-            prop = properties.get(key)
-            if not prop:
-                continue
-            ptype = prop.get("type")
-            if ptype == "status":
-                status = prop.get("status")
-                if status:
-                    return status.get("name", "")
-            elif ptype == "select":
-                select = prop.get("select")
-                if select:
-                    return select.get("name", "")
-        return ""
-
-    def _extract_date(self, properties: Dict[str, Any]) -> Optional[str]:
-        for key in ("Due", "due", "Date", "date", "Due Date", "due date"):
-            prop = properties.get(key)
-            if prop and prop.get("type") == "date":
-                date_obj = prop.get("date")
-                if date_obj:
-                    return date_obj.get("start")
-        return None
-
-    def _extract_rich_text(self, properties: Dict[str, Any], *keys: str) -> str:
-        search_keys = list(keys) + [k.lower() for k in keys]
-        for key in search_keys:
-            prop = properties.get(key)
-            if prop and prop.get("type") == "rich_text":
-                return "".join(
-                    p.get("plain_text", "") for p in prop.get("rich_text", [])
-                )
-        return ""
-
-    async def _get_category_property_name(self) -> Optional[str]:
-        if self._category_prop_name:
-            return self._category_prop_name
-
-        url = f"{NOTION_API_BASE}/databases/{self._database_id}"
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0)) as client:
-            response = await client.get(url, headers=self._headers)
-            response.raise_for_status()
-            data = response.json()
-
-        properties = data.get("properties", {})
-        self._category_prop_name = self._find_category_property_name(properties)
-        return self._category_prop_name
-
-    def _find_category_property_name(self, properties: Dict[str, Any]) -> Optional[str]:
-        preferred_keys = ("categories", "category", "categorias", "categoria")
-        for key, prop in properties.items():
-            normalized_key = key.strip().lower()
-            if normalized_key not in preferred_keys:
-                continue
-            if prop.get("type") in ("multi_select", "select"):
-                return key
-
-        for key, prop in properties.items():
-            if prop.get("type") in ("multi_select", "select"):
-                return key
-        return None
-
-    def _extract_categories(self, properties: Dict[str, Any]) -> List[str]:
-        property_name = self._find_category_property_name(properties)
-        if not property_name:
-            return []
-
-        prop = properties.get(property_name, {})
-        ptype = prop.get("type")
-        if ptype == "multi_select":
-            values = prop.get("multi_select", [])
-            return [value.get("name", "") for value in values if value.get("name")]
-        if ptype == "select":
-            value = prop.get("select")
-            if value and value.get("name"):
-                return [value["name"]]
-        return []
-
-    def _is_freela_task(self, categories: List[str]) -> bool:
-        normalized = [category.lower() for category in categories]
-        return any("freela" in category for category in normalized)
+        return extract_categories(properties.get((await self._schema.get()).category or ""))
+
+
+def _same_id(left: str, right: str) -> bool:
+    return left.replace("-", "") == right.replace("-", "")
+
+
+def _shift_start(page: Dict[str, Any]) -> str:
+    prop = (page.get("properties") or {}).get("shift_start") or {}
+    return (prop.get("date") or {}).get("start") or ""
+
+
+def _local_page(page_id: str, parent_database_id: str, properties: Dict[str, Any]) -> Dict[str, Any]:
+    # Pagina criada offline no formato de leitura da API, para o resto do bot nao distinguir.
+    now = datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    return {
+        "object": "page",
+        "id": page_id,
+        # Sem pagina ainda: o link aponta para o database.
+        "url": f"https://www.notion.so/{parent_database_id.replace('-', '')}",
+        "created_time": now,
+        "last_edited_time": now,
+        "parent": {"type": "database_id", "database_id": parent_database_id},
+        "properties": {key: _as_read_property(value) for key, value in properties.items()},
+    }
+
+
+def _rich_text(content: str) -> List[Dict[str, Any]]:
+    # Texto maior que um segmento vira varios; a leitura junta os plain_text de volta.
+    return [
+        {"text": {"content": content[i : i + RICH_TEXT_SEGMENT_LIMIT]}}
+        for i in range(0, len(content), RICH_TEXT_SEGMENT_LIMIT)
+    ] or [{"text": {"content": ""}}]
+
+
+def _as_read_property(value: Dict[str, Any]) -> Dict[str, Any]:
+    # Converte o formato de escrita ({"rich_text": [{"text": ...}]}) no formato de leitura da API.
+    ptype = next(iter(value))
+    prop = {"type": ptype, ptype: value[ptype]}
+    if ptype in ("rich_text", "title"):
+        prop[ptype] = [
+            {**part, "plain_text": (part.get("text") or {}).get("content", "")}
+            for part in value[ptype]
+        ]
+    return prop
@@ -0,0 +1,155 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from .notion_schema import DatabaseSchema
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+
+def loads(content: bytes) -> Any:
+    """Decodifica o corpo de uma resposta do Notion; usa orjson quando instalado."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+@dataclass(slots=True)
+class TaskRecord:
+    """Tarefa parseada de uma pagina do Notion.
+
+    Aceita ``task["name"]`` e ``task.get("name")`` como o dict que substituiu,
+    ocupando bem menos memoria por tarefa no mirror.
+    """
+
+    id: str
+    name: str
+    url: str
+    property_due: Optional[str]
+    property_description: str
+    property_status: str
+    property_categories: List[str]
+    property_time_min: Optional[float]
+    is_freela: bool
+    last_edited_time: Optional[str]
+    # Id local da criacao offline que esta pagina substitui (so no aviso aos listeners).
+    replaces: Optional[str] = field(default=None, compare=False)
+
+    @property
+    def property_name(self) -> str:
+        return self.name
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _TASK_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in _TASK_KEYS:
+            return default
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in _FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaskRecord":
+        return cls(**{key: data.get(key) for key in _FIELDS})
+
+
+_FIELDS = (
+    "id",
+    "name",
+    "url",
+    "property_due",
+    "property_description",
+    "property_status",
+    "property_categories",
+    "property_time_min",
+    "is_freela",
+    "last_edited_time",
+)
+_TASK_KEYS = frozenset(_FIELDS + ("property_name",))
+
+
+def compile_task_parser(schema: DatabaseSchema) -> Callable[[Dict[str, Any]], TaskRecord]:
+    """Monta, uma vez por schema, um parser que le direto as propriedades usadas pelo bot."""
+    title_key = schema.title or ""
+    status_key = schema.status or ""
+    category_key = schema.category or ""
+    date_key = schema.date or ""
+    description_key = schema.description or ""
+    time_min_key = schema.time_min or ""
+
+    def parse(page: Dict[str, Any]) -> TaskRecord:
+        properties = page.get("properties") or {}
+
+        prop = properties.get(title_key)
+        name = _plain_text(prop.get("title")) if prop else ""
+
+        status = ""
+        prop = properties.get(status_key)
+        if prop:
+            value = prop.get(prop.get("type"))
+            if isinstance(value, dict):
+                status = value.get("name", "")
+
+        due = None
+        prop = properties.get(date_key)
+        if prop and prop.get("type") == "date" and prop.get("date"):
+            due = prop["date"].get("start")
+
+        description = ""
+        prop = properties.get(description_key)
+        if prop and prop.get("type") == "rich_text":
+            description = _plain_text(prop.get("rich_text"))
+
+        time_min = None
+        prop = properties.get(time_min_key)
+        if prop and prop.get("type") == "number":
+            time_min = prop.get("number")
+
+        categories = extract_categories(properties.get(category_key))
+
+        return TaskRecord(
+            id=page.get("id", ""),
+            name=name,
+            url=page.get("url", ""),
+            property_due=due,
+            property_description=description,
+            property_status=status,
+            property_categories=categories,
+            property_time_min=time_min,
+            is_freela=any(is_freela_category(category) for category in categories),
+            last_edited_time=page.get("last_edited_time"),
+        )
+
+    return parse
+
+
+def extract_categories(prop: Optional[Dict[str, Any]]) -> List[str]:
+    if not prop:
+        return []
+    ptype = prop.get("type")
+    if ptype == "multi_select":
+        return [value["name"] for value in prop.get("multi_select") or () if value.get("name")]
+    if ptype == "select":
+        value = prop.get("select")
+        if value and value.get("name"):
+            return [value["name"]]
+    return []
+
+
+def is_freela_category(name: str) -> bool:
+    return "freela" in name.lower()
+
+
+def _plain_text(parts: Optional[List[Dict[str, Any]]]) -> str:
+    if not parts:
+        return ""
+    if len(parts) == 1:
+        return parts[0].get("plain_text", "")
+    return "".join(part.get("plain_text", "") for part in parts)
@@ -0,0 +1,62 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class NotionQuery:
+    """Monta o corpo de ``POST /databases/{id}/query`` (filter + sorts).
+
+    As condicoes adicionadas sao combinadas com ``and``; cada metodo devolve
+    ``self`` para encadear.
+    """
+
+    def __init__(self) -> None:
+        self._conditions: List[Dict[str, Any]] = []
+        self._sorts: List[Dict[str, Any]] = []
+        self._empty = False
+
+    @property
+    def empty(self) -> bool:
+        """Filtro que nao casa com nenhuma pagina (ex.: contains sem opcoes); nem precisa ir ao Notion."""
+        return self._empty
+
+    def where(self, condition: Dict[str, Any]) -> "NotionQuery":
+        self._conditions.append(condition)
+        return self
+
+    def not_equals(self, prop: str, ptype: str, values: Iterable[str]) -> "NotionQuery":
+        # ptype e o tipo da propriedade no schema: "status" ou "select".
+        for value in values:
+            self.where({"property": prop, ptype: {"does_not_equal": value}})
+        return self
+
+    def contains_any(self, prop: str, ptype: str, values: Iterable[str]) -> "NotionQuery":
+        operator = "contains" if ptype == "multi_select" else "equals"
+        options = [{"property": prop, ptype: {operator: value}} for value in values]
+        if not options:
+            self._empty = True
+        elif len(options) == 1:
+            self.where(options[0])
+        else:
+            self.where({"or": options})
+        return self
+
+    def edited_on_or_after(self, timestamp: str) -> "NotionQuery":
+        return self.where({
+            "timestamp": "last_edited_time",
+            "last_edited_time": {"on_or_after": timestamp},
+        })
+
+    def sort(self, prop: str, direction: str = "ascending") -> "NotionQuery":
+        self._sorts.append({"property": prop, "direction": direction})
+        return self
+
+    def build(self, page_size: Optional[int] = None) -> Dict[str, Any]:
+        body: Dict[str, Any] = {}
+        if len(self._conditions) == 1:
+            body["filter"] = self._conditions[0]
+        elif self._conditions:
+            body["filter"] = {"and": list(self._conditions)}
+        if self._sorts:
+            body["sorts"] = list(self._sorts)
+        if page_size:
+            body["page_size"] = page_size
+        return body
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+STATUS_KEYS = ("Status", "status")
+DATE_KEYS = ("Due", "due", "Date", "date", "Due Date", "due date")
+DESCRIPTION_KEYS = ("Description", "description")
+TIME_MIN_KEYS = ("time_min", "Time_min", "time")
+CATEGORY_KEYS = ("categories", "category", "categorias", "categoria")
+
+
+@dataclass(slots=True, frozen=True)
+class DatabaseSchema:
+    """Nomes e tipos das propriedades que o bot usa, resolvidos uma vez por schema."""
+
+    title: Optional[str] = None
+    status: Optional[str] = None
+    status_type: Optional[str] = None
+    category: Optional[str] = None
+    category_type: Optional[str] = None
+    date: Optional[str] = None
+    description: Optional[str] = None
+    time_min: Optional[str] = None
+    status_options: List[str] = field(default_factory=list)
+    category_options: List[str] = field(default_factory=list)
+    property_ids: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_properties(cls, properties: Dict[str, Any]) -> "DatabaseSchema":
+        """Aceita tanto o schema do database quanto as propriedades de uma pagina."""
+        status = _find_key(properties, STATUS_KEYS, ("status", "select"))
+        status_type = properties[status]["type"] if status else None
+        category = find_category_property_name(properties)
+        category_type = properties[category]["type"] if category else None
+        return cls(
+            title=next((k for k, p in properties.items() if p.get("type") == "title"), None),
+            status=status,
+            status_type=status_type,
+            category=category,
+            category_type=category_type,
+            date=_find_key(properties, DATE_KEYS, ("date",)),
+            description=_find_key(properties, DESCRIPTION_KEYS, ("rich_text",)),
+            time_min=_find_key(properties, TIME_MIN_KEYS, ("number",)),
+            status_options=_option_names(properties.get(status or ""), status_type),
+            category_options=_option_names(properties.get(category or ""), category_type),
+            property_ids={k: p["id"] for k, p in properties.items() if p.get("id")},
+        )
+
+    @property
+    def task_property_ids(self) -> List[str]:
+        """IDs para filter_properties: so o que o parse de tarefas le."""
+        names = (self.title, self.status, self.category, self.date, self.description, self.time_min)
+        return [self.property_ids[name] for name in names if name in self.property_ids]
+
+
+class SchemaCache:
+    """Cache com TTL do schema de um database; loads concorrentes compartilham uma unica requisicao."""
+
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[Dict[str, Any]]],
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._loader = loader
+        self._ttl = ttl
+        self._clock = clock
+        self._schema: Optional[DatabaseSchema] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def current(self) -> Optional[DatabaseSchema]:
+        """Ultimo schema carregado, mesmo expirado (para caminhos sincronos como o parse)."""
+        return self._schema
+
+    async def get(self) -> DatabaseSchema:
+        if self._schema is not None and self._clock() < self._expires_at:
+            return self._schema
+        async with self._lock:
+            if self._schema is None or self._clock() >= self._expires_at:
+                try:
+                    data = await self._loader()
+                except httpx.HTTPError:
+                    # Notion fora do ar: o schema vencido ainda serve melhor que nenhum.
+                    if self._schema is None:
+                        raise
+                    return self._schema
+                self._schema = DatabaseSchema.from_properties(data.get("properties", {}))
+                self._expires_at = self._clock() + self._ttl
+        return self._schema
+
+    def invalidate(self) -> None:
+        # Mantem o schema antigo em `current` ate o proximo get() recarregar.
+        self._expires_at = 0.0
+
+
+def find_category_property_name(properties: Dict[str, Any]) -> Optional[str]:
+    for key, prop in properties.items():
+        if key.strip().lower() in CATEGORY_KEYS and prop.get("type") in ("multi_select", "select"):
+            return key
+
+    for key, prop in properties.items():
+        if prop.get("type") in ("multi_select", "select"):
+            return key
+    return None
+
+
+def _find_key(properties: Dict[str, Any], keys, types) -> Optional[str]:
+    for key in keys:
+        prop = properties.get(key)
+        if prop and prop.get("type") in types:
+            return key
+    return None
+
+
+def _option_names(prop: Optional[Dict[str, Any]], ptype: Optional[str]) -> List[str]:
+    if not prop or not ptype:
+        return []
+    config = prop.get(ptype)
+    if not isinstance(config, dict):
+        # Propriedade de pagina (valor, nao configuracao): nao tem opcoes.
+        return []
+    options = config.get("options", [])
+    return [opt["name"] for opt in options if "name" in opt]
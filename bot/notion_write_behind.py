@@ -0,0 +1,419 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .storage import SQLiteStore
+
+LOCAL_ID_PREFIX = "local:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_writes (
+    page_id TEXT PRIMARY KEY,
+    properties TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS conflicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    page_id TEXT NOT NULL,
+    properties TEXT NOT NULL,
+    base_edited_time TEXT,
+    remote_edited_time TEXT,
+    detected_at REAL NOT NULL
+);
+"""
+
+# Colunas adicionadas depois da primeira versao da tabela.
+_MIGRATIONS = (
+    ("parent_database_id", "TEXT"),
+    ("base_edited_time", "TEXT"),
+    ("check_conflict", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+PatchFn = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+CreateFn = Callable[[str, Dict[str, Any], str], Awaitable[Dict[str, Any]]]
+EditedFn = Callable[[str], Awaitable[Optional[str]]]
+
+
+def is_local_id(page_id: str) -> bool:
+    return page_id.startswith(LOCAL_ID_PREFIX)
+
+
+@dataclass(slots=True)
+class PendingWrite:
+    page_id: str
+    properties: Dict[str, Any]
+    # Criacao feita offline: page_id e local ate o POST ser reenviado.
+    parent_database_id: Optional[str] = None
+    # last_edited_time da pagina quando a escrita foi feita, para detectar edicoes concorrentes.
+    base_edited_time: Optional[str] = None
+    check_conflict: bool = False
+    # Epoch do ultimo PATCH que falhou sem resposta (ex.: ReadTimeout) e pode ter sido aplicado.
+    unconfirmed_at: Optional[float] = None
+
+    @property
+    def is_create(self) -> bool:
+        return self.parent_database_id is not None
+
+
+class NotionWriteBehind:
+    """Fila write-behind de escritas no Notion.
+
+    Cada escrita e mesclada as pendentes da mesma pagina (a propriedade mais
+    nova vence) e gravada em SQLite antes de retornar; um flusher em background
+    manda um unico PATCH por pagina apos ``flush_delay``. O que nao foi enviado
+    sobrevive a um crash e e reenviado no proximo start.
+
+    Escritas feitas com o Notion fora do ar (ou que ja falharam uma vez) conferem
+    o ``last_edited_time`` antes do PATCH: se a pagina mudou depois da leitura em
+    que a escrita se baseou, ela vai para a tabela ``conflicts`` em vez de
+    sobrescrever a edicao remota.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_delay: float = 2.0,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 300.0,
+        request_timeout: float = 15.0,
+    ) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._store = SQLiteStore(path, _SCHEMA)
+        self._flush_delay = flush_delay
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        # Timeout das requisicoes do NotionClient: ate quando um PATCH sem resposta pode ter sido aplicado.
+        self._request_timeout = request_timeout
+        self._patch: Optional[PatchFn] = None
+        self._create: Optional[CreateFn] = None
+        self._last_edited: Optional[EditedFn] = None
+        self._pending: Dict[str, PendingWrite] = {}
+        self._dirty = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def bind(self, patch: PatchFn, create: CreateFn, last_edited: EditedFn) -> None:
+        """Registra as chamadas reais ao Notion (o NotionClient se registra aqui).
+
+        patch(page_id, properties) -> pagina; create(parent_database_id, properties, local_id) -> pagina
+        criada; last_edited(page_id) -> last_edited_time atual da pagina.
+        """
+        self._patch = patch
+        self._create = create
+        self._last_edited = last_edited
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def pending(self, page_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._pending.get(page_id)
+        return entry.properties if entry else None
+
+    def pending_creates(self, database_id: str) -> List[PendingWrite]:
+        return [
+            entry for entry in self._pending.values()
+            if entry.parent_database_id == database_id
+        ]
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        await self._store.run(_migrate)
+        rows = await self._store.run(_select_all)
+        self._pending = {
+            page_id: PendingWrite(page_id, json.loads(props), parent, base, bool(check))
+            for page_id, props, parent, base, check in rows
+        }
+        self._logger.info(
+            "Notion write-behind started",
+            extra={"context": {"path": self._store.path, "pending": len(self._pending)}},
+        )
+        if self._pending:
+            self._dirty.set()
+        self._task = asyncio.create_task(self._flush_loop(), name="notion-write-behind")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Ultima tentativa no shutdown; o que falhar continua no SQLite.
+        try:
+            await self.flush()
+        except httpx.HTTPError as exc:
+            self._logger.warning(
+                "Notion write-behind flush on shutdown failed",
+                extra={"context": {"error": str(exc), "pending": len(self._pending)}},
+            )
+        await self._store.close()
+
+    async def enqueue(
+        self,
+        page_id: str,
+        properties: Dict[str, Any],
+        base_edited_time: Optional[str] = None,
+        check_conflict: bool = False,
+    ) -> None:
+        """Retorna assim que a escrita esta mesclada e persistida localmente."""
+        current = self._pending.get(page_id) or PendingWrite(page_id, {}, base_edited_time=base_edited_time)
+        # A base continua sendo a da primeira escrita pendente; numa criacao offline
+        # a escrita e mesclada direto nas propriedades do POST.
+        entry = PendingWrite(
+            page_id,
+            {**current.properties, **properties},
+            current.parent_database_id,
+            current.base_edited_time,
+            current.check_conflict or check_conflict,
+        )
+        # Memoria primeiro: uma escrita concorrente na mesma pagina ja mescla sobre esta.
+        self._pending[page_id] = entry
+        await self._store.run(_upsert, entry, _dumps(entry.properties))
+        self._dirty.set()
+
+    async def enqueue_create(self, parent_database_id: str, properties: Dict[str, Any]) -> str:
+        """Enfileira a criacao de uma pagina; devolve o id local usado ate o reenvio."""
+        local_id = f"{LOCAL_ID_PREFIX}{uuid.uuid4()}"
+        entry = PendingWrite(local_id, dict(properties), parent_database_id)
+        self._pending[local_id] = entry
+        await self._store.run(_upsert, entry, _dumps(entry.properties))
+        self._dirty.set()
+        return local_id
+
+    async def discard(self, page_id: str) -> None:
+        """Descarta escritas pendentes (ex.: a pagina foi arquivada)."""
+        if self._pending.pop(page_id, None) is not None:
+            await self._store.run(_delete, page_id, None)
+
+    async def flush(self) -> int:
+        """Envia todas as paginas pendentes; devolve quantas foram processadas.
+
+        Erros transitorios (rede, 429, 5xx) interrompem o flush e sao propagados.
+        """
+        async with self._flush_lock:
+            flushed = 0
+            # Criacoes primeiro, na ordem em que foram feitas.
+            entries = sorted(self._pending.values(), key=lambda entry: not entry.is_create)
+            for entry in entries:
+                await self._flush_entry(entry)
+                flushed += 1
+            return flushed
+
+    async def _flush_entry(self, entry: PendingWrite) -> None:
+        edited_time: Optional[str] = None
+        sent_at: Optional[float] = None
+        try:
+            if entry.is_create:
+                page = await self._create(entry.parent_database_id, entry.properties, entry.page_id)
+                await self._promote(entry, page)
+            elif await self._has_conflict(entry):
+                return
+            else:
+                sent_at = time.time()
+                page = await self._patch(entry.page_id, entry.properties)
+                edited_time = page.get("last_edited_time")
+        except httpx.HTTPStatusError as exc:
+            status = exc.response.status_code
+            if status == 429 or status >= 500:
+                await self._mark_failed(entry)
+                raise
+            # 4xx: repetir nao vai ajudar (pagina arquivada, propriedade removida...).
+            self._logger.error(
+                "Notion write-behind dropped rejected write",
+                extra={
+                    "context": {
+                        "page_id": entry.page_id,
+                        "status": status,
+                        "properties": list(entry.properties),
+                        "body": exc.response.text[:500],
+                    }
+                },
+            )
+        except (httpx.ReadTimeout, httpx.RemoteProtocolError):
+            # Se foi no PATCH, ele chegou ao Notion e a resposta se perdeu: pode ter sido aplicado.
+            await self._mark_failed(entry, sent_at)
+            raise
+        except httpx.HTTPError:
+            await self._mark_failed(entry)
+            raise
+
+        await self._forget(entry, edited_time)
+
+    async def _promote(self, entry: PendingWrite, page: Dict[str, Any]) -> None:
+        # Escritas feitas no id local durante o POST viram um PATCH na pagina real,
+        # com base na versao que o proprio POST criou.
+        current = self._pending.get(entry.page_id)
+        if current is not None and current is not entry:
+            del self._pending[entry.page_id]
+            await self._store.run(_delete, entry.page_id, None)
+            await self.enqueue(page["id"], current.properties, base_edited_time=page.get("last_edited_time"))
+
+    async def _has_conflict(self, entry: PendingWrite) -> bool:
+        if not entry.check_conflict or not entry.base_edited_time:
+            return False
+        remote = await self._last_edited(entry.page_id)
+        if not remote or remote <= entry.base_edited_time:
+            return False
+        if self._edited_by_unconfirmed_patch(entry, remote):
+            # A edicao e o nosso PATCH sem resposta: rebase e reenvia (o PATCH e idempotente).
+            await self._rebase(entry, remote)
+            return False
+        await self._store.run(_insert_conflict, entry, _dumps(entry.properties), remote)
+        await self._forget(entry)
+        self._logger.error(
+            "Notion write conflict, page was edited after the queued write was made",
+            extra={
+                "context": {
+                    "page_id": entry.page_id,
+                    "properties": list(entry.properties),
+                    "base_edited_time": entry.base_edited_time,
+                    "remote_edited_time": remote,
+                }
+            },
+        )
+        return True
+
+    def _edited_by_unconfirmed_patch(self, entry: PendingWrite, remote: str) -> bool:
+        # So a janela em que o PATCH podia estar no ar (minuto do envio ate o fim do timeout);
+        # uma edicao depois disso e de outra pessoa e continua sendo conflito.
+        sent_at = entry.unconfirmed_at
+        if sent_at is None:
+            return False
+        return _edited_minute(sent_at) <= remote < _edited_minute(sent_at + self._request_timeout + 60)
+
+    async def _mark_failed(self, entry: PendingWrite, unconfirmed_at: Optional[float] = None) -> None:
+        # Depois de uma falha a escrita vira reenvio: passa a conferir conflitos.
+        current = self._pending.get(entry.page_id)
+        if current is not None:
+            current.check_conflict = True
+            if unconfirmed_at is not None:
+                current.unconfirmed_at = unconfirmed_at
+        await self._store.run(_mark_attempt, entry.page_id)
+
+    async def _forget(self, entry: PendingWrite, edited_time: Optional[str] = None) -> None:
+        # Se a pagina recebeu outra escrita durante o envio, ela fica para o proximo flush,
+        # com base na versao que o PATCH acabou de gravar (senao conflitaria com ele mesmo).
+        current = self._pending.get(entry.page_id)
+        if current is entry:
+            del self._pending[entry.page_id]
+        elif current is not None and edited_time:
+            await self._rebase(current, edited_time)
+        await self._store.run(_delete, entry.page_id, _dumps(entry.properties))
+
+    async def _rebase(self, entry: PendingWrite, edited_time: str) -> None:
+        entry.base_edited_time = edited_time
+        entry.unconfirmed_at = None
+        await self._store.run(_set_base, entry.page_id, edited_time)
+
+    async def _flush_loop(self) -> None:
+        delay = self._retry_delay
+        while True:
+            await self._dirty.wait()
+            # Janela curta para juntar varias escritas da mesma pagina num PATCH.
+            await asyncio.sleep(self._flush_delay)
+            self._dirty.clear()
+            try:
+                await self.flush()
+                delay = self._retry_delay
+            except (httpx.HTTPError, sqlite3.Error) as exc:
+                self._logger.warning(
+                    "Notion write-behind flush failed",
+                    extra={"context": {"error": str(exc), "pending": len(self._pending), "retry_in": delay}},
+                )
+                self._dirty.set()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._max_retry_delay)
+
+
+def _dumps(properties: Dict[str, Any]) -> str:
+    return json.dumps(properties, ensure_ascii=False, sort_keys=True)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(pending_writes)")}
+    with conn:
+        for name, definition in _MIGRATIONS:
+            if name not in columns:
+                conn.execute(f"ALTER TABLE pending_writes ADD COLUMN {name} {definition}")
+
+
+def _select_all(conn: sqlite3.Connection) -> List[Tuple[str, str, Optional[str], Optional[str], int]]:
+    return conn.execute(
+        """
+        SELECT page_id, properties, parent_database_id, base_edited_time, check_conflict
+        FROM pending_writes ORDER BY updated_at
+        """
+    ).fetchall()
+
+
+def _upsert(conn: sqlite3.Connection, entry: PendingWrite, properties: str) -> None:
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO pending_writes
+                (page_id, properties, updated_at, parent_database_id, base_edited_time, check_conflict)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(page_id) DO UPDATE SET
+                properties = excluded.properties,
+                updated_at = excluded.updated_at,
+                check_conflict = excluded.check_conflict
+            """,
+            (
+                entry.page_id,
+                properties,
+                time.time(),
+                entry.parent_database_id,
+                entry.base_edited_time,
+                int(entry.check_conflict),
+            ),
+        )
+
+
+def _delete(conn: sqlite3.Connection, page_id: str, properties: Optional[str]) -> None:
+    # Com properties, so apaga se a linha ainda e exatamente o que foi enviado.
+    with conn:
+        if properties is None:
+            conn.execute("DELETE FROM pending_writes WHERE page_id = ?", (page_id,))
+        else:
+            conn.execute(
+                "DELETE FROM pending_writes WHERE page_id = ? AND properties = ?", (page_id, properties)
+            )
+
+
+def _edited_minute(epoch: float) -> str:
+    # last_edited_time do Notion e truncado no minuto: o PATCH enviado nesse epoch aparece assim.
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+def _set_base(conn: sqlite3.Connection, page_id: str, base_edited_time: str) -> None:
+    with conn:
+        conn.execute(
+            "UPDATE pending_writes SET base_edited_time = ? WHERE page_id = ?", (base_edited_time, page_id)
+        )
+
+
+def _mark_attempt(conn: sqlite3.Connection, page_id: str) -> None:
+    with conn:
+        conn.execute(
+            "UPDATE pending_writes SET attempts = attempts + 1, check_conflict = 1 WHERE page_id = ?",
+            (page_id,),
+        )
+
+
+def _insert_conflict(conn: sqlite3.Connection, entry: PendingWrite, properties: str, remote: str) -> None:
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO conflicts (page_id, properties, base_edited_time, remote_edited_time, detected_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (entry.page_id, properties, entry.base_edited_time, remote, time.time()),
+        )
@@ -0,0 +1,124 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_READ = 1
+PRIORITY_BACKGROUND = 2
+
+LANE_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_READ: "read",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+class PriorityRateLimiter:
+    """Token bucket com fila de prioridade: quando falta token, quem tem a menor
+    prioridade numerica e atendido primeiro (FIFO dentro da mesma faixa)."""
+
+    def __init__(
+        self,
+        rate: float = 3.0,
+        burst: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._rate = max(0.1, rate)
+        self._burst = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self._burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._lanes: Dict[int, Dict[str, float]] = {
+            priority: {"acquired": 0, "waited": 0, "wait_total_ms": 0.0, "wait_max_ms": 0.0}
+            for priority in LANE_NAMES
+        }
+
+    @property
+    def depth(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            LANE_NAMES[priority]: {
+                **lane,
+                "wait_total_ms": round(lane["wait_total_ms"], 1),
+                "wait_avg_ms": round(lane["wait_total_ms"] / lane["acquired"], 1) if lane["acquired"] else 0.0,
+            }
+            for priority, lane in self._lanes.items()
+        }
+
+    async def acquire(self, priority: int = PRIORITY_READ) -> float:
+        """Aguarda um token e devolve quantos segundos ficou na fila."""
+        started = self._clock()
+        if not self._waiters and self._try_take():
+            self._record(priority, 0.0)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="notion-rate-limiter")
+        # Um cancelamento deixa o future cancelado no heap; o dispatcher o descarta.
+        await future
+        waited = self._clock() - started
+        self._record(priority, waited)
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """Segura todas as faixas (ex.: Retry-After de um 429)."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+        self._tokens = 0.0
+        self._wakeup.set()
+
+    def _record(self, priority: int, waited: float) -> None:
+        lane = self._lanes.setdefault(
+            priority, {"acquired": 0, "waited": 0, "wait_total_ms": 0.0, "wait_max_ms": 0.0}
+        )
+        waited_ms = waited * 1000
+        lane["acquired"] += 1
+        if waited_ms > 0:
+            lane["waited"] += 1
+        lane["wait_total_ms"] += waited_ms
+        lane["wait_max_ms"] = max(lane["wait_max_ms"], round(waited_ms, 1))
+
+    def _refill(self) -> float:
+        now = self._clock()
+        if now < self._paused_until:
+            self._updated = now
+            return self._paused_until - now
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self._rate
+
+    def _try_take(self) -> bool:
+        if self._refill() > 0:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+            if not self._waiters:
+                return
+            delay = self._refill()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._tokens -= 1
+            _, _, future = heapq.heappop(self._waiters)
+            future.set_result(None)
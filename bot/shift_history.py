@@ -0,0 +1,263 @@
+import asyncio
+import bisect
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .notion_client import NotionClient
+from .notion_query import NotionQuery
+from .notion_write_behind import is_local_id
+from .rate_limiter import PRIORITY_BACKGROUND, PRIORITY_READ
+from .shift_manager import ShiftRecord, decode_entries, parse_shift_page
+from .shift_report import ShiftArrays
+from .storage import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shifts (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    shift_start TEXT,
+    entries TEXT NOT NULL,
+    last_edited_time TEXT
+);
+"""
+
+# (id, name, url, shift_start, entries, last_edited_time)
+Row = Tuple[str, str, str, Optional[str], str, Optional[str]]
+# (epoch da primeira batida, id): ordena o historico e marca onde comeca cada pagina do !shifts.
+ShiftCursor = Tuple[int, str]
+
+
+class ShiftHistory:
+    """Historico local de todos os turnos, base do ``!shifts-report``.
+
+    Mesmo esquema do ``TaskMirror``: um sync completo na primeira vez (e de
+    tempos em tempos, para remover turnos arquivados) e depois so as paginas
+    editadas desde a ultima vista. Os turnos ficam em SQLite, entao um restart
+    nao baixa tudo de novo, e os escritos pelo ``ShiftState`` entram na hora.
+    Os arrays do relatorio e a ordem usada na paginacao so sao remontados
+    quando algo mudou.
+    """
+
+    def __init__(
+        self,
+        notion_client: NotionClient,
+        path: str,
+        refresh_interval: float = 900.0,
+        full_sync_interval: float = 86400.0,
+        tz_name: Optional[str] = None,
+    ) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._notion = notion_client
+        self._store = SQLiteStore(path, _SCHEMA)
+        self._refresh_interval = refresh_interval
+        self._full_sync_interval = full_sync_interval
+        self._tz_name = tz_name
+        self._shifts: Dict[str, ShiftRecord] = {}
+        self._arrays: Optional[ShiftArrays] = None
+        self._ordered: Optional[Tuple[List[ShiftCursor], List[ShiftRecord]]] = None
+        self._watermark: Optional[str] = None
+        self._synced_at: Optional[float] = None
+        self._full_synced_at: Optional[float] = None
+        # Um dict por sync completo em andamento: turnos escritos via apply(), reaplicados no fim dele.
+        self._sync_applied: List[Dict[str, Optional[ShiftRecord]]] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._synced_at is not None
+
+    def __len__(self) -> int:
+        return len(self._shifts)
+
+    async def start(self) -> None:
+        if not self._notion.shifts_database_id:
+            return
+        if not self.ready:
+            await self._load()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(), name="shift-history-refresh")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._store.close()
+
+    def apply(self, shift_id: str, shift: Optional[ShiftRecord]) -> None:
+        """Listener do ``ShiftState``: o turno escrito entra (ou sai) do historico na hora."""
+        # Criacao offline ainda sem pagina no Notion: entra pelo sync quando for enviada.
+        if is_local_id(shift_id):
+            return
+        for applied in self._sync_applied:
+            applied[shift_id] = shift
+        if shift is None:
+            self._shifts.pop(shift_id, None)
+        else:
+            self._shifts[shift_id] = shift
+        self._changed()
+
+    async def arrays(self) -> ShiftArrays:
+        """Batidas de todos os turnos em arrays; so vai ao Notion se o historico ainda esta vazio."""
+        if not self.ready:
+            await self.refresh(priority=PRIORITY_READ)
+        if self._arrays is None:
+            self._arrays = ShiftArrays.from_shifts(list(self._shifts.values()), self._tz_name)
+        return self._arrays
+
+    async def page(
+        self,
+        before: Optional[ShiftCursor] = None,
+        limit: int = 10,
+    ) -> Tuple[List[ShiftRecord], Optional[ShiftCursor]]:
+        """Ate ``limit`` turnos anteriores ao cursor, mais novo primeiro, e o cursor da pagina seguinte."""
+        if not self.ready:
+            await self.refresh(priority=PRIORITY_READ)
+        if self._ordered is None:
+            shifts = sorted(self._shifts.values(), key=shift_cursor)
+            self._ordered = [shift_cursor(shift) for shift in shifts], shifts
+        keys, shifts = self._ordered
+        end = len(keys) if before is None else bisect.bisect_left(keys, before)
+        start = max(0, end - limit)
+        return shifts[start:end][::-1], keys[start] if start else None
+
+    async def refresh(self, full: bool = False, priority: int = PRIORITY_BACKGROUND) -> None:
+        async with self._lock:
+            if full or self._watermark is None:
+                await self._full_sync(priority)
+            else:
+                await self._incremental_sync(priority)
+
+    async def _full_sync(self, priority: int) -> None:
+        started = time.monotonic()
+        rows: List[Row] = []
+        applied: Dict[str, Optional[ShiftRecord]] = {}
+        self._sync_applied.append(applied)
+        try:
+            async for pages in self._notion.iter_shift_pages(priority=priority):
+                rows.extend(self._row(page) for page in pages)
+            await self._store.run(_replace_all, rows)
+        finally:
+            self._sync_applied.remove(applied)
+        shifts = {row[0]: self._record(row) for row in rows}
+        # Escritas do ShiftState durante o sync sao mais novas que as paginas ja lidas.
+        for shift_id, shift in applied.items():
+            if shift is None:
+                shifts.pop(shift_id, None)
+            else:
+                shifts[shift_id] = shift
+        self._shifts = shifts
+        self._changed()
+        self._watermark = _max_edited(rows, None)
+        self._synced_at = self._full_synced_at = time.monotonic()
+        self._logger.info(
+            "Shift history synced",
+            extra={
+                "context": {
+                    "shifts": len(rows),
+                    "duration_ms": round((self._synced_at - started) * 1000, 1),
+                }
+            },
+        )
+
+    async def _incremental_sync(self, priority: int) -> None:
+        # last_edited_time do Notion tem precisao de minuto: on_or_after repete o ultimo minuto de proposito.
+        query = NotionQuery().edited_on_or_after(self._watermark)
+        rows: List[Row] = []
+        async for pages in self._notion.iter_shift_pages(query=query, priority=priority):
+            rows.extend(self._row(page) for page in pages)
+        self._synced_at = time.monotonic()
+        if not rows:
+            return
+        await self._store.run(_upsert, rows)
+        self._shifts.update((row[0], self._record(row)) for row in rows)
+        self._changed()
+        self._watermark = _max_edited(rows, self._watermark)
+        self._logger.debug(
+            "Shift history refreshed",
+            extra={"context": {"changed": len(rows), "watermark": self._watermark}},
+        )
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            full = (
+                self._full_synced_at is None
+                or time.monotonic() - self._full_synced_at >= self._full_sync_interval
+            )
+            try:
+                await self.refresh(full=full)
+            except sqlite3.Error as exc:
+                self._logger.warning(
+                    "Failed to save shift history",
+                    extra={"context": {"error": str(exc)}},
+                )
+            except Exception as exc:
+                # Rede ou uma pagina que nao parseia: o loop segue e tenta de novo.
+                self._logger.warning(
+                    "Shift history refresh failed",
+                    extra={"context": {"error": str(exc), "error_type": type(exc).__name__, "full": full}},
+                )
+            await asyncio.sleep(self._refresh_interval)
+
+    async def _load(self) -> None:
+        rows = await self._store.run(_select_all)
+        if not rows:
+            return
+        self._shifts = {row[0]: self._record(row) for row in rows}
+        self._watermark = _max_edited(rows, None)
+        # O banco local conta como o ultimo sync completo: o restart so busca o que mudou.
+        self._synced_at = self._full_synced_at = time.monotonic()
+        self._logger.info("Shift history loaded", extra={"context": {"shifts": len(rows)}})
+
+    def _changed(self) -> None:
+        self._arrays = None
+        self._ordered = None
+
+    def _row(self, page: Dict[str, Any]) -> Row:
+        shift = parse_shift_page(page, self._tz_name)
+        return shift.id, shift.name, shift.url, shift.shift_start, shift.entries_raw, page.get("last_edited_time")
+
+    def _record(self, row: Row) -> ShiftRecord:
+        shift_id, name, url, shift_start, entries, _ = row
+        return ShiftRecord(
+            id=shift_id,
+            name=name,
+            url=url,
+            shift_start=shift_start,
+            timestamps=decode_entries(entries, shift_start, self._tz_name),
+            tz_name=self._tz_name,
+        )
+
+
+def shift_cursor(shift: ShiftRecord) -> ShiftCursor:
+    return (shift.timestamps[0] if shift.timestamps else 0), shift.id
+
+
+def _max_edited(rows: List[Row], current: Optional[str]) -> Optional[str]:
+    # Timestamps ISO 8601 em UTC do Notion comparam corretamente como string.
+    for row in rows:
+        edited = row[5]
+        if edited and (current is None or edited > current):
+            current = edited
+    return current
+
+
+def _select_all(conn: sqlite3.Connection) -> List[Row]:
+    return conn.execute(
+        "SELECT id, name, url, shift_start, entries, last_edited_time FROM shifts"
+    ).fetchall()
+
+
+def _replace_all(conn: sqlite3.Connection, rows: List[Row]) -> None:
+    with conn:
+        conn.execute("DELETE FROM shifts")
+        conn.executemany("INSERT INTO shifts VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def _upsert(conn: sqlite3.Connection, rows: List[Row]) -> None:
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO shifts VALUES (?, ?, ?, ?, ?, ?)", rows)
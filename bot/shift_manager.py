@@ -1,9 +1,17 @@
 import json
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 from zoneinfo import ZoneInfo
 
 DEFAULT_TZ = "America/Sao_Paulo"
+# Prefixo do formato compacto das batidas; paginas sem ele estao no formato antigo (JSON de "HH:MM").
+ENTRIES_VERSION = "v2"
+# Resumos de turnos fechados guardados; cobre folgado o historico listado pelos comandos.
+SUMMARY_CACHE_SIZE = 1024
 
 
 def _tz(tz_name: Optional[str] = None) -> ZoneInfo:
@@ -22,53 +30,124 @@ def parse_entries(raw: str) -> List[str]:
     return []
 
 
-def serialize_entries(entries: List[str]) -> str:
-    return json.dumps(entries)
+def encode_entries(timestamps: List[int]) -> str:
+    """Formato compacto: ``"v2 <epoch da primeira> <segundos desde a anterior>..."``.
+
+    Uma batida nova so acrescenta um numero ao fim do texto, entao o texto
+    anterior continua sendo prefixo do novo.
+    """
+    parts = [ENTRIES_VERSION]
+    previous = 0
+    for ts in timestamps:
+        parts.append(str(ts - previous))
+        previous = ts
+    return " ".join(parts)
+
+
+def decode_entries(
+    raw: str,
+    shift_start: Optional[str] = None,
+    tz_name: Optional[str] = None,
+) -> List[int]:
+    """Batidas em epoch seconds, lendo o formato compacto ou o antigo ("HH:MM")."""
+    raw = raw.strip() if raw else ""
+    if not raw:
+        return []
+    version, _, body = raw.partition(" ")
+    if version != ENTRIES_VERSION:
+        return _legacy_timestamps(parse_entries(raw), shift_start, tz_name)
+    timestamps: List[int] = []
+    current = 0
+    try:
+        for delta in body.split():
+            current += int(delta)
+            timestamps.append(current)
+    except ValueError:
+        return []
+    return timestamps
+
+
+def _legacy_timestamps(
+    entries: List[str],
+    shift_start: Optional[str],
+    tz_name: Optional[str],
+) -> List[int]:
+    # "HH:MM" ganha a data do inicio do turno; horario menor que o anterior passou da meia-noite.
+    tz = _tz(tz_name)
+    day = _start_date(shift_start, tz)
+    timestamps: List[int] = []
+    for entry in entries:
+        try:
+            parsed = datetime.strptime(entry, "%H:%M")
+        except ValueError:
+            continue
+        at = datetime(day.year, day.month, day.day, parsed.hour, parsed.minute, tzinfo=tz)
+        if timestamps and at.timestamp() < timestamps[-1]:
+            day += timedelta(days=1)
+            at += timedelta(days=1)
+        timestamps.append(int(at.timestamp()))
+    return timestamps
+
+
+def _start_date(shift_start: Optional[str], tz: ZoneInfo) -> date:
+    if shift_start:
+        try:
+            start = datetime.fromisoformat(shift_start)
+        except ValueError:
+            start = None
+        if start is not None:
+            return start.astimezone(tz).date() if start.tzinfo else start.date()
+    return datetime.now(tz).date()
 
 
 def is_shift_open(entries: List[str]) -> bool:
     return len(entries) % 2 != 0
 
 
-def current_status(entries: List[str]) -> str:
-    if not entries:
-        return "Sem entradas"
-    return "Trabalhando" if is_shift_open(entries) else "Pausa / Encerrado"
+def now_local(tz_name: Optional[str] = None) -> datetime:
+    return datetime.now(_tz(tz_name))
 
 
-def now_timestamp(tz_name: Optional[str] = None) -> str:
-    return datetime.now(_tz(tz_name)).strftime("%H:%M")
+def calculate_summary(shift: "ShiftRecord", now: Optional[float] = None) -> Dict[str, Any]:
+    """Calculates work periods, pauses, and totals from the shift timestamps.
 
+    A closed shift no longer changes, so its summary is computed once and cached;
+    each call gets its own copy, so callers may modify the result freely.
+    """
+    if shift.is_open:
+        return _summarize(tuple(shift.timestamps), shift.tz_name, time.time() if now is None else now)
+    cached = _closed_summary(tuple(shift.timestamps), shift.tz_name)
+    return {**cached, "work_periods": list(cached["work_periods"]), "pauses": list(cached["pauses"])}
 
-def now_local(tz_name: Optional[str] = None) -> datetime:
-    return datetime.now(_tz(tz_name))
 
+@lru_cache(maxsize=SUMMARY_CACHE_SIZE)
+def _closed_summary(timestamps: Tuple[int, ...], tz_name: Optional[str]) -> Mapping[str, Any]:
+    # Compartilhado entre chamadas: guardado somente leitura (tuplas numa MappingProxyType).
+    summary = _summarize(timestamps, tz_name, None)
+    summary["work_periods"] = tuple(summary["work_periods"])
+    summary["pauses"] = tuple(summary["pauses"])
+    return MappingProxyType(summary)
 
-def calculate_summary(entries: List[str], tz_name: Optional[str] = None) -> Dict[str, Any]:
-    """Calculates work periods, pauses, and totals from entry timestamps."""
-    local_tz = _tz(tz_name)
-    parsed = _parse_times(entries, local_tz)
-    if not parsed:
+
+def _summarize(timestamps: Tuple[int, ...], tz_name: Optional[str], now: Optional[float]) -> Dict[str, Any]:
+    if not timestamps:
         return {"work_periods": [], "pauses": [], "total_work_min": 0, "total_pause_min": 0}
 
+    labels = _labels(timestamps, tz_name)
     work_periods: List[Tuple[str, str, int]] = []
     pauses: List[Tuple[str, str, int]] = []
 
-    for i in range(0, len(parsed), 2):
-        start = parsed[i]
-        if i + 1 < len(parsed):
-            end = parsed[i + 1]
-            mins = _diff_minutes(start, end)
-            work_periods.append((entries[i], entries[i + 1], mins))
+    for i in range(0, len(timestamps), 2):
+        if i + 1 < len(timestamps):
+            mins = _diff_minutes(timestamps[i], timestamps[i + 1])
+            work_periods.append((labels[i], labels[i + 1], mins))
         else:
-            mins = _diff_minutes(start, datetime.now(local_tz))
-            work_periods.append((entries[i], "agora", mins))
+            mins = _diff_minutes(timestamps[i], now)
+            work_periods.append((labels[i], "agora", mins))
 
-    for i in range(1, len(parsed) - 1, 2):
-        pause_start = parsed[i]
-        pause_end = parsed[i + 1]
-        mins = _diff_minutes(pause_start, pause_end)
-        pauses.append((entries[i], entries[i + 1], mins))
+    for i in range(1, len(timestamps) - 1, 2):
+        mins = _diff_minutes(timestamps[i], timestamps[i + 1])
+        pauses.append((labels[i], labels[i + 1], mins))
 
     total_work = sum(p[2] for p in work_periods)
     total_pause = sum(p[2] for p in pauses)
@@ -99,28 +178,81 @@ def build_history_line(entries: List[str]) -> str:
     return " > ".join(parts)
 
 
-def _parse_times(entries: List[str], local_tz: Optional[ZoneInfo] = None) -> List[datetime]:
-    tz = local_tz or _tz()
-    today = datetime.now(tz).date()
-    result = []
-    for e in entries:
-        try:
-            t = datetime.strptime(e, "%H:%M").replace(
-                year=today.year, month=today.month, day=today.day,
-                tzinfo=tz,
-            )
-            result.append(t)
-        except ValueError:
-            continue
-    return result
+def _labels(timestamps: Iterable[int], tz_name: Optional[str]) -> List[str]:
+    tz = _tz(tz_name)
+    return [datetime.fromtimestamp(ts, tz).strftime("%H:%M") for ts in timestamps]
 
 
-def _diff_minutes(start: datetime, end: datetime) -> int:
-    delta = end - start
-    return max(0, int(delta.total_seconds() / 60))
+def _diff_minutes(start: float, end: float) -> int:
+    return max(0, int((end - start) / 60))
 
 
-def parse_shift_page(page: Dict[str, Any]) -> Dict[str, Any]:
+@dataclass(slots=True)
+class ShiftRecord:
+    """Turno parseado de uma pagina do Notion, com as batidas em epoch seconds.
+
+    Aceita ``shift["entries"]`` como o dict que substituiu; ``entries`` sao as
+    batidas em "HH:MM" no fuso do turno.
+    """
+
+    id: str
+    name: str
+    url: str
+    shift_start: Optional[str]
+    timestamps: List[int]
+    tz_name: Optional[str] = None
+
+    @property
+    def entries(self) -> List[str]:
+        return _labels(self.timestamps, self.tz_name)
+
+    @property
+    def entries_raw(self) -> str:
+        return encode_entries(self.timestamps)
+
+    @property
+    def is_open(self) -> bool:
+        return is_shift_open(self.timestamps)
+
+    def with_timestamps(self, timestamps: List[int]) -> "ShiftRecord":
+        return replace(self, timestamps=timestamps)
+
+    def timestamp_at(self, hhmm: str) -> int:
+        """Epoch de um "HH:MM" digitado para este turno: no dia da ultima batida, ou no seguinte se ja passou."""
+        parsed = datetime.strptime(hhmm, "%H:%M")
+        tz = _tz(self.tz_name)
+        if self.timestamps:
+            day = datetime.fromtimestamp(self.timestamps[-1], tz).date()
+        else:
+            day = _start_date(self.shift_start, tz)
+        at = datetime(day.year, day.month, day.day, parsed.hour, parsed.minute, tzinfo=tz)
+        if self.timestamps and at.timestamp() < self.timestamps[-1]:
+            at += timedelta(days=1)
+        return int(at.timestamp())
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _SHIFT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in _SHIFT_KEYS:
+            return default
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in _SHIFT_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ShiftRecord":
+        return cls(**{key: data.get(key) for key in _SHIFT_FIELDS})
+
+
+_SHIFT_FIELDS = ("id", "name", "url", "shift_start", "timestamps", "tz_name")
+_SHIFT_KEYS = frozenset(_SHIFT_FIELDS + ("entries", "entries_raw", "is_open"))
+
+
+def parse_shift_page(page: Dict[str, Any], tz_name: Optional[str] = None) -> ShiftRecord:
     properties = page.get("properties", {})
 
     name = ""
@@ -147,14 +279,11 @@ def parse_shift_page(page: Dict[str, Any]) -> Dict[str, Any]:
                 shift_start = date_obj.get("start")
             break
 
-    entries = parse_entries(entries_raw)
-
-    return {
-        "id": page.get("id", ""),
-        "name": name,
-        "url": page.get("url", ""),
-        "shift_start": shift_start,
-        "entries": entries,
-        "entries_raw": entries_raw,
-        "is_open": is_shift_open(entries),
-    }
+    return ShiftRecord(
+        id=page.get("id", ""),
+        name=name,
+        url=page.get("url", ""),
+        shift_start=shift_start,
+        timestamps=decode_entries(entries_raw, shift_start, tz_name),
+        tz_name=tz_name,
+    )
@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from .shift_manager import DEFAULT_TZ, ShiftRecord
+
+WEEKDAY_NAMES = ("Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom")
+# Periodos aceitos pelo !shifts-report; sem argumento vale a semana.
+REPORT_PERIODS = ("week", "month", "custom")
+
+
+@dataclass(frozen=True)
+class ShiftArrays:
+    """Batidas de todos os turnos num array so, ordenadas pelo inicio do turno.
+
+    ``offsets[i]:offsets[i + 1]`` sao as batidas do turno ``i``; ``owner`` e
+    ``position`` dizem de qual turno e em que posicao esta cada batida, o que
+    basta para separar trabalho (posicao par) de pausa (impar) sem loop.
+    """
+
+    timestamps: np.ndarray
+    owner: np.ndarray
+    position: np.ndarray
+    offsets: np.ndarray
+    # Dia local (date.toordinal) do inicio de cada turno, crescente.
+    days: np.ndarray
+
+    @classmethod
+    def from_shifts(cls, shifts: Sequence[ShiftRecord], tz_name: Optional[str] = None) -> "ShiftArrays":
+        tz = ZoneInfo(tz_name or DEFAULT_TZ)
+        shifts = sorted((s for s in shifts if s.timestamps), key=lambda s: s.timestamps[0])
+        counts = np.fromiter((len(s.timestamps) for s in shifts), dtype=np.int64, count=len(shifts))
+        offsets = np.zeros(len(shifts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        timestamps = np.fromiter(
+            (ts for s in shifts for ts in s.timestamps), dtype=np.int64, count=int(offsets[-1])
+        )
+        owner = np.repeat(np.arange(len(shifts), dtype=np.int64), counts)
+        position = np.arange(len(timestamps), dtype=np.int64) - offsets[owner]
+        days = np.fromiter(
+            (datetime.fromtimestamp(s.timestamps[0], tz).toordinal() for s in shifts),
+            dtype=np.int64,
+            count=len(shifts),
+        )
+        return cls(timestamps, owner, position, offsets, days)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+@dataclass(frozen=True)
+class ShiftReport:
+    start: date
+    end: date
+    shifts: int
+    days_worked: int
+    total_work_min: int
+    total_pause_min: int
+    pause_count: int
+    # Meta: horas por dia util (seg-sex) do periodo; fim de semana trabalhado e todo hora extra.
+    target_min: int
+    overtime_min: int
+    weekday_work_min: Tuple[int, ...]
+    weekday_days: Tuple[int, ...]
+
+    @property
+    def balance_min(self) -> int:
+        return self.total_work_min - self.target_min
+
+    @property
+    def average_pause_min(self) -> float:
+        return self.total_pause_min / self.pause_count if self.pause_count else 0.0
+
+
+def build_report(
+    arrays: ShiftArrays,
+    start: date,
+    end: date,
+    target_hours: float,
+    now: float,
+) -> ShiftReport:
+    """Totais do periodo (inclusive), calculados de uma vez sobre os arrays do historico."""
+    first, last = np.searchsorted(arrays.days, [start.toordinal(), end.toordinal() + 1])
+    lo, hi = arrays.offsets[first], arrays.offsets[last]
+    timestamps = arrays.timestamps[lo:hi]
+    owner = arrays.owner[lo:hi] - first
+    position = arrays.position[lo:hi]
+    shift_days = arrays.days[first:last]
+
+    # Cada batida fecha o intervalo aberto pela anterior do mesmo turno; a ultima de um turno aberto vai ate agora.
+    has_next = np.zeros(len(timestamps), dtype=bool)
+    has_next[:-1] = owner[1:] == owner[:-1]
+    ends = np.full(len(timestamps), int(now), dtype=np.int64)
+    ends[:-1] = np.where(has_next[:-1], timestamps[1:], int(now))
+    minutes = np.maximum(0, (ends - timestamps) // 60)
+    working = position % 2 == 0
+    paused = has_next & ~working
+
+    shift_work = np.bincount(owner[working], weights=minutes[working], minlength=len(shift_days))
+    days, day_index = np.unique(shift_days, return_inverse=True)
+    day_work = np.bincount(day_index, weights=shift_work, minlength=len(days))
+    weekdays = (days - 1) % 7
+
+    target_day = round(target_hours * 60)
+    day_target = np.where(weekdays < 5, target_day, 0)
+    workdays = int(np.busday_count(start, end + timedelta(days=1)))
+
+    return ShiftReport(
+        start=start,
+        end=end,
+        shifts=len(shift_days),
+        days_worked=len(days),
+        total_work_min=int(minutes[working].sum()),
+        total_pause_min=int(minutes[paused].sum()),
+        pause_count=int(paused.sum()),
+        target_min=workdays * target_day,
+        overtime_min=int(np.maximum(0, day_work - day_target).sum()),
+        weekday_work_min=tuple(int(m) for m in np.bincount(weekdays, weights=day_work, minlength=7)),
+        weekday_days=tuple(int(n) for n in np.bincount(weekdays, minlength=7)),
+    )
+
+
+def parse_report_period(args: str, today: date) -> Tuple[str, date, date]:
+    """``week``, ``month`` ou ``custom AAAA-MM-DD AAAA-MM-DD`` -> (rotulo, inicio, fim)."""
+    parts: List[str] = args.split()
+    period = parts[0] if parts else "week"
+    if period == "week":
+        return "semana", today - timedelta(days=today.weekday()), today
+    if period == "month":
+        return "mês", today.replace(day=1), today
+    if period == "custom":
+        if len(parts) != 3:
+            raise ValueError("Use `!shifts-report custom AAAA-MM-DD AAAA-MM-DD`.")
+        try:
+            start, end = date.fromisoformat(parts[1]), date.fromisoformat(parts[2])
+        except ValueError:
+            raise ValueError("Datas no formato AAAA-MM-DD (ex: `2026-01-31`).") from None
+        if end < start:
+            raise ValueError("A data final vem antes da inicial.")
+        return "período", start, end
+    raise ValueError(f"Período `{period}` desconhecido. Use {', '.join(REPORT_PERIODS)}.")
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from .notion_client import NotionClient
+from .notion_write_behind import is_local_id
+from .rate_limiter import PRIORITY_BACKGROUND
+from .shift_manager import ShiftRecord, encode_entries, parse_shift_page
+from .snapshot_store import SnapshotStore
+
+SHIFT_STATE_SNAPSHOT = "shift_state"
+
+
+class ShiftState:
+    """Turno mais recente mantido localmente, para o ``!shift`` nao precisar ler o Notion.
+
+    Carregado do snapshot no start (ou do Notion na primeira vez) e conferido
+    contra o Notion em background; cada batida so faz a escrita, que com o
+    write-behind ligado volta na hora e vai ao Notion depois. O database de
+    turnos nao tem coluna de usuario, entao o estado e um so, compartilhado.
+    """
+
+    def __init__(
+        self,
+        notion_client: NotionClient,
+        snapshots: Optional[SnapshotStore] = None,
+        reconcile_interval: float = 300.0,
+        tz_name: Optional[str] = None,
+    ) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._notion = notion_client
+        self._snapshots = snapshots
+        self._reconcile_interval = reconcile_interval
+        self._tz_name = tz_name
+        self._shift: Optional[ShiftRecord] = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[str, Optional[ShiftRecord]], None]] = []
+
+    def add_listener(self, callback: Callable[[str, Optional[ShiftRecord]], None]) -> None:
+        """Recebe (id, turno) a cada turno escrito por aqui; turno None quando foi deletado."""
+        self._listeners.append(callback)
+
+    async def start(self) -> None:
+        if not self._notion.shifts_database_id:
+            return
+        if self._snapshots is not None and not self._loaded:
+            saved = await self._snapshots.load(SHIFT_STATE_SNAPSHOT)
+            # Snapshot sem "timestamps" e do formato anterior: o turno e lido de novo do Notion.
+            if saved is not None and saved[0] is not None and "timestamps" in saved[0]:
+                self._shift, self._loaded = ShiftRecord.from_dict(saved[0]), True
+        if self._task is None:
+            self._task = asyncio.create_task(self._reconcile_loop(), name="shift-state-reconcile")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def current(self) -> Optional[ShiftRecord]:
+        """Turno mais recente (aberto ou nao); so le o Notion se ainda nao ha estado local."""
+        async with self._lock:
+            if not self._loaded:
+                await self._refresh()
+            return self._shift
+
+    async def punch(self, at: datetime, name: str) -> Tuple[ShiftRecord, bool]:
+        """Registra uma batida: soma ao turno aberto ou cria um novo. Retorna (turno, criado)."""
+        ts = int(at.timestamp())
+        async with self._lock:
+            if not self._loaded:
+                await self._refresh()
+            shift = self._shift
+            if shift is not None and shift.is_open:
+                await self._write_entries(shift, [*shift.timestamps, ts])
+                return self._shift, False
+
+            page = await self._notion.create_shift(
+                name=name,
+                shift_start=at.isoformat(),
+                entries_raw=encode_entries([ts]),
+            )
+            await self._set(parse_shift_page(page, self._tz_name))
+            self._notify(self._shift.id, self._shift)
+            return self._shift, True
+
+    async def set_entries(self, shift: ShiftRecord, timestamps: List[int]) -> ShiftRecord:
+        """Reescreve as batidas de um turno (desfazer, entrada manual)."""
+        async with self._lock:
+            return await self._write_entries(shift, timestamps)
+
+    async def delete(self, shift: ShiftRecord) -> None:
+        async with self._lock:
+            await self._notion.delete_shift(shift.id)
+            self._notify(shift.id, None)
+            if self._shift is not None and self._shift.id == shift.id:
+                # O anterior vira o mais recente: recarrega na proxima leitura.
+                self._shift, self._loaded = None, False
+                await self._save()
+
+    async def reconcile(self) -> bool:
+        """Adota o turno mais recente do Notion se ele difere do local; retorna se mudou."""
+        async with self._lock:
+            before = self._shift
+            await self._refresh(priority=PRIORITY_BACKGROUND)
+            changed = _signature(before) != _signature(self._shift)
+            # Criacao offline reenviada troca o id local pelo real: nao e divergencia.
+            if changed and before is not None and not is_local_id(before.id):
+                self._logger.warning(
+                    "Shift state differed from Notion, using Notion value",
+                    extra={
+                        "context": {
+                            "local": _signature(before),
+                            "notion": _signature(self._shift),
+                        }
+                    },
+                )
+            return changed
+
+    async def _write_entries(self, shift: ShiftRecord, timestamps: List[int]) -> ShiftRecord:
+        # Paginas no formato antigo passam para o compacto na primeira escrita.
+        updated = shift.with_timestamps(timestamps)
+        await self._notion.update_shift_entries(shift.id, updated.entries_raw)
+        self._notify(shift.id, updated)
+        if self._shift is None or self._shift.id == shift.id:
+            await self._set(updated)
+        return updated
+
+    def _notify(self, shift_id: str, shift: Optional[ShiftRecord]) -> None:
+        for callback in self._listeners:
+            try:
+                callback(shift_id, shift)
+            except Exception as exc:
+                self._logger.warning(
+                    "Shift listener failed",
+                    extra={"context": {"shift_id": shift_id, "error": str(exc)}},
+                )
+
+    async def _refresh(self, priority: Optional[int] = None) -> None:
+        # fetch_shifts ja aplica as escritas pendentes do write-behind e cai no snapshot se o Notion cair.
+        pages = await self._notion.fetch_shifts(limit=1, priority=priority)
+        await self._set(parse_shift_page(pages[0], self._tz_name) if pages else None)
+
+    async def _set(self, shift: Optional[ShiftRecord]) -> None:
+        self._shift, self._loaded = shift, True
+        await self._save()
+
+    async def _save(self) -> None:
+        if self._snapshots is None:
+            return
+        try:
+            await self._snapshots.save(SHIFT_STATE_SNAPSHOT, self._shift.to_dict() if self._shift else None)
+        except sqlite3.Error as exc:
+            self._logger.warning(
+                "Failed to save shift state",
+                extra={"context": {"error": str(exc)}},
+            )
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as exc:
+                # Rede, SQLite ou uma pagina que nao parseia: o loop segue e tenta de novo.
+                self._logger.warning(
+                    "Shift state reconcile failed",
+                    extra={"context": {"error": str(exc), "error_type": type(exc).__name__}},
+                )
+            await asyncio.sleep(self._reconcile_interval)
+
+
+def _signature(shift: Optional[ShiftRecord]) -> Optional[Tuple[str, List[int]]]:
+    if shift is None:
+        return None
+    return shift.id, shift.timestamps
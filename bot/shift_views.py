@@ -1,35 +1,180 @@
+import asyncio
 import logging
 from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
 
 import discord
 
-from .notion_client import NotionClient
 from .shift_manager import (
-    parse_entries,
-    serialize_entries,
     calculate_summary,
     format_duration,
     build_history_line,
     is_shift_open,
-    parse_shift_page,
+    ShiftRecord,
 )
+from .shift_history import ShiftCursor, ShiftHistory
+from .shift_state import ShiftState
 
 logger = logging.getLogger(__name__)
 
+# Turnos por pagina do !shifts.
+SHIFTS_PAGE_SIZE = 10
+
+
+def build_shifts_embed(shifts: Sequence[ShiftRecord], page: int = 1) -> discord.Embed:
+    lines = []
+    for s in shifts:
+        # Turno fechado nao muda: o resumo sai do cache do calculate_summary.
+        summary = calculate_summary(s)
+        status = "🟢 Aberto" if s.is_open else "⚪ Fechado"
+        work = format_duration(summary["total_work_min"])
+        pause_count = len(summary["pauses"])
+        pause_text = f"{pause_count} pausa(s)" if pause_count else "0 pausas"
+        if summary["total_pause_min"]:
+            pause_text += f" ({format_duration(summary['total_pause_min'])})"
+        if s.is_open:
+            work += " (parcial)"
+        lines.append(f"**{s.name}** — `{work}` · {pause_text} · {status}")
+
+    embed = discord.Embed(
+        title=f"📊 Turnos recentes ({len(shifts)})" if page == 1 else f"📊 Turnos — página {page}",
+        description="\n\n".join(lines) or "Nenhum turno nesta página.",
+        color=discord.Color.blurple(),
+        timestamp=datetime.now(timezone.utc),
+    )
+    embed.set_footer(text=f"Página {page}")
+    return embed
+
+
+class ShiftsPageView(discord.ui.View):
+    """Paginas do !shifts (anterior/proxima) servidas pelo historico local.
+
+    Enquanto uma pagina esta na tela a seguinte ja e buscada em background; se
+    o historico ainda nao terminou o primeiro sync, e essa busca que espera.
+    Uma troca de pagina por vez: cliques durante um carregamento sao ignorados.
+    """
+
+    def __init__(
+        self,
+        history: ShiftHistory,
+        shifts: List[ShiftRecord],
+        next_cursor: Optional[ShiftCursor],
+        page_size: int = SHIFTS_PAGE_SIZE,
+    ) -> None:
+        super().__init__(timeout=300)
+        self._history = history
+        self._page_size = page_size
+        # Cursor que abriu cada pagina ja mostrada; o ultimo e o da pagina atual.
+        self._cursors: List[Optional[ShiftCursor]] = [None]
+        self._shifts = shifts
+        self._next_cursor = next_cursor
+        self._prefetch: Optional[asyncio.Task] = None
+        self._loading = False
+        self._update()
+
+    def embed(self) -> discord.Embed:
+        return build_shifts_embed(self._shifts, page=len(self._cursors))
+
+    @discord.ui.button(label="Anterior", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        if self._loading:
+            await interaction.response.defer()
+            return
+        cursor = self._cursors[-2] if len(self._cursors) > 1 else None
+        await self._show(interaction, cursor, lambda: self._history.page(cursor, self._page_size), back=True)
+
+    @discord.ui.button(label="Próxima", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        if self._loading:
+            await interaction.response.defer()
+            return
+        prefetch, self._prefetch = self._prefetch, None
+        cursor = self._next_cursor
+        if prefetch is not None and not prefetch.done():
+            # Primeiro sync do historico ainda rodando: responde ja, com os botoes
+            # desligados, e edita quando a pagina chegar.
+            self._loading = True
+            self.previous_page.disabled = self.next_page.disabled = True
+            await interaction.response.edit_message(view=self)
+        await self._show(
+            interaction,
+            cursor,
+            lambda: prefetch if prefetch is not None else self._history.page(cursor, self._page_size),
+            back=False,
+        )
+
+    async def on_timeout(self) -> None:
+        _discard(self._prefetch)
+        self._prefetch = None
+
+    async def _show(
+        self,
+        interaction: discord.Interaction,
+        cursor: Optional[ShiftCursor],
+        load: Callable[[], Awaitable[Tuple[List[ShiftRecord], Optional[ShiftCursor]]]],
+        back: bool,
+    ) -> None:
+        self._loading = True
+        try:
+            self._shifts, self._next_cursor = await load()
+        except Exception as exc:
+            logger.error("Failed to load shifts page", extra={"context": {"error": str(exc)}})
+            embed = discord.Embed(title="❌ Erro ao buscar turnos", description=f"```{exc}```", color=discord.Color.red())
+            # Continua na pagina atual, com os botoes de volta.
+            self._loading = False
+            self._update()
+            if interaction.response.is_done():
+                await interaction.edit_original_response(view=self)
+                await interaction.followup.send(embed=embed)
+            else:
+                await interaction.response.send_message(embed=embed)
+            return
+        self._loading = False
+
+        if back:
+            self._cursors.pop()
+        else:
+            self._cursors.append(cursor)
+        self._update()
+        if interaction.response.is_done():
+            await interaction.edit_original_response(embed=self.embed(), view=self)
+        else:
+            await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    def _update(self) -> None:
+        self.previous_page.disabled = len(self._cursors) == 1
+        self.next_page.disabled = self._next_cursor is None
+        _discard(self._prefetch)
+        self._prefetch = None
+        if self._next_cursor is not None:
+            self._prefetch = asyncio.create_task(
+                self._history.page(self._next_cursor, self._page_size), name="shifts-page-prefetch"
+            )
+
+
+def _discard(task: Optional[asyncio.Task]) -> None:
+    # Prefetch que nao vai ser usado: cancela, ou marca o erro como visto para o asyncio nao reclamar.
+    if task is None:
+        return
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
 
 class ShiftEditView(discord.ui.View):
     def __init__(
         self,
-        notion_client: NotionClient,
+        shift_state: ShiftState,
         shift: dict,
     ) -> None:
         super().__init__(timeout=120)
-        self._notion = notion_client
+        self._shift_state = shift_state
         self._shift = shift
 
     @discord.ui.button(label="Desfazer última entrada", style=discord.ButtonStyle.primary, emoji="↩️")
     async def undo_last(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        entries = list(self._shift["entries"])
+        entries = self._shift.entries
         if not entries:
             await interaction.response.send_message(
                 embed=discord.Embed(description="Nenhuma entrada para desfazer.", color=discord.Color.orange()),
@@ -38,10 +183,9 @@ class ShiftEditView(discord.ui.View):
             return
 
         removed = entries.pop()
-        new_json = serialize_entries(entries)
 
         try:
-            await self._notion.update_shift_entries(self._shift["id"], new_json)
+            self._shift = await self._shift_state.set_entries(self._shift, self._shift.timestamps[:-1])
         except Exception as exc:
             logger.error("Failed to undo shift entry", extra={"context": {"error": str(exc)}})
             await interaction.response.send_message(
@@ -50,8 +194,6 @@ class ShiftEditView(discord.ui.View):
             self.stop()
             return
 
-        self._shift["entries"] = entries
-
         embed = discord.Embed(
             title="↩️ Entrada removida",
             color=discord.Color.green(),
@@ -96,12 +238,10 @@ class ShiftEditView(discord.ui.View):
             self.stop()
             return
 
-        entries = list(self._shift["entries"])
-        entries.append(time_str)
-        new_json = serialize_entries(entries)
+        timestamps = [*self._shift.timestamps, self._shift.timestamp_at(time_str)]
 
         try:
-            await self._notion.update_shift_entries(self._shift["id"], new_json)
+            self._shift = await self._shift_state.set_entries(self._shift, timestamps)
         except Exception as exc:
             logger.error("Failed to add manual entry", extra={"context": {"error": str(exc)}})
             await interaction.followup.send(
@@ -110,7 +250,7 @@ class ShiftEditView(discord.ui.View):
             self.stop()
             return
 
-        self._shift["entries"] = entries
+        entries = self._shift.entries
         status = "Trabalhando" if is_shift_open(entries) else "Pausa / Encerrado"
 
         embed = discord.Embed(
@@ -127,7 +267,7 @@ class ShiftEditView(discord.ui.View):
     @discord.ui.button(label="Deletar turno", style=discord.ButtonStyle.danger, emoji="🗑️")
     async def delete_shift(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
         try:
-            await self._notion.delete_shift(self._shift["id"])
+            await self._shift_state.delete(self._shift)
         except Exception as exc:
             logger.error("Failed to delete shift", extra={"context": {"error": str(exc)}})
             await interaction.response.send_message(
@@ -0,0 +1,46 @@
+import json
+import sqlite3
+import time
+from typing import Any, Optional, Tuple
+
+from .storage import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    saved_at REAL NOT NULL
+);
+"""
+
+
+class SnapshotStore:
+    """Ultima copia conhecida de leituras do Notion (tarefas, turnos), usada quando o Notion cai."""
+
+    def __init__(self, path: str) -> None:
+        self._store = SQLiteStore(path, _SCHEMA)
+
+    async def load(self, name: str) -> Optional[Tuple[Any, float]]:
+        """Devolve (dados, saved_at em epoch) ou None."""
+        row = await self._store.run(_select, name)
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    async def save(self, name: str, data: Any) -> None:
+        await self._store.run(_upsert, name, json.dumps(data, ensure_ascii=False), time.time())
+
+    async def close(self) -> None:
+        await self._store.close()
+
+
+def _select(conn: sqlite3.Connection, name: str) -> Optional[Tuple[str, float]]:
+    return conn.execute("SELECT data, saved_at FROM snapshots WHERE name = ?", (name,)).fetchone()
+
+
+def _upsert(conn: sqlite3.Connection, name: str, data: str, saved_at: float) -> None:
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots (name, data, saved_at) VALUES (?, ?, ?)",
+            (name, data, saved_at),
+        )
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SQLiteStore:
+    """Banco SQLite local (modo WAL) com todo acesso serializado numa thread dedicada."""
+
+    def __init__(self, path: str, schema: str) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._path = path
+        self._schema = schema
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"sqlite-{os.path.basename(path)}",
+        )
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    async def open(self) -> None:
+        if self._conn is None:
+            await self._submit(self._open_sync)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Executa fn(conn, *args) fora do event loop."""
+        await self.open()
+        return await self._submit(self._call, fn, *args)
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._submit(self._close_sync)
+        self._executor.shutdown(wait=False)
+
+    async def _submit(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _call(self, fn: Callable[..., T], *args: Any) -> T:
+        return fn(self._conn, *args)
+
+    def _open_sync(self) -> None:
+        if self._conn is not None:
+            return
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self._path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self._schema)
+        conn.commit()
+        self._conn = conn
+        self._logger.info("Local store opened", extra={"context": {"path": self._path}})
+
+    def _close_sync(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
@@ -0,0 +1,190 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from operator import itemgetter
+from typing import Dict, Iterable, List, Set, Tuple
+
+from .notion_parser import TaskRecord
+
+# Fracao minima de trigramas da busca presentes na tarefa para o fallback com erro de digitacao.
+FUZZY_MIN_SCORE = 0.34
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+# Maior que qualquer caractere de um texto normalizado: fecha o intervalo de um prefixo.
+_PREFIX_END = "\x7f"
+
+
+class TaskIndex:
+    """Indice de busca sobre nome e categorias das tarefas, atualizado tarefa a tarefa.
+
+    Cada palavra da busca casa com o inicio de uma palavra da tarefa ("cli ace"
+    acha "Cliente Acme"): as palavras ficam em listas ordenadas e cada prefixo e
+    um intervalo achado com bisect. Tarefas que batem pelo nome vem antes das que
+    so batem pela categoria. Se nada bater, um indice de trigramas sobre o
+    vocabulario acha palavras com a maior parte dos trigramas de cada palavra da
+    busca (erros de digitacao).
+    """
+
+    def __init__(self) -> None:
+        self._names: Dict[str, str] = {}
+        # (nome, id) ordenados: "nome comeca com a busca" sai pronto e em ordem.
+        self._sorted_names: List[Tuple[str, str]] = []
+        # (palavra, id) ordenados; nomes e categorias separados para o ranking.
+        self._name_words: List[Tuple[str, str]] = []
+        self._category_words: List[Tuple[str, str]] = []
+        self._words: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        # Vocabulario (palavra -> quantas tarefas a usam) e trigrama -> palavras, para o fallback.
+        self._vocabulary: Dict[str, int] = {}
+        self._gram_words: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def rebuild(self, tasks: Iterable[TaskRecord]) -> None:
+        self.__init__()
+        for task in tasks:
+            name, name_words, category_words = _task_words(task)
+            self._store(task.id, name, name_words, category_words)
+            self._sorted_names.append((name, task.id))
+            self._name_words.extend((word, task.id) for word in name_words)
+            self._category_words.extend((word, task.id) for word in category_words)
+        self._sorted_names.sort()
+        self._name_words.sort()
+        self._category_words.sort()
+
+    def add(self, task: TaskRecord) -> None:
+        """Indexa a tarefa; se o id ja existe, substitui a entrada anterior."""
+        self.remove(task.id)
+        name, name_words, category_words = _task_words(task)
+        self._store(task.id, name, name_words, category_words)
+        bisect.insort(self._sorted_names, (name, task.id))
+        for word in name_words:
+            bisect.insort(self._name_words, (word, task.id))
+        for word in category_words:
+            bisect.insort(self._category_words, (word, task.id))
+
+    def remove(self, task_id: str) -> None:
+        name = self._names.pop(task_id, None)
+        if name is None:
+            return
+        _discard(self._sorted_names, (name, task_id))
+        name_words, category_words = self._words.pop(task_id)
+        for word in name_words:
+            _discard(self._name_words, (word, task_id))
+        for word in category_words:
+            _discard(self._category_words, (word, task_id))
+        for word in name_words | category_words:
+            self._vocabulary[word] -= 1
+            if self._vocabulary[word]:
+                continue
+            del self._vocabulary[word]
+            for gram in _trigrams((word,), complete=True):
+                words = self._gram_words[gram]
+                words.discard(word)
+                if not words:
+                    del self._gram_words[gram]
+
+    def search(self, query: str, limit: int = 25) -> List[str]:
+        """Ids das tarefas que batem com a busca, mais relevantes primeiro."""
+        query = normalize(query)
+        words = query.split()
+        if not words:
+            return []
+
+        in_name = None
+        anywhere = None
+        for word in words:
+            name_ids = _prefix_ids(self._name_words, word)
+            word_ids = name_ids | _prefix_ids(self._category_words, word)
+            in_name = name_ids if in_name is None else in_name & name_ids
+            anywhere = word_ids if anywhere is None else anywhere & word_ids
+            if not anywhere:
+                break
+
+        if not anywhere:
+            return self._fuzzy(words, limit)
+        # Nome que comeca com a busca primeiro, depois nome com todas as palavras, depois categoria.
+        ranked = [task_id for _, task_id in _prefix_range(self._sorted_names, query)[:limit]]
+        for candidates in (in_name.difference(ranked), anywhere - in_name):
+            if len(ranked) >= limit:
+                break
+            ranked += heapq.nsmallest(limit - len(ranked), candidates, key=self._names.__getitem__)
+        return ranked
+
+    def _store(self, task_id: str, name: str, name_words: Set[str], category_words: Set[str]) -> None:
+        self._names[task_id] = name
+        self._words[task_id] = (name_words, category_words)
+        for word in name_words | category_words:
+            count = self._vocabulary.get(word, 0)
+            self._vocabulary[word] = count + 1
+            if not count:
+                for gram in _trigrams((word,), complete=True):
+                    self._gram_words.setdefault(gram, set()).add(word)
+
+    def _fuzzy(self, words: List[str], limit: int) -> List[str]:
+        scores: Dict[str, int] = {}
+        matched = None
+        for query_word in words:
+            grams = _trigrams((query_word,), complete=False)
+            counts: Dict[str, int] = {}
+            for gram in grams:
+                for word in self._gram_words.get(gram, ()):
+                    counts[word] = counts.get(word, 0) + 1
+            needed = max(1, int(len(grams) * FUZZY_MIN_SCORE + 0.5))
+            # Melhor palavra parecida de cada tarefa para esta palavra da busca.
+            word_scores: Dict[str, int] = {}
+            for word, count in counts.items():
+                if count < needed:
+                    continue
+                for words_list in (self._name_words, self._category_words):
+                    for _, task_id in _word_range(words_list, word):
+                        word_scores[task_id] = max(count, word_scores.get(task_id, 0))
+            matched = set(word_scores) if matched is None else matched & word_scores.keys()
+            for task_id, count in word_scores.items():
+                scores[task_id] = scores.get(task_id, 0) + count
+        return heapq.nsmallest(limit, matched or (), key=lambda task_id: (-scores[task_id], self._names[task_id]))
+
+
+def normalize(text: str) -> str:
+    """Minusculas, sem acentos e so letras/numeros separados por um espaco."""
+    text = text.lower()
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _task_words(task: TaskRecord) -> Tuple[str, Set[str], Set[str]]:
+    name = normalize(task.name)
+    category_words = {word for category in task.property_categories or () for word in normalize(category).split()}
+    return name, set(name.split()), category_words
+
+
+def _prefix_range(items: List[Tuple[str, str]], prefix: str) -> List[Tuple[str, str]]:
+    start = bisect.bisect_left(items, (prefix,))
+    return items[start : bisect.bisect_left(items, (prefix + _PREFIX_END,), start)]
+
+
+def _word_range(items: List[Tuple[str, str]], word: str) -> List[Tuple[str, str]]:
+    start = bisect.bisect_left(items, (word,))
+    return items[start : bisect.bisect_left(items, (word + "\x00",), start)]
+
+
+def _prefix_ids(words: List[Tuple[str, str]], prefix: str) -> Set[str]:
+    return set(map(itemgetter(1), _prefix_range(words, prefix)))
+
+
+def _discard(words: List[Tuple[str, str]], item: Tuple[str, str]) -> None:
+    i = bisect.bisect_left(words, item)
+    if i < len(words) and words[i] == item:
+        del words[i]
+
+
+def _trigrams(words: Iterable[str], complete: bool) -> Set[str]:
+    # Na tarefa cada palavra termina com espaco; na busca nao, para a ultima palavra valer como prefixo.
+    grams: Set[str] = set()
+    for word in words:
+        padded = f"  {word} " if complete else f"  {word}"
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+from .notion_client import NotionClient
+from .notion_parser import TaskRecord
+from .notion_query import NotionQuery
+from .notion_write_behind import is_local_id
+from .rate_limiter import PRIORITY_BACKGROUND, PRIORITY_READ
+from .snapshot_store import SnapshotStore
+from .task_index import TaskIndex
+
+TASKS_SNAPSHOT = "tasks"
+
+
+class TaskMirror:
+    """Copia local do database de tarefas do Notion.
+
+    Um sync completo carrega tudo uma vez; depois um loop em background busca
+    so as paginas com ``last_edited_time`` a partir do ultimo visto. As escritas
+    feitas pelo proprio bot entram na hora via listener do NotionClient. Um
+    ``TaskIndex`` acompanha cada mudanca para as buscas por nome/categoria.
+
+    Com ``snapshots`` a copia e salva apos cada sync que mudou algo e carregada
+    no start: se o Notion estiver fora do ar, os comandos usam esses dados
+    (marcados como ``stale``) em vez de falhar.
+    """
+
+    def __init__(
+        self,
+        notion_client: NotionClient,
+        refresh_interval: float = 60.0,
+        full_sync_interval: float = 3600.0,
+        snapshots: Optional[SnapshotStore] = None,
+    ) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._notion = notion_client
+        self._refresh_interval = refresh_interval
+        # A query do Notion nao devolve paginas arquivadas: o sync completo periodico remove as apagadas.
+        self._full_sync_interval = full_sync_interval
+        self._tasks: Dict[str, TaskRecord] = {}
+        self._index = TaskIndex()
+        self._watermark: Optional[str] = None
+        self._synced_at: Optional[float] = None
+        self._full_synced_at: Optional[float] = None
+        self._snapshots = snapshots
+        # Epoch do ultimo sync bem-sucedido (ou do snapshot carregado) e se os dados estao velhos.
+        self._updated_at: Optional[float] = None
+        self._stale = False
+        self._lock = asyncio.Lock()
+        # Um dict por sync completo em andamento: escritas que chegam pelo listener, reaplicadas no fim dele.
+        self._sync_upserts: List[Dict[str, TaskRecord]] = []
+        self._task: Optional[asyncio.Task] = None
+        notion_client.add_task_listener(self.upsert)
+
+    @property
+    def ready(self) -> bool:
+        return self._synced_at is not None
+
+    @property
+    def stale(self) -> bool:
+        """True se os dados vem do snapshot ou o ultimo refresh falhou."""
+        return self._stale
+
+    @property
+    def updated_at(self) -> Optional[float]:
+        return self._updated_at
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def start(self) -> None:
+        if self._snapshots is not None and not self.ready:
+            await self._load_snapshot()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(), name="task-mirror-refresh")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get(self, page_id: str) -> Optional[TaskRecord]:
+        return self._tasks.get(page_id)
+
+    async def search(self, query: str, limit: int = 25) -> List[TaskRecord]:
+        """Busca por nome/categoria no indice local (sem ir ao Notion depois do primeiro sync)."""
+        if not self.ready:
+            await self.refresh(priority=PRIORITY_READ)
+        return [self._tasks[task_id] for task_id in self._index.search(query, limit) if task_id in self._tasks]
+
+    async def fetch_tasks(self) -> List[TaskRecord]:
+        """Lookup local; so vai ao Notion se o primeiro sync ainda nao terminou."""
+        if not self.ready:
+            await self.refresh(priority=PRIORITY_READ)
+        return list(self._tasks.values())
+
+    async def iter_task_pages(self) -> AsyncIterator[List[TaskRecord]]:
+        if not self.ready:
+            async with self._lock:
+                if not self.ready:
+                    # Mirror frio: repassa as paginas do sync completo conforme chegam (ha um usuario esperando).
+                    async for page in self._full_sync(priority=PRIORITY_READ):
+                        yield page
+                    return
+        # Pronto, ou o sync que estava rodando terminou enquanto esperavamos o lock.
+        yield list(self._tasks.values())
+
+    async def iter_pending_task_pages(self) -> AsyncIterator[List[TaskRecord]]:
+        async for page in self.iter_task_pages():
+            yield [t for t in page if (t.get("property_status") or "").lower() != "done"]
+
+    async def iter_freela_task_pages(self) -> AsyncIterator[List[TaskRecord]]:
+        async for page in self.iter_task_pages():
+            yield [t for t in page if t.get("is_freela")]
+
+    def upsert(self, task: TaskRecord) -> None:
+        page_id = task.get("id")
+        if not page_id:
+            return
+        replaces, task.replaces = task.replaces, None
+        for upserts in self._sync_upserts:
+            upserts[page_id] = task
+        self._index.add(task)
+        if replaces in self._tasks:
+            self._index.remove(replaces)
+            # Criacao offline reenviada: a pagina real toma o lugar da local.
+            tasks: Dict[str, TaskRecord] = {}
+            for key, value in self._tasks.items():
+                if key == replaces:
+                    key, value = page_id, task
+                tasks[key] = value
+            self._tasks = tasks
+            return
+        if page_id in self._tasks:
+            self._tasks[page_id] = task
+        else:
+            # Paginas novas aparecem primeiro, como na ordem padrao da query do Notion.
+            self._tasks = {page_id: task, **self._tasks}
+
+    async def refresh(self, full: bool = False, priority: int = PRIORITY_BACKGROUND) -> None:
+        async with self._lock:
+            if full or self._watermark is None:
+                async for _ in self._full_sync(priority):
+                    pass
+            else:
+                await self._incremental_sync(priority)
+
+    async def _full_sync(self, priority: int = PRIORITY_BACKGROUND) -> AsyncIterator[List[TaskRecord]]:
+        started = time.monotonic()
+        tasks: Dict[str, TaskRecord] = {}
+        upserts: Dict[str, TaskRecord] = {}
+        self._sync_upserts.append(upserts)
+        try:
+            async for page in self._notion.iter_task_pages(priority=priority):
+                for task in page:
+                    tasks[task["id"]] = task
+                yield page
+        finally:
+            self._sync_upserts.remove(upserts)
+
+        # Criacoes feitas offline ainda nao existem no Notion.
+        merged = {task["id"]: task for task in self._notion.pending_tasks()}
+        for page_id, task in upserts.items():
+            if page_id not in tasks:
+                merged[page_id] = task
+        merged.update(tasks)
+        # Uma escrita do bot que chegou depois da pagina ter sido lida vale mais que a copia do sync.
+        for page_id, task in upserts.items():
+            if page_id in tasks and not _newer(tasks[page_id], task):
+                merged[page_id] = task
+        self._tasks = merged
+        self._index.rebuild(self._tasks.values())
+        self._watermark = _max_edited(tasks.values(), None)
+        self._synced_at = self._full_synced_at = time.monotonic()
+        self._mark_fresh()
+        await self._save_snapshot()
+        self._logger.info(
+            "Task mirror synced",
+            extra={
+                "context": {
+                    "tasks": len(tasks),
+                    "duration_ms": round((self._synced_at - started) * 1000, 1),
+                }
+            },
+        )
+
+    async def _incremental_sync(self, priority: int = PRIORITY_BACKGROUND) -> None:
+        # last_edited_time do Notion tem precisao de minuto: on_or_after repete o ultimo minuto de proposito.
+        query = NotionQuery().edited_on_or_after(self._watermark)
+        changed = 0
+        async for page in self._notion.iter_task_pages(query=query, priority=priority):
+            for task in page:
+                self.upsert(task)
+            changed += len(page)
+            self._watermark = _max_edited(page, self._watermark)
+        self._synced_at = time.monotonic()
+        self._mark_fresh()
+        if changed:
+            await self._save_snapshot()
+            self._logger.debug(
+                "Task mirror refreshed",
+                extra={"context": {"changed": changed, "watermark": self._watermark}},
+            )
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            full = (
+                self._full_synced_at is None
+                or time.monotonic() - self._full_synced_at >= self._full_sync_interval
+            )
+            try:
+                await self.refresh(full=full)
+            except Exception as exc:
+                # Qualquer falha (rede, parse, snapshot) so adia o proximo refresh: o loop nao pode morrer.
+                self._stale = self.ready
+                self._logger.warning(
+                    "Task mirror refresh failed",
+                    extra={"context": {"error": str(exc), "error_type": type(exc).__name__, "full": full}},
+                )
+            await asyncio.sleep(self._refresh_interval)
+
+    def _mark_fresh(self) -> None:
+        self._updated_at = time.time()
+        self._stale = False
+
+    async def _load_snapshot(self) -> None:
+        saved = await self._snapshots.load(TASKS_SNAPSHOT)
+        if saved is None:
+            return
+        data, saved_at = saved
+        tasks = [TaskRecord.from_dict(item) for item in data]
+        pending = self._notion.pending_tasks()
+        self._tasks = {task["id"]: task for task in pending + tasks}
+        self._index.rebuild(self._tasks.values())
+        # Pronto mas velho: o primeiro refresh do loop e completo e substitui tudo.
+        self._synced_at = time.monotonic()
+        self._updated_at = saved_at
+        self._stale = True
+        self._logger.info(
+            "Task mirror loaded from snapshot",
+            extra={"context": {"tasks": len(tasks), "saved_at": saved_at}},
+        )
+
+    async def _save_snapshot(self) -> None:
+        if self._snapshots is None:
+            return
+        tasks = [task.to_dict() for task in self._tasks.values() if not is_local_id(task.id)]
+        try:
+            await self._snapshots.save(TASKS_SNAPSHOT, tasks)
+        except sqlite3.Error as exc:
+            self._logger.warning(
+                "Failed to save task mirror snapshot",
+                extra={"context": {"error": str(exc)}},
+            )
+
+
+def _newer(synced: TaskRecord, written: TaskRecord) -> bool:
+    """True se a copia do sync foi editada depois da escrita local (edicao externa posterior)."""
+    synced_at, written_at = synced.get("last_edited_time"), written.get("last_edited_time")
+    return bool(synced_at and written_at and synced_at > written_at)
+
+
+def _max_edited(tasks, current: Optional[str]) -> Optional[str]:
+    # Timestamps ISO 8601 em UTC do Notion comparam corretamente como string.
+    for task in tasks:
+        edited = task.get("last_edited_time")
+        if edited and (current is None or edited > current):
+            current = edited
+    return current
@@ -5,6 +5,8 @@ from typing import List, Optional
 import discord
 
 from .notion_client import NotionClient
+from .notion_write_behind import is_local_id
+from .time_ledger import TimeLedger
 from .timer_manager import TimerManager
 
 logger = logging.getLogger(__name__)
@@ -76,7 +78,10 @@ class StatusSelectView(discord.ui.View):
             )
         if self._task_description:
             embed.add_field(name="Descrição", value=self._task_description[:200], inline=False)
-        embed.set_footer(text="Notion")
+        if is_local_id(task["id"]):
+            embed.set_footer(text="⚠️ Notion indisponível — a tarefa foi salva e será criada quando ele voltar")
+        else:
+            embed.set_footer(text="Notion")
 
         view = StartTimerView(
             timer_manager=self._timer,
@@ -203,9 +208,11 @@ class StopTimerSelectView(discord.ui.View):
         timer_manager: TimerManager,
         status_options: List[str],
         user_id: int,
+        time_ledger: TimeLedger,
     ) -> None:
         super().__init__(timeout=120)
         self._notion = notion_client
+        self._ledger = time_ledger
         self._timer = timer_manager
         self._status_options = status_options
         self._user_id = user_id
@@ -250,6 +257,7 @@ class StopTimerSelectView(discord.ui.View):
 
         view = StopTimerStatusView(
             notion_client=self._notion,
+            time_ledger=self._ledger,
             status_options=self._status_options,
             task_id=entry.task_id,
             task_name=entry.task_name,
@@ -269,9 +277,11 @@ class StopTimerStatusView(discord.ui.View):
         task_name: str,
         task_url: str,
         elapsed_minutes: int,
+        time_ledger: TimeLedger,
     ) -> None:
         super().__init__(timeout=120)
         self._notion = notion_client
+        self._ledger = time_ledger
         self._task_id = task_id
         self._task_name = task_name
         self._task_url = task_url
@@ -291,9 +301,9 @@ class StopTimerStatusView(discord.ui.View):
         await interaction.response.defer()
 
         try:
-            total_time = await self._notion.update_task(
-                page_id=self._task_id,
-                time_min=self._elapsed_minutes,
+            total_time = await self._ledger.add(
+                self._task_id,
+                self._elapsed_minutes,
                 status=new_status,
             )
         except Exception as exc:
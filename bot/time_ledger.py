@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from .notion_client import NotionClient
+from .rate_limiter import PRIORITY_BACKGROUND
+from .task_mirror import TaskMirror
+
+
+class TimeLedger:
+    """Total de minutos por tarefa mantido localmente.
+
+    Cada tarefa tem um lock: dois timers parando juntos na mesma tarefa somam
+    em serie, e cada soma vira um unico PATCH com o total absoluto (sem o GET
+    antes). Um loop periodico confere os totais contra o Notion e adota o valor
+    de la se alguem editou o tempo manualmente.
+    """
+
+    def __init__(
+        self,
+        notion_client: NotionClient,
+        task_mirror: Optional[TaskMirror] = None,
+        reconcile_interval: float = 900.0,
+    ) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._notion = notion_client
+        self._mirror = task_mirror
+        self._reconcile_interval = reconcile_interval
+        self._totals: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Quantos usam (ou esperam) cada lock: sem ninguem, o lock sai do dict.
+        self._lock_users: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def total(self, page_id: str) -> Optional[int]:
+        return self._totals.get(page_id)
+
+    async def start(self) -> None:
+        if self._task is None and self._reconcile_interval > 0:
+            self._task = asyncio.create_task(self._reconcile_loop(), name="time-ledger-reconcile")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def add(self, page_id: str, minutes: int, status: Optional[str] = None) -> int:
+        """Soma minutos a tarefa (e troca o status no mesmo PATCH). Retorna o novo total."""
+        async with self._locked(page_id):
+            current = await self._current(page_id)
+            total = current + max(0, minutes)
+            task = self._mirror.get(page_id) if self._mirror is not None else None
+            await self._notion.update_task(
+                page_id=page_id,
+                time_total=total,
+                status=status,
+                # Base da deteccao de conflito: o total veio da copia do mirror, sem GET.
+                base_edited_time=task.get("last_edited_time") if task is not None else None,
+            )
+            self._totals[page_id] = total
+            return total
+
+    async def reconcile(self) -> int:
+        """Recarrega do Notion os totais conhecidos; devolve quantos divergiam."""
+        drifted = 0
+        for page_id in list(self._totals):
+            async with self._locked(page_id):
+                remote = int(await self._notion.fetch_task_time_min(page_id, priority=PRIORITY_BACKGROUND))
+                local = self._totals.get(page_id)
+                if local is not None and remote != local:
+                    drifted += 1
+                    self._logger.warning(
+                        "Task time drifted from Notion, using Notion value",
+                        extra={"context": {"page_id": page_id, "local": local, "notion": remote}},
+                    )
+                self._totals[page_id] = remote
+        return drifted
+
+    async def _current(self, page_id: str) -> int:
+        if page_id in self._totals:
+            return self._totals[page_id]
+        task = self._mirror.get(page_id) if self._mirror is not None else None
+        if task is not None and task.get("property_time_min") is not None:
+            return int(task["property_time_min"])
+        # Primeira vez que a tarefa aparece: um unico GET para semear o total.
+        return int(await self._notion.fetch_task_time_min(page_id))
+
+    @asynccontextmanager
+    async def _locked(self, page_id: str) -> AsyncIterator[None]:
+        lock = self._locks.get(page_id)
+        if lock is None:
+            lock = self._locks[page_id] = asyncio.Lock()
+        self._lock_users[page_id] = self._lock_users.get(page_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            users = self._lock_users[page_id] - 1
+            if users:
+                self._lock_users[page_id] = users
+            else:
+                del self._lock_users[page_id]
+                del self._locks[page_id]
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception as exc:
+                # Rede, SQLite ou uma resposta que nao parseia: o loop segue e tenta de novo.
+                self._logger.warning(
+                    "Task time reconcile failed",
+                    extra={"context": {"error": str(exc), "error_type": type(exc).__name__}},
+                )
@@ -0,0 +1,49 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+DebounceKey = Tuple[int, int]
+
+
+class JoinDebouncer:
+    """Janela de debounce por (guild, usuario) com expiracao por TTL.
+
+    Guarda so o instante do ultimo evento emitido; como as chaves ficam em ordem
+    de emissao, expirar e remover do inicio do OrderedDict (O(1) amortizado).
+    """
+
+    def __init__(self, window_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self._window = window_seconds
+        self._clock = clock
+        self._last_emitted: "OrderedDict[DebounceKey, float]" = OrderedDict()
+        self.suppressed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._window > 0
+
+    def __len__(self) -> int:
+        return len(self._last_emitted)
+
+    def should_emit(self, guild_id: int, user_id: int) -> bool:
+        if not self.enabled:
+            return True
+
+        now = self._clock()
+        self._evict(now)
+
+        key = (guild_id, user_id)
+        if key in self._last_emitted:
+            self.suppressed += 1
+            return False
+
+        self._last_emitted[key] = now
+        return True
+
+    def _evict(self, now: float) -> None:
+        entries = self._last_emitted
+        while entries:
+            key, emitted_at = next(iter(entries.items()))
+            if now - emitted_at < self._window:
+                break
+            entries.popitem(last=False)
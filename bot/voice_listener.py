@@ -1,22 +1,89 @@
 import logging
+import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Optional
 
 import discord
 
+from .voice_debounce import JoinDebouncer
+from .voice_presence import (
+    EVENT_JOIN,
+    EVENT_LEAVE,
+    EVENT_MOVE,
+    EVENT_SESSION_ENDED,
+    VoicePresenceEvent,
+    VoicePresenceTracker,
+)
+from .voice_stats import VoiceStatsStore
 from .webhook import WebhookDispatcher
+from .webhook_queue import WebhookDeliveryQueue
+
+SESSION_EVENT_NAMES = {
+    EVENT_JOIN: "USER_JOINED_VOICE_CHANNEL",
+    EVENT_LEAVE: "USER_LEFT_VOICE_CHANNEL",
+    EVENT_MOVE: "USER_MOVED_VOICE_CHANNEL",
+    EVENT_SESSION_ENDED: "VOICE_SESSION_ENDED",
+}
 
 
 class VoiceListener:
-    def __init__(self, voice_channel_ids: tuple[int, ...], webhook: WebhookDispatcher) -> None:
+    def __init__(
+        self,
+        voice_channel_ids: tuple[int, ...],
+        webhook: WebhookDispatcher,
+        queue: Optional[WebhookDeliveryQueue] = None,
+        debounce_seconds: float = 0.0,
+        session_events: bool = False,
+        stats: Optional[VoiceStatsStore] = None,
+    ) -> None:
         self._logger = logging.getLogger(__name__)
         self._voice_channel_ids: set[int] = set(voice_channel_ids)
         self._webhook = webhook
+        self._queue = queue
+        self._debouncer = JoinDebouncer(debounce_seconds)
+        self._presence = VoicePresenceTracker()
+        self._session_events = session_events
+        self._stats = stats
+        if stats is not None:
+            stats.bind_presence(self._presence)
 
     @property
     def voice_channel_ids(self) -> set[int]:
         return self._voice_channel_ids
 
+    @property
+    def presence(self) -> VoicePresenceTracker:
+        return self._presence
+
+    @property
+    def stats(self) -> Optional[VoiceStatsStore]:
+        return self._stats
+
+    async def seed_presence(self, guilds: Iterable[discord.Guild]) -> None:
+        for guild in guilds:
+            states = [
+                (user_id, channel.id)
+                for channel in (*guild.voice_channels, *guild.stage_channels)
+                for user_id in channel.voice_states
+            ]
+            events = self._presence.seed(guild.id, states)
+            self._record_stats(events)
+            if self._stats is not None:
+                now = datetime.now(timezone.utc).timestamp()
+                for channel_id in {channel_id for _, channel_id in states}:
+                    self._stats.record_occupancy(guild.id, channel_id, self._presence.occupancy(channel_id), now)
+            self._logger.info(
+                "Voice presence seeded",
+                extra={
+                    "context": {
+                        "guild_id": str(guild.id),
+                        "members_in_voice": len(states),
+                        "reconciled_events": len(events),
+                    }
+                },
+            )
+            await self._emit_presence_events(guild, events)
+
     async def handle_voice_state_update(
         self,
         member: discord.Member,
@@ -26,6 +93,10 @@ class VoiceListener:
         old_channel_id = before.channel.id if before.channel else None
         new_channel_id = after.channel.id if after.channel else None
 
+        presence_events = self._presence.update(member.guild.id, member.id, new_channel_id)
+        self._record_stats(presence_events)
+        await self._emit_presence_events(member.guild, presence_events)
+
         entered_target_channel = (
             new_channel_id in self._voice_channel_ids
             and old_channel_id not in self._voice_channel_ids
@@ -40,6 +111,20 @@ class VoiceListener:
             # Defensive check: expected non-None due to entered_target_channel.
             return
 
+        if not self._debouncer.should_emit(guild.id, member.id):
+            self._logger.debug(
+                "Duplicate voice join suppressed by debounce window",
+                extra={
+                    "context": {
+                        "guild_id": str(guild.id),
+                        "channel_id": str(channel.id),
+                        "user_id": str(member.id),
+                        "suppressed_total": self._debouncer.suppressed,
+                    }
+                },
+            )
+            return
+
         payload = self._build_payload(member=member, guild=guild, channel=channel)
 
         self._logger.info(
@@ -53,7 +138,43 @@ class VoiceListener:
             },
         )
 
-        await self._webhook.send_event(payload)
+        await self._dispatch(payload)
+
+    def _record_stats(self, events: Iterable[VoicePresenceEvent]) -> None:
+        if self._stats is None:
+            return
+        for event in events:
+            self._stats.record(event, self._presence.occupancy(event.channel_id))
+
+    async def _emit_presence_events(self, guild: discord.Guild, events: Iterable[VoicePresenceEvent]) -> None:
+        if not self._session_events:
+            return
+        for event in events:
+            if (
+                event.channel_id not in self._voice_channel_ids
+                and event.previous_channel_id not in self._voice_channel_ids
+            ):
+                continue
+            await self._dispatch(self._build_session_payload(guild, event))
+
+    async def _dispatch(self, payload: Dict[str, Any]) -> None:
+        if self._queue is not None:
+            await self._queue.submit(payload)
+        else:
+            await self._webhook.send_event(payload)
+
+    async def start(self) -> None:
+        if self._stats is not None:
+            await self._stats.start()
+        if self._queue is not None:
+            await self._queue.start()
+
+    async def aclose(self) -> None:
+        if self._queue is not None:
+            await self._queue.stop()
+        await self._webhook.aclose()
+        if self._stats is not None:
+            await self._stats.stop()
 
     def _build_payload(
         self,
@@ -63,6 +184,7 @@ class VoiceListener:
     ) -> Dict[str, Any]:
         return {
             "event": "USER_JOINED_MONITORED_VOICE_CHANNEL",
+            "idempotency_key": str(uuid.uuid4()),
             "occurred_at": datetime.now(timezone.utc).isoformat(),
             "guild": {
                 "id": str(guild.id),
@@ -79,3 +201,35 @@ class VoiceListener:
             },
         }
 
+    def _build_session_payload(self, guild: discord.Guild, event: VoicePresenceEvent) -> Dict[str, Any]:
+        member = guild.get_member(event.user_id)
+        payload: Dict[str, Any] = {
+            "event": SESSION_EVENT_NAMES[event.kind],
+            "idempotency_key": str(uuid.uuid4()),
+            "occurred_at": datetime.fromtimestamp(event.occurred_at, timezone.utc).isoformat(),
+            "guild": {
+                "id": str(guild.id),
+                "name": guild.name,
+            },
+            "channel": _channel_ref(guild, event.channel_id),
+            "user": {
+                "id": str(event.user_id),
+                "username": member.name if member else None,
+                "tag": str(member) if member else None,
+            },
+        }
+        if event.previous_channel_id is not None:
+            payload["previous_channel"] = _channel_ref(guild, event.previous_channel_id)
+        if event.channel_seconds is not None:
+            payload["channel_duration_seconds"] = int(event.channel_seconds)
+        if event.session_seconds is not None:
+            payload["session_duration_seconds"] = int(event.session_seconds)
+        return payload
+
+
+def _channel_ref(guild: discord.Guild, channel_id: int) -> Dict[str, Any]:
+    channel = guild.get_channel(channel_id)
+    return {
+        "id": str(channel_id),
+        "name": channel.name if channel else None,
+    }
@@ -0,0 +1,141 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+EVENT_JOIN = "join"
+EVENT_LEAVE = "leave"
+EVENT_MOVE = "move"
+EVENT_SESSION_ENDED = "session_ended"
+
+PresenceKey = Tuple[int, int]
+
+
+@dataclass(slots=True)
+class VoiceSession:
+    channel_id: int
+    session_started_at: float
+    channel_joined_at: float
+
+
+@dataclass(slots=True, frozen=True)
+class VoicePresenceEvent:
+    kind: str
+    guild_id: int
+    user_id: int
+    channel_id: int
+    occurred_at: float
+    previous_channel_id: Optional[int] = None
+    channel_seconds: Optional[float] = None
+    session_seconds: Optional[float] = None
+
+
+class VoicePresenceTracker:
+    """Presenca de voz em memoria por (guild, usuario): O(1) por atualizacao.
+
+    Cada membro em voz ocupa um unico VoiceSession (3 campos em __slots__), e a
+    ocupacao por canal e mantida incrementalmente.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._sessions: Dict[PresenceKey, VoiceSession] = {}
+        self._occupancy: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, guild_id: int, user_id: int) -> Optional[VoiceSession]:
+        return self._sessions.get((guild_id, user_id))
+
+    def occupancy(self, channel_id: int) -> int:
+        return self._occupancy.get(channel_id, 0)
+
+    def sessions(self) -> Iterator[Tuple[PresenceKey, VoiceSession]]:
+        """Sessoes abertas agora, como ((guild_id, user_id), sessao)."""
+        return iter(self._sessions.items())
+
+    def now(self) -> float:
+        return self._clock()
+
+    def update(
+        self,
+        guild_id: int,
+        user_id: int,
+        channel_id: Optional[int],
+    ) -> List[VoicePresenceEvent]:
+        key = (guild_id, user_id)
+        session = self._sessions.get(key)
+        now = self._clock()
+
+        if session is None:
+            if channel_id is None:
+                return []
+            self._start(key, channel_id, now, now)
+            return [VoicePresenceEvent(EVENT_JOIN, guild_id, user_id, channel_id, now)]
+
+        if channel_id == session.channel_id:
+            # Mute/deaf/stream: nao muda presenca.
+            return []
+
+        channel_seconds = now - session.channel_joined_at
+        previous_channel_id = session.channel_id
+        self._leave_channel(previous_channel_id)
+
+        if channel_id is None:
+            del self._sessions[key]
+            session_seconds = now - session.session_started_at
+            return [
+                VoicePresenceEvent(
+                    EVENT_LEAVE, guild_id, user_id, previous_channel_id, now,
+                    channel_seconds=channel_seconds,
+                ),
+                VoicePresenceEvent(
+                    EVENT_SESSION_ENDED, guild_id, user_id, previous_channel_id, now,
+                    channel_seconds=channel_seconds,
+                    session_seconds=session_seconds,
+                ),
+            ]
+
+        session.channel_id = channel_id
+        session.channel_joined_at = now
+        self._occupancy[channel_id] = self._occupancy.get(channel_id, 0) + 1
+        return [
+            VoicePresenceEvent(
+                EVENT_MOVE, guild_id, user_id, channel_id, now,
+                previous_channel_id=previous_channel_id,
+                channel_seconds=channel_seconds,
+            )
+        ]
+
+    def seed(self, guild_id: int, voice_states: Iterable[Tuple[int, int]]) -> List[VoicePresenceEvent]:
+        """Sincroniza a guild com o snapshot (user_id, channel_id) do gateway.
+
+        Membros novos entram sem evento (nao sabemos quando entraram); quem sumiu
+        durante uma reconexao gera leave/session_ended e quem mudou de canal, move.
+        """
+        current = dict(voice_states)
+        events: List[VoicePresenceEvent] = []
+
+        stale = [key for key in self._sessions if key[0] == guild_id and key[1] not in current]
+        for _, user_id in stale:
+            events.extend(self.update(guild_id, user_id, None))
+
+        now = self._clock()
+        for user_id, channel_id in current.items():
+            key = (guild_id, user_id)
+            if key not in self._sessions:
+                self._start(key, channel_id, now, now)
+            elif self._sessions[key].channel_id != channel_id:
+                events.extend(self.update(guild_id, user_id, channel_id))
+        return events
+
+    def _start(self, key: PresenceKey, channel_id: int, started_at: float, joined_at: float) -> None:
+        self._sessions[key] = VoiceSession(channel_id, started_at, joined_at)
+        self._occupancy[channel_id] = self._occupancy.get(channel_id, 0) + 1
+
+    def _leave_channel(self, channel_id: int) -> None:
+        remaining = self._occupancy.get(channel_id, 0) - 1
+        if remaining > 0:
+            self._occupancy[channel_id] = remaining
+        else:
+            self._occupancy.pop(channel_id, None)
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from .storage import SQLiteStore
+from .voice_presence import (
+    EVENT_JOIN,
+    EVENT_LEAVE,
+    EVENT_MOVE,
+    PresenceKey,
+    VoicePresenceEvent,
+    VoicePresenceTracker,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS voice_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS voice_hourly (
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (guild_id, hour, channel_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS voice_user_daily (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (guild_id, day, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS voice_user_daily_day ON voice_user_daily (day);
+CREATE TABLE IF NOT EXISTS voice_channel_daily (
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    seconds REAL NOT NULL DEFAULT 0,
+    peak INTEGER NOT NULL DEFAULT 0,
+    peak_hour INTEGER,
+    PRIMARY KEY (guild_id, day, channel_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS voice_channel_daily_day ON voice_channel_daily (day);
+CREATE TABLE IF NOT EXISTS voice_peak_hourly (
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    peak INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, hour, channel_id)
+) WITHOUT ROWID;
+"""
+
+# (guild_id, channel_id, user_id, started_at, ended_at)
+Segment = Tuple[int, int, int, float, float]
+PeakKey = Tuple[int, int, int]
+
+
+class VoiceStatsStore:
+    """Historico de voz em SQLite com rollups pre-agregados.
+
+    Os segmentos brutos (tempo continuo de um usuario num canal) ficam em
+    voice_sessions; a cada flush_interval sao somados em memoria e gravados num
+    unico commit junto com os rollups por hora (canal x usuario) e por dia
+    (por usuario e por canal, com o pico de lotacao). As consultas do
+    !voice-stats leem so os rollups diarios: poucas linhas por dia, mesmo com
+    meses de historico.
+
+    Com o ``VoicePresenceTracker`` ligado via ``bind_presence``, quem ainda esta
+    em voz tambem conta: antes de cada consulta e no stop o tempo corrido das
+    sessoes abertas vira segmento, e o leave depois so grava o que faltou.
+    """
+
+    def __init__(self, path: str, tz_name: str = "America/Sao_Paulo", flush_interval: float = 5.0) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._store = SQLiteStore(path, _SCHEMA)
+        self._tz = ZoneInfo(tz_name)
+        self._flush_interval = flush_interval
+        self._segments: List[Segment] = []
+        self._peaks: Dict[PeakKey, int] = {}
+        self._presence: Optional[VoicePresenceTracker] = None
+        # Ate quando o tempo de cada sessao aberta ja foi gravado (checkpoint).
+        self._counted_until: Dict[PresenceKey, float] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def bind_presence(self, presence: VoicePresenceTracker) -> None:
+        self._presence = presence
+
+    async def start(self) -> None:
+        if self._flush_task is not None:
+            return
+        await self._store.open()
+        self._flush_task = asyncio.create_task(self._flush_loop(), name="voice-stats-flush")
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        # Quem segue em voz no shutdown nao perde o tempo; apos o restart a sessao recomeca no seed.
+        self._checkpoint()
+        await self._flush()
+        await self._store.close()
+
+    def record(self, event: VoicePresenceEvent, occupancy: int) -> None:
+        """Registra um evento do VoicePresenceTracker; occupancy e a lotacao atual do canal de destino."""
+        if event.kind in (EVENT_LEAVE, EVENT_MOVE) and event.channel_seconds:
+            left_channel = event.previous_channel_id if event.kind == EVENT_MOVE else event.channel_id
+            started_at = event.occurred_at - event.channel_seconds
+            counted = self._counted_until.pop((event.guild_id, event.user_id), None)
+            if counted is not None:
+                started_at = max(started_at, counted)
+            if event.occurred_at > started_at:
+                self._segments.append((event.guild_id, left_channel, event.user_id, started_at, event.occurred_at))
+        if event.kind in (EVENT_JOIN, EVENT_MOVE):
+            self.record_occupancy(event.guild_id, event.channel_id, occupancy, event.occurred_at)
+
+    def record_occupancy(self, guild_id: int, channel_id: int, occupancy: int, at: float) -> None:
+        key = (guild_id, channel_id, _hour_bucket(at))
+        if occupancy > self._peaks.get(key, 0):
+            self._peaks[key] = occupancy
+
+    async def top_users(self, guild_ids: Sequence[int], since: datetime, limit: int = 10) -> List[Tuple[int, float]]:
+        self._checkpoint()
+        await self._flush()
+        return await self._store.run(_query_top_users, list(guild_ids), self._day(since.timestamp()), limit)
+
+    async def peak_concurrency(self, guild_ids: Sequence[int], since: datetime) -> List[Tuple[int, int, int]]:
+        """Retorna (channel_id, pico, hora do pico em epoch) por canal."""
+        self._checkpoint()
+        await self._flush()
+        return await self._store.run(_query_peaks, list(guild_ids), self._day(since.timestamp()))
+
+    def _checkpoint(self) -> None:
+        if self._presence is None:
+            return
+        now = self._presence.now()
+        for key, session in self._presence.sessions():
+            started_at = max(session.channel_joined_at, self._counted_until.get(key, session.channel_joined_at))
+            if now > started_at:
+                self._segments.append((key[0], session.channel_id, key[1], started_at, now))
+                self._counted_until[key] = now
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self._flush()
+            except sqlite3.Error as exc:
+                self._logger.error("Failed to persist voice stats", extra={"context": {"error": str(exc)}})
+
+    async def _flush(self) -> None:
+        if not self._segments and not self._peaks:
+            return
+        segments, self._segments = self._segments, []
+        peaks, self._peaks = self._peaks, {}
+        hourly: Dict[Tuple[int, int, int, int], float] = {}
+        user_daily: Dict[Tuple[int, int, str], float] = {}
+        channel_daily: Dict[Tuple[int, int, str], List[Any]] = {}
+        for guild_id, channel_id, user_id, started_at, ended_at in segments:
+            for hour, seconds in _split_by_hour(started_at, ended_at):
+                key = (guild_id, channel_id, user_id, hour)
+                hourly[key] = hourly.get(key, 0.0) + seconds
+                day = self._day(hour)
+                user_key = (guild_id, user_id, day)
+                user_daily[user_key] = user_daily.get(user_key, 0.0) + seconds
+                channel_daily.setdefault((guild_id, channel_id, day), [0.0, 0, None])[0] += seconds
+        for (guild_id, channel_id, hour), peak in peaks.items():
+            row = channel_daily.setdefault((guild_id, channel_id, self._day(hour)), [0.0, 0, None])
+            if peak > row[1]:
+                row[1], row[2] = peak, hour
+        try:
+            await self._store.run(_write_batch, segments, hourly, user_daily, channel_daily, peaks)
+        except sqlite3.Error:
+            self._segments[:0] = segments
+            for key, peak in peaks.items():
+                self.record_occupancy(key[0], key[1], peak, key[2])
+            raise
+
+    def _day(self, ts: float) -> str:
+        return datetime.fromtimestamp(ts, self._tz).strftime("%Y-%m-%d")
+
+
+def _hour_bucket(ts: float) -> int:
+    return int(ts // 3600 * 3600)
+
+
+def _split_by_hour(started_at: float, ended_at: float) -> List[Tuple[int, float]]:
+    parts = []
+    cursor = started_at
+    while cursor < ended_at:
+        hour = _hour_bucket(cursor)
+        boundary = min(ended_at, hour + 3600)
+        parts.append((hour, boundary - cursor))
+        cursor = boundary
+    return parts
+
+
+def _write_batch(
+    conn: sqlite3.Connection,
+    segments: List[Segment],
+    hourly: Dict[Tuple[int, int, int, int], float],
+    user_daily: Dict[Tuple[int, int, str], float],
+    channel_daily: Dict[Tuple[int, int, str], List[Any]],
+    peaks: Dict[PeakKey, int],
+) -> None:
+    with conn:
+        conn.executemany(
+            "INSERT INTO voice_sessions (guild_id, channel_id, user_id, started_at, ended_at) VALUES (?, ?, ?, ?, ?)",
+            segments,
+        )
+        conn.executemany(
+            "INSERT INTO voice_hourly (guild_id, channel_id, user_id, hour, seconds) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (guild_id, hour, channel_id, user_id) DO UPDATE SET seconds = seconds + excluded.seconds",
+            [(*key, seconds) for key, seconds in hourly.items()],
+        )
+        conn.executemany(
+            "INSERT INTO voice_user_daily (guild_id, user_id, day, seconds) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (guild_id, day, user_id) DO UPDATE SET seconds = seconds + excluded.seconds",
+            [(*key, seconds) for key, seconds in user_daily.items()],
+        )
+        conn.executemany(
+            "INSERT INTO voice_channel_daily (guild_id, channel_id, day, seconds, peak, peak_hour) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (guild_id, day, channel_id) DO UPDATE SET "
+            "seconds = seconds + excluded.seconds, "
+            "peak_hour = CASE WHEN excluded.peak > peak THEN excluded.peak_hour ELSE peak_hour END, "
+            "peak = MAX(peak, excluded.peak)",
+            [(*key, *values) for key, values in channel_daily.items()],
+        )
+        conn.executemany(
+            "INSERT INTO voice_peak_hourly (guild_id, channel_id, hour, peak) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (guild_id, hour, channel_id) DO UPDATE SET peak = MAX(peak, excluded.peak)",
+            [(*key, peak) for key, peak in peaks.items()],
+        )
+
+
+def _query_top_users(conn: sqlite3.Connection, guild_ids: List[int], day: str, limit: int) -> List[Tuple[int, float]]:
+    if not guild_ids:
+        return []
+    sql = (
+        f"SELECT user_id, SUM(seconds) FROM voice_user_daily WHERE guild_id IN ({_placeholders(guild_ids)}) "
+        "AND day >= ? GROUP BY user_id ORDER BY 2 DESC LIMIT ?"
+    )
+    return conn.execute(sql, (*guild_ids, day, limit)).fetchall()
+
+
+def _query_peaks(conn: sqlite3.Connection, guild_ids: List[int], day: str) -> List[Tuple[int, int, int]]:
+    # SQLite devolve a linha do MAX() nas colunas nao agregadas (hora do pico).
+    if not guild_ids:
+        return []
+    sql = (
+        "SELECT channel_id, MAX(peak), peak_hour FROM voice_channel_daily "
+        f"WHERE guild_id IN ({_placeholders(guild_ids)}) AND day >= ? AND peak > 0 "
+        "GROUP BY channel_id ORDER BY 2 DESC"
+    )
+    return conn.execute(sql, (*guild_ids, day)).fetchall()
+
+
+def _placeholders(values: List[Any]) -> str:
+    return ", ".join("?" * len(values))
+
+
+def start_of_week(now: datetime) -> datetime:
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight - timedelta(days=midnight.weekday())
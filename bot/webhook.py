@@ -1,12 +1,24 @@
 import asyncio
 import logging
-import os
-from typing import Any, Dict, Optional
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
 import httpx
 
+from .circuit_breaker import CircuitBreaker, RetryBudget, backoff_delay, parse_retry_after
+
 VERIFY_SSL = False
 FOLLOW_REDIRECTS = True
+# Status 4xx que ainda valem retry; os demais 4xx sao rejeicoes definitivas do receptor.
+RETRYABLE_4XX = frozenset({408, 425, 429})
+
+# Resultado de uma entrega: enviado, falhou (vale reenviar), rejeitado pelo receptor (nao vale)
+# ou nem tentado porque o circuito recusou (nao conta como tentativa).
+DELIVERY_SENT = "sent"
+DELIVERY_FAILED = "failed"
+DELIVERY_REJECTED = "rejected"
+DELIVERY_SKIPPED = "skipped"
 
 
 class WebhookDispatcher:
@@ -16,65 +28,215 @@ class WebhookDispatcher:
         webhook_secret: Optional[str] = None,
         timeout_seconds: float = 10.0,
         max_retries: int = 3,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        batch_max_events: int = 1,
+        batch_max_wait_ms: int = 200,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_seconds: float = 30.0,
+        retry_base_seconds: float = 0.5,
+        retry_max_seconds: float = 10.0,
+        retry_budget_ratio: float = 0.2,
     ) -> None:
         self._logger = logging.getLogger(__name__)
         self._webhook_url = webhook_url
         self._webhook_secret = webhook_secret
         self._timeout_seconds = timeout_seconds
         self._max_retries = max_retries
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+        self._batch_max_events = max(1, batch_max_events)
+        self._batch_max_wait = max(0, batch_max_wait_ms) / 1000
+        self._breaker = CircuitBreaker(
+            name="webhook",
+            failure_threshold=circuit_failure_threshold,
+            reset_timeout=circuit_reset_seconds,
+        )
+        self._retry_budget = RetryBudget(ratio=retry_budget_ratio)
+        self._retry_base = retry_base_seconds
+        self._retry_max = retry_max_seconds
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._breaker.is_open
+
+    @property
+    def circuit_retry_in(self) -> float:
+        return self._breaker.retry_in
 
-    async def send_event(self, payload: Dict[str, Any]) -> bool:
+    @property
+    def batching_enabled(self) -> bool:
+        return self._batch_max_events > 1
+
+    @property
+    def batch_max_events(self) -> int:
+        return self._batch_max_events
+
+    @property
+    def batch_max_wait(self) -> float:
+        return self._batch_max_wait
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Um unico client por processo: reaproveita conexoes (keep-alive) entre eventos.
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    def _build_client(self) -> httpx.AsyncClient:
         headers = {"Content-Type": "application/json"}
         if self._webhook_secret:
             headers["X-Discord-Webhook-Secret"] = self._webhook_secret
 
-        timeout = httpx.Timeout(self._timeout_seconds)
+        options: Dict[str, Any] = {
+            "timeout": httpx.Timeout(self._timeout_seconds),
+            "verify": VERIFY_SSL,
+            "follow_redirects": FOLLOW_REDIRECTS,
+            "limits": self._limits,
+            "headers": headers,
+        }
+        try:
+            return httpx.AsyncClient(http2=self._http2, **options)
+        except ImportError:
+            # http2=True exige o pacote "h2" (pip install "httpx[http2]").
+            self._logger.warning(
+                "HTTP/2 requested but h2 is not installed, falling back to HTTP/1.1",
+                extra={"context": {"url": self._webhook_url}},
+            )
+            self._http2 = False
+            return httpx.AsyncClient(**options)
 
-        for attempt in range(1, self._max_retries + 1):
-            try:
-                async with httpx.AsyncClient(
-                    timeout=timeout,
-                    verify=VERIFY_SSL,
-                    follow_redirects=FOLLOW_REDIRECTS,
-                ) as client:
-                    resp = await client.post(self._webhook_url, json=payload, headers=headers)
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+            self._logger.info("Webhook HTTP client closed", extra={"context": {"url": self._webhook_url}})
 
+    async def send_event(self, payload: Dict[str, Any]) -> str:
+        headers = {}
+        if payload.get("idempotency_key"):
+            # O receptor pode descartar reenvios (entrega at-least-once do outbox).
+            headers["Idempotency-Key"] = str(payload["idempotency_key"])
+        return await self._post(payload, headers, {"event": payload.get("event")})
+
+    async def send_batch(self, payloads: List[Dict[str, Any]]) -> str:
+        if len(payloads) == 1:
+            return await self.send_event(payloads[0])
+
+        batch_id = str(uuid.uuid4())
+        envelope = {
+            "event": "BATCH",
+            "batch_id": batch_id,
+            "sent_at": datetime.now(timezone.utc).isoformat(),
+            "count": len(payloads),
+            "events": payloads,
+        }
+        headers = {"Idempotency-Key": batch_id}
+        return await self._post(envelope, headers, {"event": "BATCH", "count": len(payloads)})
+
+    async def _post(self, body: Dict[str, Any], headers: Dict[str, str], log_context: Dict[str, Any]) -> str:
+        if not self._breaker.allow_request():
+            # Circuito aberto: nem tenta a rede, o chamador manda para o caminho diferido.
+            self._logger.debug(
+                "Webhook circuit open, skipping delivery",
+                extra={"context": {**log_context, "retry_in": round(self._breaker.retry_in, 1)}},
+            )
+            return DELIVERY_SKIPPED
+
+        self._retry_budget.record_request()
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after: Optional[float] = None
+            status: Optional[int] = None
+            try:
+                resp = await self._get_client().post(self._webhook_url, json=body, headers=headers)
+            except asyncio.CancelledError:
+                self._breaker.release_probe()
+                raise
+            except (httpx.HTTPError, httpx.TimeoutException) as exc:
+                error = str(exc)
+                retryable = True
+            else:
                 # Se não seguir redirects, 308 cai aqui; se seguir, pode cair em 4xx/5xx.
                 if 200 <= resp.status_code < 300:
+                    self._breaker.record_success()
                     self._logger.info(
                         "Webhook event sent successfully",
-                        extra={"context": {"attempt": attempt, "url": self._webhook_url, "status": resp.status_code}},
+                        extra={
+                            "context": {
+                                **log_context,
+                                "attempt": attempt,
+                                "url": self._webhook_url,
+                                "status": resp.status_code,
+                                "http_version": resp.http_version,
+                            }
+                        },
                     )
-                    return True
+                    return DELIVERY_SENT
 
-                # Trata status ruim como erro (logando body curto)
+                status = resp.status_code
                 body_preview = (resp.text or "")[:300]
-                raise httpx.HTTPStatusError(
-                    f"Non-2xx response: {resp.status_code}. Body: {body_preview}",
-                    request=resp.request,
-                    response=resp,
-                )
+                error = f"Non-2xx response: {status}. Body: {body_preview}"
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                retryable = status >= 500 or status in RETRYABLE_4XX
 
-            except (httpx.HTTPError, httpx.TimeoutException) as exc:
+            if retryable:
+                self._breaker.record_failure(retry_after)
+            else:
+                # Endpoint respondeu: falha definitiva do evento, nao do endpoint.
+                self._breaker.record_success()
+
+            self._logger.warning(
+                "Webhook delivery failed",
+                extra={
+                    "context": {
+                        **log_context,
+                        "attempt": attempt,
+                        "max_retries": self._max_retries,
+                        "url": self._webhook_url,
+                        "status": status,
+                        "retryable": retryable,
+                        "circuit": self._breaker.state,
+                        "verify_ssl": VERIFY_SSL,
+                        "follow_redirects": FOLLOW_REDIRECTS,
+                        "error": error,
+                    }
+                },
+            )
+
+            if not retryable:
+                # Reenviar o mesmo corpo so repetiria a rejeicao: o chamador descarta o evento.
+                return DELIVERY_REJECTED
+            if attempt >= self._max_retries or not self._breaker.allow_request():
+                break
+            delay = max(backoff_delay(attempt, self._retry_base, self._retry_max), retry_after or 0.0)
+            if delay > self._retry_max:
+                # Retry-After maior que o teto: melhor diferir do que segurar o worker.
+                break
+            if not self._retry_budget.try_spend():
                 self._logger.warning(
-                    "Webhook delivery failed",
-                    extra={
-                        "context": {
-                            "attempt": attempt,
-                            "max_retries": self._max_retries,
-                            "url": self._webhook_url,
-                            "verify_ssl": VERIFY_SSL,
-                            "follow_redirects": FOLLOW_REDIRECTS,
-                            "error": str(exc),
-                        }
-                    },
+                    "Webhook retry budget exhausted",
+                    extra={"context": {**log_context, "url": self._webhook_url}},
                 )
-
-                if attempt < self._max_retries:
-                    await asyncio.sleep(attempt)  # backoff simples
+                break
+            await asyncio.sleep(delay)
 
         self._logger.error(
-            "Webhook delivery exhausted retries",
-            extra={"context": {"max_retries": self._max_retries, "url": self._webhook_url}},
+            "Webhook delivery gave up",
+            extra={
+                "context": {
+                    **log_context,
+                    "attempts": attempt,
+                    "url": self._webhook_url,
+                    "circuit": self._breaker.state,
+                }
+            },
         )
-        return False
+        return DELIVERY_FAILED
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from .storage import SQLiteStore
+from .webhook import DELIVERY_REJECTED, DELIVERY_SENT, DELIVERY_SKIPPED, WebhookDispatcher
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dead_letter (
+    id INTEGER PRIMARY KEY,
+    idempotency_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+# Motivos gravados no dead_letter.
+DEAD_LETTER_REJECTED = "rejected"
+DEAD_LETTER_MAX_ATTEMPTS = "max-attempts"
+
+
+class WebhookOutbox:
+    """Outbox append-only em SQLite: eventos sao gravados antes do envio e
+    entregues em ordem por um drainer em background (at-least-once).
+
+    Eventos rejeitados pelo receptor ou que esgotam ``max_attempts`` saem da
+    fila para a tabela ``dead_letter``, para nao travar os que vem atras.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dispatcher: WebhookDispatcher,
+        flush_interval: float = 0.05,
+        batch_size: int = 100,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 300.0,
+        max_attempts: int = 50,
+    ) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._store = SQLiteStore(path, _SCHEMA)
+        self._dispatcher = dispatcher
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        # 0 desliga o limite: o evento fica no outbox ate ser entregue.
+        self._max_attempts = max(0, max_attempts)
+        self._buffer: List[Tuple[str, str, float]] = []
+        self._buffered = asyncio.Event()
+        self._new_rows = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+        self._drainer_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._writer_task is not None:
+            return
+        await self._store.open()
+        pending, dead = await self._store.run(_count_rows)
+        self._logger.info(
+            "Webhook outbox started",
+            extra={"context": {"path": self._store.path, "pending": pending, "dead_letter": dead}},
+        )
+        self._writer_task = asyncio.create_task(self._writer_loop(), name="webhook-outbox-writer")
+        self._drainer_task = asyncio.create_task(self._drainer_loop(), name="webhook-outbox-drainer")
+
+    async def stop(self) -> None:
+        if self._drainer_task is not None:
+            # Um envio interrompido aqui permanece no outbox e e reenviado no proximo start.
+            self._drainer_task.cancel()
+            await asyncio.gather(self._drainer_task, return_exceptions=True)
+            self._drainer_task = None
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+        await self._flush()
+        await self._store.close()
+
+    def enqueue(self, payload: Dict[str, Any]) -> None:
+        """Nao bloqueia: o evento vai para o buffer e e gravado no proximo group commit."""
+        key = str(payload.setdefault("idempotency_key", str(uuid.uuid4())))
+        self._buffer.append((key, json.dumps(payload, ensure_ascii=False), time.time()))
+        self._buffered.set()
+
+    async def _writer_loop(self) -> None:
+        while True:
+            await self._buffered.wait()
+            # Janela curta para agrupar varios eventos num unico commit.
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self._flush()
+            except sqlite3.Error as exc:
+                self._logger.error(
+                    "Failed to persist webhook events to outbox",
+                    extra={"context": {"error": str(exc), "buffered": len(self._buffer)}},
+                )
+                await asyncio.sleep(1.0)
+
+    async def _flush(self) -> None:
+        self._buffered.clear()
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        try:
+            await self._store.run(_insert_rows, rows)
+        except sqlite3.Error:
+            self._buffer[:0] = rows
+            self._buffered.set()
+            raise
+        self._new_rows.set()
+
+    async def _drainer_loop(self) -> None:
+        delay = self._retry_delay
+        while True:
+            try:
+                delay = await self._drain_once(delay)
+            except sqlite3.Error as exc:
+                self._logger.error(
+                    "Webhook outbox read failed",
+                    extra={"context": {"error": str(exc)}},
+                )
+                await asyncio.sleep(self._retry_delay)
+
+    async def _drain_once(self, delay: float) -> float:
+        if self._dispatcher.circuit_open:
+            await asyncio.sleep(self._dispatcher.circuit_retry_in)
+            return delay
+
+        self._new_rows.clear()
+        rows = await self._store.run(_select_head, self._batch_size)
+        if not rows:
+            await self._new_rows.wait()
+            return delay
+
+        step = self._dispatcher.batch_max_events
+        for start in range(0, len(rows), step):
+            chunk = rows[start : start + step]
+            row_ids = [row_id for row_id, _ in chunk]
+            payloads = [json.loads(payload) for _, payload in chunk]
+            result = await self._dispatcher.send_batch(payloads)
+            if result == DELIVERY_SENT:
+                await self._store.run(_delete_rows, row_ids)
+                delay = self._retry_delay
+                continue
+            if result == DELIVERY_REJECTED:
+                # Rejeicao definitiva: manter a cabeca no outbox travaria todos os eventos atras dela.
+                dead = await self._store.run(_dead_letter_rows, row_ids, DEAD_LETTER_REJECTED)
+                self._log_dead_letter(dead, DEAD_LETTER_REJECTED)
+                continue
+            if result == DELIVERY_SKIPPED:
+                # Circuito recusou (ex.: a sonda half-open esta com um worker da fila): nada foi
+                # enviado, entao nao conta tentativa; espera o circuito e tenta a cabeca de novo.
+                await asyncio.sleep(max(self._dispatcher.circuit_retry_in, self._retry_delay))
+                return delay
+
+            dead = await self._store.run(_mark_attempts, row_ids, self._max_attempts)
+            if dead:
+                self._log_dead_letter(dead, DEAD_LETTER_MAX_ATTEMPTS)
+            self._logger.warning(
+                "Webhook outbox delivery deferred",
+                extra={"context": {"outbox_ids": row_ids, "retry_in": delay}},
+            )
+            # Mantem a ordem: a cabeca do outbox e reenviada antes dos demais.
+            await asyncio.sleep(delay)
+            return min(delay * 2, self._max_retry_delay)
+        return delay
+
+    def _log_dead_letter(self, dead: List[Tuple[int, str, int]], reason: str) -> None:
+        for row_id, key, attempts in dead:
+            self._logger.error(
+                "Webhook outbox event moved to dead letter",
+                extra={
+                    "context": {
+                        "outbox_id": row_id,
+                        "idempotency_key": key,
+                        "attempts": attempts,
+                        "reason": reason,
+                    }
+                },
+            )
+
+
+def _count_rows(conn: sqlite3.Connection) -> Tuple[int, int]:
+    pending = conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+    dead = conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+    return pending, dead
+
+
+def _insert_rows(conn: sqlite3.Connection, rows: List[Tuple[str, str, float]]) -> None:
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO outbox (idempotency_key, payload, created_at) VALUES (?, ?, ?)",
+            rows,
+        )
+
+
+def _select_head(conn: sqlite3.Connection, limit: int) -> List[Tuple[int, str]]:
+    return conn.execute(
+        "SELECT id, payload FROM outbox ORDER BY id LIMIT ?", (limit,)
+    ).fetchall()
+
+
+def _delete_rows(conn: sqlite3.Connection, row_ids: List[int]) -> None:
+    with conn:
+        conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in row_ids])
+
+
+def _mark_attempts(conn: sqlite3.Connection, row_ids: List[int], max_attempts: int) -> List[Tuple[int, str, int]]:
+    """Conta mais uma tentativa e move para o dead_letter as linhas que chegaram a ``max_attempts``."""
+    with conn:
+        conn.executemany(
+            "UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", [(row_id,) for row_id in row_ids]
+        )
+        if not max_attempts:
+            return []
+        placeholders = ", ".join("?" * len(row_ids))
+        exhausted = [
+            row_id
+            for (row_id,) in conn.execute(
+                f"SELECT id FROM outbox WHERE id IN ({placeholders}) AND attempts >= ?",
+                (*row_ids, max_attempts),
+            )
+        ]
+        return _move_rows(conn, exhausted, DEAD_LETTER_MAX_ATTEMPTS)
+
+
+def _dead_letter_rows(conn: sqlite3.Connection, row_ids: List[int], reason: str) -> List[Tuple[int, str, int]]:
+    with conn:
+        return _move_rows(conn, row_ids, reason)
+
+
+def _move_rows(conn: sqlite3.Connection, row_ids: List[int], reason: str) -> List[Tuple[int, str, int]]:
+    # Chamado dentro da transacao de quem chama.
+    if not row_ids:
+        return []
+    placeholders = ", ".join("?" * len(row_ids))
+    moved = conn.execute(
+        f"SELECT id, idempotency_key, attempts FROM outbox WHERE id IN ({placeholders}) ORDER BY id",
+        row_ids,
+    ).fetchall()
+    conn.execute(
+        "INSERT OR REPLACE INTO dead_letter (id, idempotency_key, payload, created_at, attempts, reason, failed_at) "
+        f"SELECT id, idempotency_key, payload, created_at, attempts, ?, ? FROM outbox WHERE id IN ({placeholders})",
+        (reason, time.time(), *row_ids),
+    )
+    conn.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", row_ids)
+    return moved
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from .webhook import DELIVERY_REJECTED, DELIVERY_SENT, DELIVERY_SKIPPED, WebhookDispatcher
+from .webhook_outbox import WebhookOutbox
+
+OVERFLOW_DROP_OLDEST = "drop-oldest"
+OVERFLOW_BLOCK = "block"
+OVERFLOW_SPILL = "spill"
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK, OVERFLOW_SPILL)
+
+
+class WebhookDeliveryQueue:
+    """Fila limitada em memoria entre o gateway e o webhook, consumida por N workers.
+
+    Eventos que falham, que transbordam (politica "spill") ou que ainda estao na
+    fila no shutdown vao para o outbox em disco, quando configurado.
+    """
+
+    def __init__(
+        self,
+        dispatcher: WebhookDispatcher,
+        outbox: Optional[WebhookOutbox] = None,
+        maxsize: int = 1000,
+        workers: int = 4,
+        overflow: str = OVERFLOW_SPILL,
+        metrics_interval: float = 60.0,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self._logger = logging.getLogger(__name__)
+        self._dispatcher = dispatcher
+        self._outbox = outbox
+        self._queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=maxsize)
+        self._worker_count = max(1, workers)
+        self._overflow = overflow
+        if overflow == OVERFLOW_SPILL and outbox is None:
+            self._logger.warning("Spill overflow requires the outbox, using drop-oldest")
+            self._overflow = OVERFLOW_DROP_OLDEST
+        self._metrics_interval = metrics_interval
+        self._tasks: List[asyncio.Task] = []
+        # Avisa quem esta montando um batch que chegou evento novo.
+        self._available = asyncio.Event()
+        self._counters = {
+            "enqueued": 0,
+            "delivered": 0,
+            "failed": 0,
+            "rejected": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "deferred": 0,
+            "max_depth": 0,
+        }
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, int]:
+        return {"depth": self.depth, "capacity": self._queue.maxsize, **self._counters}
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        if self._outbox is not None:
+            await self._outbox.start()
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"webhook-worker-{i}")
+            for i in range(self._worker_count)
+        ]
+        if self._metrics_interval > 0:
+            self._tasks.append(asyncio.create_task(self._metrics_loop(), name="webhook-queue-metrics"))
+        self._logger.info(
+            "Webhook delivery queue started",
+            extra={
+                "context": {
+                    "workers": self._worker_count,
+                    "capacity": self._queue.maxsize,
+                    "overflow": self._overflow,
+                }
+            },
+        )
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        leftover = 0
+        while not self._queue.empty():
+            payload = self._queue.get_nowait()
+            if self._outbox is not None:
+                self._outbox.enqueue(payload)
+                leftover += 1
+        if leftover:
+            self._logger.info(
+                "Queued webhook events moved to outbox on shutdown",
+                extra={"context": {"count": leftover}},
+            )
+        if self._outbox is not None:
+            await self._outbox.stop()
+        self._log_metrics()
+
+    async def submit(self, payload: Dict[str, Any]) -> None:
+        """So aguarda com a politica "block" e fila cheia; nos demais casos retorna imediatamente."""
+        self._counters["enqueued"] += 1
+        if self._queue.full():
+            if self._overflow == OVERFLOW_BLOCK:
+                await self._queue.put(payload)
+            elif self._overflow == OVERFLOW_SPILL and self._outbox is not None:
+                self._counters["spilled"] += 1
+                self._outbox.enqueue(payload)
+                return
+            else:
+                dropped = self._queue.get_nowait()
+                self._queue.task_done()
+                self._counters["dropped"] += 1
+                self._logger.warning(
+                    "Webhook queue full, dropping oldest event",
+                    extra={"context": {"idempotency_key": dropped.get("idempotency_key")}},
+                )
+                self._queue.put_nowait(payload)
+        else:
+            self._queue.put_nowait(payload)
+        self._available.set()
+
+        depth = self._queue.qsize()
+        if depth > self._counters["max_depth"]:
+            self._counters["max_depth"] = depth
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [await self._queue.get()]
+        if not self._dispatcher.batching_enabled:
+            return batch
+
+        # Junta eventos ate batch_max_events ou ate estourar batch_max_wait. So get_nowait
+        # tira da fila: um cancelamento durante a espera nao pode engolir um evento.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._dispatcher.batch_max_wait
+        try:
+            while len(batch) < self._dispatcher.batch_max_events:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._available.clear()
+                try:
+                    await asyncio.wait_for(self._available.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Shutdown com o batch pela metade: os eventos ja retirados vao para o outbox.
+            self._defer(batch)
+            for _ in batch:
+                self._queue.task_done()
+            raise
+        return batch
+
+    async def _deliver(self, batch: List[Dict[str, Any]]) -> None:
+        if self._outbox is not None and self._dispatcher.circuit_open:
+            self._counters["deferred"] += len(batch)
+            self._defer(batch)
+            return
+
+        try:
+            result = await self._dispatcher.send_batch(batch)
+        except asyncio.CancelledError:
+            # Shutdown no meio do envio: os eventos nao podem se perder.
+            self._defer(batch)
+            raise
+
+        if result == DELIVERY_SENT:
+            self._counters["delivered"] += len(batch)
+            return
+        if result == DELIVERY_REJECTED:
+            # Rejeicao definitiva do receptor: mandar para o outbox so repetiria o erro.
+            self._counters["rejected"] += len(batch)
+            self._logger.error(
+                "Webhook events rejected by receiver, dropping",
+                extra={"context": {"idempotency_keys": [p.get("idempotency_key") for p in batch]}},
+            )
+            return
+        if result == DELIVERY_SKIPPED and self._outbox is not None:
+            # Circuito recusou antes de enviar: vai para o outbox como no caminho do circuito aberto.
+            self._counters["deferred"] += len(batch)
+            self._defer(batch)
+            return
+
+        self._counters["failed"] += len(batch)
+        if self._outbox is not None:
+            self._defer(batch)
+        else:
+            self._logger.error(
+                "Webhook events dropped after failed delivery",
+                extra={"context": {"idempotency_keys": [p.get("idempotency_key") for p in batch]}},
+            )
+
+    def _defer(self, batch: List[Dict[str, Any]]) -> None:
+        if self._outbox is not None:
+            for payload in batch:
+                self._outbox.enqueue(payload)
+
+    async def _metrics_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._metrics_interval)
+            self._log_metrics()
+
+    def _log_metrics(self) -> None:
+        self._logger.info("Webhook queue metrics", extra={"context": self.stats()})
@@ -1,4 +1,5 @@
 import logging
+import os
 
 from bot.calendar_auth import CalendarAuth
 from bot.calendar_client import CalendarClient
@@ -8,9 +9,17 @@ from bot.config import Settings
 from bot.julgar_listener import JulgarListener
 from bot.logger import configure_logging
 from bot.notion_client import NotionClient
+from bot.notion_write_behind import NotionWriteBehind
+from bot.shift_history import ShiftHistory
+from bot.shift_state import ShiftState
+from bot.snapshot_store import SnapshotStore
+from bot.task_mirror import TaskMirror
 from bot.timer_manager import TimerManager
 from bot.voice_listener import VoiceListener
+from bot.voice_stats import VoiceStatsStore
 from bot.webhook import WebhookDispatcher
+from bot.webhook_outbox import WebhookOutbox
+from bot.webhook_queue import WebhookDeliveryQueue
 
 
 def main() -> None:
@@ -29,11 +38,49 @@ def main() -> None:
     webhook_dispatcher = WebhookDispatcher(
         webhook_url=settings.webhook_url,
         webhook_secret=settings.webhook_secret,
+        max_connections=settings.webhook_max_connections,
+        max_keepalive_connections=settings.webhook_max_keepalive_connections,
+        keepalive_expiry=settings.webhook_keepalive_expiry,
+        http2=settings.webhook_http2,
+        batch_max_events=settings.webhook_batch_max_events,
+        batch_max_wait_ms=settings.webhook_batch_max_wait_ms,
+        circuit_failure_threshold=settings.webhook_circuit_failure_threshold,
+        circuit_reset_seconds=settings.webhook_circuit_reset_seconds,
+        retry_base_seconds=settings.webhook_retry_base_seconds,
+        retry_max_seconds=settings.webhook_retry_max_seconds,
+        retry_budget_ratio=settings.webhook_retry_budget_ratio,
     )
 
+    webhook_outbox = None
+    if settings.webhook_outbox_enabled:
+        webhook_outbox = WebhookOutbox(
+            path=os.path.join(settings.data_dir, "webhook_outbox.db"),
+            dispatcher=webhook_dispatcher,
+            max_attempts=settings.webhook_outbox_max_attempts,
+        )
+
+    webhook_queue = WebhookDeliveryQueue(
+        dispatcher=webhook_dispatcher,
+        outbox=webhook_outbox,
+        maxsize=settings.webhook_queue_size,
+        workers=settings.webhook_workers,
+        overflow=settings.webhook_queue_overflow,
+    )
+
+    voice_stats = None
+    if settings.voice_stats_enabled:
+        voice_stats = VoiceStatsStore(
+            path=os.path.join(settings.data_dir, "voice_stats.db"),
+            tz_name=settings.calendar_timezone,
+        )
+
     voice_listener = VoiceListener(
         voice_channel_ids=settings.voice_channel_ids,
         webhook=webhook_dispatcher,
+        queue=webhook_queue,
+        debounce_seconds=settings.voice_join_debounce_seconds,
+        session_events=settings.webhook_session_events,
+        stats=voice_stats,
     )
     julgar_listener = JulgarListener(
         text_channel_id=settings.julgar_channel_id,
@@ -41,16 +88,61 @@ def main() -> None:
     )
 
     notion_client = None
+    task_mirror = None
+    shift_state = None
+    shift_history = None
     timer_manager = TimerManager()
     if settings.notion_token and settings.notion_database_id:
+        write_behind = None
+        if settings.notion_write_behind_enabled:
+            write_behind = NotionWriteBehind(
+                os.path.join(settings.data_dir, "notion_writes.db"),
+                flush_delay=settings.notion_write_behind_delay_seconds,
+            )
+        snapshots = None
+        if settings.notion_offline_snapshot_enabled:
+            snapshots = SnapshotStore(os.path.join(settings.data_dir, "notion_snapshot.db"))
         notion_client = NotionClient(
             token=settings.notion_token,
             database_id=settings.notion_database_id,
             shifts_database_id=settings.notion_shift_database_id,
+            page_size=settings.notion_page_size,
+            schema_ttl=settings.notion_schema_ttl_seconds,
+            rate_limit_per_second=settings.notion_rate_limit_per_second,
+            rate_limit_burst=settings.notion_rate_limit_burst,
+            write_behind=write_behind,
+            snapshots=snapshots,
+            unavailable_threshold=settings.notion_unavailable_threshold,
         )
+        if settings.task_mirror_enabled:
+            task_mirror = TaskMirror(
+                notion_client,
+                refresh_interval=settings.task_mirror_refresh_seconds,
+                snapshots=snapshots,
+            )
+        if settings.notion_shift_database_id:
+            shift_state = ShiftState(
+                notion_client,
+                snapshots=snapshots,
+                reconcile_interval=settings.shift_state_reconcile_seconds,
+                tz_name=settings.calendar_timezone,
+            )
+            shift_history = ShiftHistory(
+                notion_client,
+                os.path.join(settings.data_dir, "shift_history.db"),
+                refresh_interval=settings.shift_history_refresh_seconds,
+                tz_name=settings.calendar_timezone,
+            )
         logger.info(
             "Notion integration enabled",
-            extra={"context": {"shifts_db": bool(settings.notion_shift_database_id)}},
+            extra={
+                "context": {
+                    "shifts_db": bool(settings.notion_shift_database_id),
+                    "task_mirror": task_mirror is not None,
+                    "write_behind": write_behind is not None,
+                    "offline_snapshot": snapshots is not None,
+                }
+            },
         )
     else:
         logger.warning(
@@ -90,6 +182,10 @@ def main() -> None:
         calendar_listener=calendar_listener,
         target_user_id=settings.target_user_id,
         tz_name=settings.calendar_timezone,
+        task_mirror=task_mirror,
+        shift_state=shift_state,
+        shift_history=shift_history,
+        shift_target_hours=settings.shift_target_hours,
     )
     client.run(settings.discord_bot_token, log_handler=None)
 